@@ -1,38 +1,433 @@
 #!/usr/bin/env python3
 """
-Check if Whisper model exists locally.
-Exit code 0 = model found, 1 = not found
+Whisper model manager.
+
+    python check_whisper.py                  check the configured model (exit 0 = ok, 1 = missing/broken);
+                                             also verifies it against the manifest when it has an entry
+    python check_whisper.py verify [model]   check files against the size/hash manifest
+    python check_whisper.py manifest [model] record the manifest for a trusted local model
+    python check_whisper.py import PATH      import a model directory or archive (.zip/.tar/.tar.gz);
+                                             --upstream also checks it against the HuggingFace repo
+    python check_whisper.py download [model] prefetch a model from HuggingFace into the models directory
+    python check_whisper.py bench [model...] report load time and resident memory per model
+
+The model defaults to `whisper.model` in voice_clones/config.json.
+The manifest (voice_clones/models/manifest.json) stores each file's size and a
+hash of its first and last MB, so verification never reads the whole weights.
+Downloaded models are checked against the sizes and hashes published by the
+HuggingFace repo before the manifest is recorded, so a truncated download never
+becomes the reference.
 """
 
+import argparse
+import fnmatch
+import hashlib
+import json
 import os
+import shutil
 import sys
+import tarfile
+import tempfile
+import time
+import zipfile
 
-MODEL_DIR = os.path.join("voice_clones", "models", "faster-whisper-small")
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(ROOT_DIR, "voice_clones", "config.json")
+MODELS_DIR = os.path.join(ROOT_DIR, "voice_clones", "models")
+MANIFEST_FILE = os.path.join(MODELS_DIR, "manifest.json")
 
-# Required model files
+# Required model files (older models ship vocabulary.txt, large-v3 ships vocabulary.json)
 REQUIRED_FILES = [
     "model.bin",
     "config.json",
-    "vocabulary.json",
     "tokenizer.json"
 ]
+VOCABULARY_FILES = ["vocabulary.txt", "vocabulary.json"]
+
+SAMPLE_BYTES = 1024 * 1024
+
+# Files faster-whisper downloads from a model repo
+DOWNLOAD_PATTERNS = ["config.json", "preprocessor_config.json", "model.bin", "tokenizer.json", "vocabulary.*"]
+
+
+def configured_model():
+    """Model name from voice_clones/config.json (default: small)."""
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get('whisper', {}).get('model', 'small')
+    except (OSError, ValueError):
+        return 'small'
+
+
+def model_dir(model):
+    return os.path.join(MODELS_DIR, f"faster-whisper-{model}")
+
 
-def check_model():
+def check_model(model=None):
     """Check if Whisper model exists and is complete."""
-    if not os.path.isdir(MODEL_DIR):
+    path = model_dir(model or configured_model())
+    if not os.path.isdir(path):
         return False
-    
+
     # Check for required files
     for filename in REQUIRED_FILES:
-        filepath = os.path.join(MODEL_DIR, filename)
-        if not os.path.isfile(filepath):
+        if not os.path.isfile(os.path.join(path, filename)):
             return False
-    
-    return True
+    return any(os.path.isfile(os.path.join(path, f)) for f in VOCABULARY_FILES)
 
-if __name__ == "__main__":
-    if check_model():
-        print("[OK] Whisper model found")
-        sys.exit(0)
+
+def sample_hash(filepath, size):
+    """sha256 of the first and last MB plus the file size."""
+    digest = hashlib.sha256(str(size).encode())
+    with open(filepath, 'rb') as f:
+        digest.update(f.read(SAMPLE_BYTES))
+        if size > SAMPLE_BYTES:
+            f.seek(max(SAMPLE_BYTES, size - SAMPLE_BYTES))
+            digest.update(f.read(SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(SAMPLE_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def git_blob_sha1(filepath):
+    """Git object id of a file (what the Hub reports for files not stored in LFS)."""
+    digest = hashlib.sha1(f"blob {os.path.getsize(filepath)}\0".encode())
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(SAMPLE_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def upstream_repo(model):
+    """HuggingFace repo id for a model size or id (same mapping faster-whisper uses)."""
+    if "/" in model:
+        return model
+    from faster_whisper.utils import _MODELS
+    if model not in _MODELS:
+        raise ValueError(f"unknown model '{model}', expected one of: {', '.join(_MODELS)}")
+    return _MODELS[model]
+
+
+def upstream_files(model):
+    """Revision and per-file size/hash published by the HuggingFace repo of the model.
+
+    Returns (revision, {name: {"size": int, "sha256": str} or {"size": int, "git_sha1": str}}).
+    """
+    from huggingface_hub import HfApi
+    info = HfApi().model_info(upstream_repo(model), files_metadata=True)
+    files = {}
+    for sibling in info.siblings or []:
+        name = sibling.rfilename
+        if not any(fnmatch.fnmatch(name, pattern) for pattern in DOWNLOAD_PATTERNS):
+            continue
+        if sibling.lfs is not None:
+            files[name] = {"size": sibling.lfs.size, "sha256": sibling.lfs.sha256}
+        else:
+            files[name] = {"size": sibling.size, "git_sha1": sibling.blob_id}
+    if "model.bin" not in files:
+        raise ValueError(f"{upstream_repo(model)} has no model.bin")
+    return info.sha, files
+
+
+def verify_upstream(model, expected):
+    """Compare the model directory with the upstream metadata (full hashes). Returns a list of problems."""
+    problems = []
+    path = model_dir(model)
+    for name, meta in sorted(expected.items()):
+        filepath = os.path.join(path, name)
+        if not os.path.isfile(filepath):
+            problems.append(f"{name}: missing")
+            continue
+        size = os.path.getsize(filepath)
+        if meta.get('size') is not None and size != meta['size']:
+            problems.append(f"{name}: size {size} != upstream {meta['size']}")
+        elif meta.get('sha256') and file_sha256(filepath) != meta['sha256']:
+            problems.append(f"{name}: sha256 differs from upstream")
+        elif meta.get('git_sha1') and git_blob_sha1(filepath) != meta['git_sha1']:
+            problems.append(f"{name}: hash differs from upstream")
+    return problems
+
+
+def record_manifest(model):
+    """Record size and sample hash of every file in the model directory."""
+    path = model_dir(model)
+    files = {}
+    for name in sorted(os.listdir(path)):
+        filepath = os.path.join(path, name)
+        if os.path.isfile(filepath):
+            size = os.path.getsize(filepath)
+            files[name] = {"size": size, "sample_sha256": sample_hash(filepath, size)}
+
+    manifest = load_manifest()
+    manifest[f"faster-whisper-{model}"] = {
+        "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "files": files
+    }
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return files
+
+
+def verify_model(model):
+    """Compare the model directory with the manifest. Returns a list of problems."""
+    if not check_model(model):
+        return [f"{model_dir(model)} is missing or incomplete"]
+    entry = load_manifest().get(f"faster-whisper-{model}")
+    if entry is None:
+        return [f"no manifest entry (run: python check_whisper.py manifest {model})"]
+
+    problems = []
+    path = model_dir(model)
+    for name, expected in entry['files'].items():
+        filepath = os.path.join(path, name)
+        if not os.path.isfile(filepath):
+            problems.append(f"{name}: missing")
+            continue
+        size = os.path.getsize(filepath)
+        if size != expected['size']:
+            problems.append(f"{name}: size {size} != {expected['size']}")
+        elif sample_hash(filepath, size) != expected['sample_sha256']:
+            problems.append(f"{name}: hash mismatch")
+    return problems
+
+
+def find_model_root(path):
+    """Directory inside an extracted archive that contains model.bin."""
+    for dirpath, _, filenames in os.walk(path):
+        if "model.bin" in filenames:
+            return dirpath
+    return None
+
+
+def extract_archive(archive, target):
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            bad = zf.testzip()
+            if bad is not None:
+                raise ValueError(f"corrupt archive: CRC mismatch in {bad}")
+            zf.extractall(target)
+        return
+    with tarfile.open(archive) as tf:
+        for member in tf.getmembers():
+            dest = os.path.realpath(os.path.join(target, member.name))
+            if not dest.startswith(os.path.realpath(target) + os.sep) or member.issym() or member.islnk():
+                raise ValueError(f"unsafe path in archive: {member.name}")
+        tf.extractall(target)
+
+
+def strip_archive_suffix(filename):
+    for suffix in (".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".tar", ".zip"):
+        if filename.lower().endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+def model_name_from_source(source, root, staging):
+    """Model name from the directory holding model.bin, or from the archive
+    filename when the files sit at the root of the archive."""
+    if os.path.realpath(root) == os.path.realpath(staging):
+        name = strip_archive_suffix(os.path.basename(source))
     else:
-        sys.exit(1)
+        name = os.path.basename(os.path.normpath(root))
+    name = name[len("faster-whisper-"):] if name.startswith("faster-whisper-") else name
+    if not name or os.sep in name or name in (".", ".."):
+        raise ValueError(f"cannot derive a model name from {source}, pass --name")
+    return name
+
+
+def import_model(source, model=None, upstream=False):
+    """Copy a model directory or archive into voice_clones/models and record its manifest.
+
+    With upstream=True the files are checked against the HuggingFace repo first;
+    on a mismatch the imported directory is removed and nothing is recorded.
+    """
+    with tempfile.TemporaryDirectory(dir=MODELS_DIR) as staging:
+        if os.path.isdir(source):
+            root = find_model_root(source)
+        else:
+            extract_archive(source, staging)
+            root = find_model_root(staging)
+        if root is None:
+            raise ValueError(f"no model.bin found in {source}")
+
+        if model is None:
+            model = model_name_from_source(source, root, staging)
+
+        staged = os.path.join(staging, "model")
+        shutil.copytree(root, staged)
+        target = model_dir(model)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(staged, target)
+
+    if not check_model(model):
+        raise ValueError(f"{target} is incomplete (need {', '.join(REQUIRED_FILES)} and a vocabulary file)")
+    if upstream:
+        _, expected = upstream_files(model)
+        problems = verify_upstream(model, expected)
+        if problems:
+            shutil.rmtree(target)
+            raise ValueError(f"{source} does not match {upstream_repo(model)}: {'; '.join(problems)}")
+    record_manifest(model)
+    return model
+
+
+def download(model):
+    """Download into voice_clones/models/faster-whisper-<model> (same layout the server loads).
+
+    The files are checked against the sizes and hashes of the same upstream
+    revision before the manifest is recorded.
+    """
+    from faster_whisper.utils import download_model
+    revision, expected = upstream_files(model)
+    download_model(model, output_dir=model_dir(model), revision=revision)
+    problems = verify_upstream(model, expected)
+    if problems:
+        raise ValueError(f"download does not match {upstream_repo(model)}@{revision}: {'; '.join(problems)}")
+    record_manifest(model)
+
+
+def rss_mb():
+    """Resident memory of this process in MB (None if unknown)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def bench_one(model, device, compute_type):
+    """Load one model in a fresh process and report load time and resident memory."""
+    from faster_whisper import WhisperModel
+    before = rss_mb()
+    start = time.time()
+    WhisperModel(model_dir(model), device=device, compute_type=compute_type)
+    load_seconds = time.time() - start
+    after = rss_mb()
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "rss_mb": round(after, 1) if after is not None else None,
+        "model_rss_mb": round(after - before, 1) if after is not None and before is not None else None
+    }
+
+
+def bench(models):
+    import multiprocessing
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            whisper_config = json.load(f).get('whisper', {})
+    except (OSError, ValueError):
+        whisper_config = {}
+    device = whisper_config.get('device', 'cpu')
+    compute_type = whisper_config.get('compute_type', 'int8')
+
+    ctx = multiprocessing.get_context('spawn')
+    for model in models:
+        if not check_model(model):
+            print(f"[ERROR] {model}: not installed")
+            continue
+        try:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(bench_one, (model, device, compute_type))
+        except Exception as e:
+            print(f"[ERROR] {model}: load failed: {e}")
+            continue
+        memory = f"{result['model_rss_mb']} MB" if result['model_rss_mb'] is not None else "unknown"
+        print(f"[OK] {model} ({device}/{compute_type}): load {result['load_seconds']}s, resident memory {memory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper model manager")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("check").add_argument("model", nargs="?")
+    sub.add_parser("verify").add_argument("model", nargs="?")
+    sub.add_parser("manifest").add_argument("model", nargs="?")
+    p = sub.add_parser("import")
+    p.add_argument("path")
+    p.add_argument("--name", help="model name, e.g. small (default: taken from the directory or archive name)")
+    p.add_argument("--upstream", action="store_true",
+                   help="check sizes/hashes against the HuggingFace repo before recording the manifest (needs network)")
+    sub.add_parser("download").add_argument("model", nargs="?")
+    sub.add_parser("bench").add_argument("models", nargs="*")
+    args = parser.parse_args()
+
+    command = args.command or "check"
+    model = getattr(args, "model", None) or configured_model()
+
+    if command == "check":
+        if not check_model(model):
+            return 1
+        if f"faster-whisper-{model}" in load_manifest():
+            problems = verify_model(model)
+            if problems:
+                for problem in problems:
+                    print(f"[ERROR] {model}: {problem}")
+                return 1
+            print(f"[OK] Whisper model found and matches manifest: {model}")
+            return 0
+        print(f"[OK] Whisper model found: {model}")
+        return 0
+
+    if command == "verify":
+        problems = verify_model(model)
+        if problems:
+            for problem in problems:
+                print(f"[ERROR] {model}: {problem}")
+            return 1
+        print(f"[OK] {model} matches manifest")
+        return 0
+
+    if command == "manifest":
+        if not check_model(model):
+            print(f"[ERROR] {model_dir(model)} is missing or incomplete")
+            return 1
+        files = record_manifest(model)
+        print(f"[OK] manifest recorded for {model} ({len(files)} files)")
+        return 0
+
+    if command == "import":
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        try:
+            name = import_model(args.path, args.name, upstream=args.upstream)
+        except Exception as e:
+            print(f"[ERROR] import failed: {e}")
+            return 1
+        print(f"[OK] imported {name} -> {model_dir(name)}")
+        return 0
+
+    if command == "download":
+        try:
+            download(model)
+        except Exception as e:
+            print(f"[ERROR] download failed: {e}")
+            return 1
+        print(f"[OK] downloaded {model} -> {model_dir(model)}")
+        return 0
+
+    if command == "bench":
+        bench(args.models or [configured_model()])
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import voice_clone_flask  # noqa: E402
+
+
+@pytest.fixture
+def vc():
+    return voice_clone_flask
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """用内存中的字典代替 config.json，测试里直接修改即可生效"""
+    data = {
+        "tts": {"api_key": "sk-test", "base_url": "https://api.example.com/v1", "model": "FunAudioLLM/CosyVoice2-0.5B"},
+        "whisper": {},
+        "max_subtitle_chars": 15
+    }
+    monkeypatch.setattr(voice_clone_flask, "get_config", lambda: copy.deepcopy(data))
+    return data
+
+
+class FakeSegment:
+    def __init__(self, start, end, text):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.words = None
+
+
+class FakeWhisperModel:
+    """代替 faster_whisper.WhisperModel，记录每次 transcribe 的参数"""
+
+    def __init__(self, texts=("今天天气", "很好")):
+        self.texts = texts
+        self.calls = []
+
+    def transcribe(self, audio, **kwargs):
+        self.calls.append(kwargs)
+        segments = [FakeSegment(float(i), float(i + 1), text) for i, text in enumerate(self.texts)]
+        info = type("Info", (), {"language": "zh", "duration": float(len(self.texts))})()
+        return iter(segments), info
+
+
+@pytest.fixture
+def whisper_model(vc, config):
+    """注册到模型注册表的假模型（关闭批量识别和多进程识别）"""
+    config['whisper'].update(batch_size=0, parallel_workers=0)
+    model = FakeWhisperModel()
+    key = ("small", "cpu", "int8")
+    vc.WHISPER_MODEL_KEYS[model] = key
+    yield model
+    vc.WHISPER_MODEL_KEYS.pop(model, None)
+
+
+@pytest.fixture
+def transcript_cache(vc, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "TRANSCRIPT_CACHE_DB", tmp_path / "transcripts.db")
+    monkeypatch.setattr(vc, "TRANSCRIPT_CACHE_STATS", {"hits": 0, "misses": 0, "evictions": 0})
+    return vc.TRANSCRIPT_CACHE_DB
+
+
+@pytest.fixture
+def wav_bytes():
+    """一秒 16kHz 单声道静音 WAV"""
+    import io
+    import wave
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\0\0" * 16000)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def model_loader(vc, config, monkeypatch):
+    """用假模型代替 load_whisper_model，记录每次加载的 (模型, 设备, 精度, 线程数)"""
+    loads = []
+
+    def load(model_size, device, compute_type, settings):
+        loads.append((model_size, device, compute_type, settings['cpu_threads']))
+        return FakeWhisperModel()
+
+    monkeypatch.setattr(vc, "load_whisper_model", load)
+    monkeypatch.setattr(vc, "WHISPER_MODELS", vc.OrderedDict())
+    monkeypatch.setattr(vc, "WHISPER_LOAD_LOCKS", {})
+    monkeypatch.setattr(vc, "WHISPER_ACTIVE_KEY", None)
+    monkeypatch.setattr(vc, "WHISPER_SWAPPING", set())
+    monkeypatch.setattr(vc, "start_whisper_idle_monitor", lambda: None)
+    return loads
@@ -0,0 +1,66 @@
+import pytest
+
+
+def word(text, start, end):
+    return {"word": text, "start": start, "end": end}
+
+
+def test_align_text_with_words_uses_recognised_times(vc):
+    words = [word("今天", 0.0, 0.5), word("天气", 0.5, 1.0), word("很好", 1.2, 2.0)]
+    segments = vc.align_text_with_words(["今天天气", "很好"], words)
+    assert [s['text'] for s in segments] == ["今天天气", "很好"]
+    assert segments[0]['start'] == pytest.approx(0.0)
+    assert segments[0]['end'] == pytest.approx(1.0)
+    assert segments[1]['start'] == pytest.approx(1.2)
+    assert segments[1]['end'] == pytest.approx(2.0)
+
+
+def test_align_text_with_words_interpolates_misrecognised_chars(vc):
+    # “天气”被识别成了“天器”，“器”不匹配，时间在前后匹配点之间插值
+    words = [word("今天", 0.0, 0.5), word("天器", 0.5, 1.0), word("很好", 1.0, 1.5)]
+    segments = vc.align_text_with_words(["今天天气", "很好"], words)
+    assert segments[0]['end'] <= segments[1]['start']
+    assert segments[1]['end'] == pytest.approx(1.5)
+
+
+def test_align_text_with_words_rejects_unrelated_text(vc):
+    assert vc.align_text_with_words(["完全不同的内容"], [word("hello", 0.0, 1.0)]) is None
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+        self.warmed = 0
+
+    def transcribe(self, audio, **kwargs):
+        self.warmed += 1
+        return iter([]), None
+
+
+@pytest.fixture
+def models(vc, config, monkeypatch):
+    """按模型名返回假模型，记录加载了哪些模型"""
+    config['whisper'] = {"model": "medium", "align_model": "tiny", "alignment": "words"}
+    loaded = {}
+
+    def get_whisper_model(model_size=None, **kwargs):
+        name = model_size or "medium"
+        return loaded.setdefault(name, FakeModel(name))
+
+    monkeypatch.setattr(vc, "get_whisper_model", get_whisper_model)
+    monkeypatch.setattr(vc, "WHISPER_READINESS", {"state": "idle"})
+    return loaded
+
+
+def test_preload_warms_align_model(vc, config, models):
+    vc.preload_whisper_model()
+    assert vc.WHISPER_READINESS['state'] == 'ready'
+    assert models['medium'].warmed == 1
+    assert models['tiny'].warmed == 1
+
+
+def test_preload_skips_align_model_for_segment_alignment(vc, config, models):
+    config['whisper']['alignment'] = 'segments'
+    vc.preload_whisper_model()
+    assert vc.WHISPER_READINESS['state'] == 'ready'
+    assert 'tiny' not in models
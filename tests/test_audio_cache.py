@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def audio_cache(vc, config, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "AUDIO_CACHE_DIR", tmp_path / "audio")
+    monkeypatch.setattr(vc, "AUDIO_CACHE_STATS", {"hits": 0, "misses": 0, "evictions": 0})
+    return vc.AUDIO_CACHE_DIR
+
+
+def payload(**fields):
+    data = {"model": "m", "voice": "v", "speed": 1.0, "sample_rate": 32000, "response_format": "mp3", "input": "你好 世界"}
+    data.update(fields)
+    return data
+
+
+def test_cache_key_ignores_whitespace_but_not_settings(vc):
+    key = vc.audio_cache_key(payload())
+    assert vc.audio_cache_key(payload(input="你好　世界\n")) == key
+    assert vc.audio_cache_key(payload(speed="1")) == key
+    assert vc.audio_cache_key(payload(voice="other")) != key
+    assert vc.audio_cache_key(payload(speed=1.2)) != key
+    assert vc.audio_cache_key(payload(input="你好")) != key
+
+
+def test_cache_evicts_least_recently_used(vc, audio_cache):
+    vc.audio_cache_put("a", b"x" * 600, max_mb=1)
+    vc.audio_cache_put("b", b"x" * 600, max_mb=1)
+    os.utime(audio_cache / "a.mp3", (1, 1))
+    os.utime(audio_cache / "b.mp3", (2, 2))
+    assert vc.audio_cache_get("a") is not None  # 命中后变成最近使用
+
+    vc.audio_cache_put("c", b"x" * 600, max_mb=1200 / 1024 / 1024)
+
+    assert sorted(p.name for p in audio_cache.iterdir()) == ["a.mp3", "c.mp3"]
+    assert vc.AUDIO_CACHE_STATS['evictions'] == 1
+
+
+def test_synthesize_speech_is_served_from_cache(vc, audio_cache, monkeypatch):
+    calls = []
+
+    class Response:
+        status_code = 200
+        content = b"audio"
+
+    def request(*args, **kwargs):
+        calls.append(kwargs['json']['input'])
+        return Response()
+
+    monkeypatch.setattr(vc, "upstream_request", request)
+
+    assert vc.synthesize_speech("https://api", "sk", payload()) == (True, b"audio")
+    assert vc.synthesize_speech("https://api", "sk", payload(input="你好世界")) == (True, b"audio")
+    assert calls == ["你好 世界"]
+    assert vc.AUDIO_CACHE_STATS['hits'] == 1
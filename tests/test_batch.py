@@ -0,0 +1,90 @@
+import io
+import json
+import zipfile
+
+
+def test_parse_batch_items_formats(vc):
+    assert vc.parse_batch_items('[{"text": "a"}, {"text": "b"}]') == [{"text": "a"}, {"text": "b"}]
+    assert vc.parse_batch_items('{"text": "a"}\n{"text": "b"}\n', 'items.jsonl') == [{"text": "a"}, {"text": "b"}]
+    assert vc.parse_batch_items('{"items": [{"text": "a"}]}') == [{"text": "a"}]
+    assert vc.parse_batch_items('﻿text,voice\n你好,alex\n', 'items.csv') == [{"text": "你好", "voice": "alex"}]
+
+
+def test_batch_option_keeps_explicit_zero(vc):
+    assert vc.batch_option({"retries": 0}, "retries", 3) == 0
+    assert vc.batch_option({"retries": "0"}, "retries", 3) == 0
+    assert vc.batch_option({"retries": None}, "retries", 3) == 3
+    assert vc.batch_option({"retries": ""}, "retries", 3) == 3
+    assert vc.batch_option({}, "retries", 3) == 3
+
+
+def test_batch_retries_zero_runs_once(vc, config, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "OUTPUT_DIR", tmp_path)
+    calls = []
+
+    def pipeline(data):
+        calls.append(data['text'])
+        return {"success": False, "message": "上游错误"}
+
+    monkeypatch.setattr(vc, "run_tts_pipeline", pipeline)
+    client = vc.app.test_client()
+    resp = client.post('/api/tts/batch', json={"items": [{"text": "你好"}], "retries": 0})
+
+    assert resp.status_code == 200
+    assert calls == ["你好"]
+    assert resp.headers['X-Batch-Failed'] == '1'
+    report = json.loads(zipfile.ZipFile(io.BytesIO(resp.data)).read("report.json"))
+    assert report['items'][0]['status'] == 'failed'
+
+
+def test_batch_retry_only_reruns_failed_items(vc, config, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "OUTPUT_DIR", tmp_path)
+    calls = []
+    monkeypatch.setattr(vc, "run_tts_pipeline", lambda data: calls.append(data['text']) or {"success": True})
+    batch = {
+        "id": "abc123",
+        "items": [
+            {"index": 1, "request": {"text": "好"}, "status": "done", "message": "", "attempts": 1, "result": {}},
+            {"index": 2, "request": {"text": "坏"}, "status": "failed", "message": "", "attempts": 1, "result": None}
+        ]
+    }
+    vc.save_batch_state(batch)
+
+    resp = vc.app.test_client().post('/api/tts/batch/abc123/retry')
+
+    assert resp.status_code == 200
+    assert calls == ["坏"]
+    assert vc.load_batch_state("abc123")['items'][1]['status'] == 'done'
+
+
+def test_batch_retry_errors_return_json(vc, config, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "OUTPUT_DIR", tmp_path)
+    vc.save_batch_state({"id": "abc", "items": []})
+
+    def broken(*args, **kwargs):
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(vc, "run_batch", broken)
+    resp = vc.app.test_client().post('/api/tts/batch/abc/retry')
+
+    assert resp.get_json() == {"success": False, "message": "批量重试失败: 磁盘已满"}
+
+
+def test_batch_item_model_names_map_to_pipeline_models(vc):
+    assert vc.batch_item_to_request({"text": "a"})['model'] == "cosyvoice"
+    assert vc.batch_item_to_request({"text": "a", "model": "IndexTeam/IndexTTS-2"})['model'] == "indextts2"
+    assert vc.batch_item_to_request({"text": "a", "model": "fnlp/MOSS-TTSD-v0.5"})['model'] == "moss"
+    assert vc.batch_item_to_request({"text": "a", "model": "IndexTTS2"})['model'] == "indextts2"
+
+
+def test_batch_item_with_unknown_model_fails_without_synthesis(vc, config, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "OUTPUT_DIR", tmp_path)
+    calls = []
+    monkeypatch.setattr(vc, "run_tts_pipeline", lambda data: calls.append(data) or {"success": True, "message": "ok"})
+
+    resp = vc.app.test_client().post('/api/tts/batch', json={"items": [{"text": "你好", "model": "cosyvoce"}], "retries": 0})
+
+    report = json.loads(zipfile.ZipFile(io.BytesIO(resp.data)).read("report.json"))
+    assert calls == []
+    assert report['items'][0]['status'] == 'failed'
+    assert "不支持的模型: cosyvoce" in report['items'][0]['message']
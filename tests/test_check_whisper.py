@@ -0,0 +1,163 @@
+import tarfile
+import zipfile
+
+import pytest
+
+import check_whisper
+
+MODEL_FILES = ["model.bin", "config.json", "tokenizer.json", "vocabulary.json"]
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    models.mkdir()
+    monkeypatch.setattr(check_whisper, "MODELS_DIR", str(models))
+    monkeypatch.setattr(check_whisper, "MANIFEST_FILE", str(models / "manifest.json"))
+    return models
+
+
+def make_model(directory):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in MODEL_FILES:
+        (directory / name).write_bytes(name.encode() * 1000)
+    return directory
+
+
+def test_import_zip_with_files_at_root_uses_archive_name(models_dir, tmp_path):
+    source = make_model(tmp_path / "src")
+    archive = tmp_path / "faster-whisper-small.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name in MODEL_FILES:
+            zf.write(source / name, name)
+
+    assert check_whisper.import_model(str(archive)) == "small"
+    assert check_whisper.check_model("small")
+    assert check_whisper.verify_model("small") == []
+
+
+def test_import_tarball_with_model_directory(models_dir, tmp_path):
+    source = make_model(tmp_path / "faster-whisper-tiny")
+    archive = tmp_path / "bundle.tar.gz"
+    with tarfile.open(archive, "w:gz") as tf:
+        tf.add(source, "faster-whisper-tiny")
+
+    assert check_whisper.import_model(str(archive)) == "tiny"
+    assert check_whisper.check_model("tiny")
+
+
+def test_import_directory_with_explicit_name(models_dir, tmp_path):
+    source = make_model(tmp_path / "download")
+    assert check_whisper.import_model(str(source), "medium") == "medium"
+    assert check_whisper.check_model("medium")
+
+
+def test_import_rejects_unsafe_tar_paths(models_dir, tmp_path):
+    evil = tmp_path / "evil.txt"
+    evil.write_text("x")
+    archive = tmp_path / "evil.tar"
+    with tarfile.open(archive, "w") as tf:
+        tf.add(evil, "../evil.txt")
+    with pytest.raises(ValueError):
+        check_whisper.import_model(str(archive))
+
+
+def test_verify_detects_changed_file(models_dir):
+    make_model(models_dir / "faster-whisper-base")
+    check_whisper.record_manifest("base")
+    (models_dir / "faster-whisper-base" / "model.bin").write_bytes(b"corrupted" * 1000)
+    problems = check_whisper.verify_model("base")
+    assert problems and problems[0].startswith("model.bin")
+
+
+def test_check_requires_a_vocabulary_file(models_dir):
+    model = make_model(models_dir / "faster-whisper-base")
+    (model / "vocabulary.json").unlink()
+    assert not check_whisper.check_model("base")
+
+
+def upstream_metadata(source):
+    """上游仓库元数据：model.bin 按 LFS sha256，其余按 git blob id"""
+    files = {}
+    for name in MODEL_FILES:
+        path = source / name
+        if name == "model.bin":
+            files[name] = {"size": path.stat().st_size, "sha256": check_whisper.file_sha256(str(path))}
+        else:
+            files[name] = {"size": path.stat().st_size, "git_sha1": check_whisper.git_blob_sha1(str(path))}
+    return files
+
+
+@pytest.fixture
+def fake_download(models_dir, tmp_path, monkeypatch):
+    import faster_whisper.utils
+
+    reference = make_model(tmp_path / "upstream")
+    monkeypatch.setattr(check_whisper, "upstream_files", lambda model: ("abc123", upstream_metadata(reference)))
+    state = {"truncate": False, "revision": None}
+
+    def download_model(model, output_dir=None, revision=None):
+        state['revision'] = revision
+        target = make_model(tmp_path / "models" / f"faster-whisper-{model}")
+        if state['truncate']:
+            data = (target / "model.bin").read_bytes()
+            (target / "model.bin").write_bytes(data[:len(data) // 2])
+        return str(target)
+
+    monkeypatch.setattr(faster_whisper.utils, "download_model", download_model)
+    return state
+
+
+def test_download_checks_upstream_before_recording(models_dir, fake_download):
+    check_whisper.download("small")
+
+    assert fake_download['revision'] == "abc123"
+    assert "faster-whisper-small" in check_whisper.load_manifest()
+
+
+def test_truncated_download_is_not_recorded(models_dir, fake_download):
+    fake_download['truncate'] = True
+
+    with pytest.raises(ValueError, match="model.bin: size"):
+        check_whisper.download("small")
+    assert check_whisper.load_manifest() == {}
+
+
+def test_import_with_upstream_rejects_modified_files(models_dir, tmp_path, monkeypatch):
+    reference = make_model(tmp_path / "upstream")
+    monkeypatch.setattr(check_whisper, "upstream_files", lambda model: ("abc123", upstream_metadata(reference)))
+    source = make_model(tmp_path / "faster-whisper-small")
+    (source / "tokenizer.json").write_bytes(b"x" * len((reference / "tokenizer.json").read_bytes()))
+
+    with pytest.raises(ValueError, match="tokenizer.json"):
+        check_whisper.import_model(str(source), upstream=True)
+    assert not (models_dir / "faster-whisper-small").exists()
+    assert check_whisper.load_manifest() == {}
+
+
+def test_import_rejects_corrupt_zip(models_dir, tmp_path):
+    source = make_model(tmp_path / "src")
+    archive = tmp_path / "faster-whisper-small.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name in MODEL_FILES:
+            zf.write(source / name, name)
+    data = bytearray(archive.read_bytes())
+    data[40] ^= 0xFF  # 改坏第一个文件的内容
+    archive.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError, match="corrupt archive"):
+        check_whisper.import_model(str(archive))
+    assert check_whisper.load_manifest() == {}
+
+
+def test_default_check_verifies_against_manifest(models_dir, monkeypatch, capsys):
+    make_model(models_dir / "faster-whisper-base")
+    monkeypatch.setattr(check_whisper, "configured_model", lambda: "base")
+    monkeypatch.setattr("sys.argv", ["check_whisper.py"])
+    assert check_whisper.main() == 0
+
+    check_whisper.record_manifest("base")
+    (models_dir / "faster-whisper-base" / "model.bin").write_bytes(b"corrupted" * 1000)
+
+    assert check_whisper.main() == 1
+    assert "[ERROR] base: model.bin" in capsys.readouterr().out
@@ -0,0 +1,47 @@
+def test_split_text_into_chunks_respects_limit_and_sentences(vc):
+    text = "第一句话在这里。" * 10
+    chunks = vc.split_text_into_chunks(text, chunk_chars=20)
+
+    assert "".join(chunks) == text
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert all(chunk.endswith("。") for chunk in chunks)
+
+
+def test_split_text_into_chunks_repeats_instruction(vc):
+    chunks = vc.split_text_into_chunks("用开心的语气说<|endofprompt|>" + "今天天气很好。" * 6, chunk_chars=14)
+
+    assert len(chunks) == 3
+    assert all(chunk.startswith("用开心的语气说<|endofprompt|>") for chunk in chunks)
+
+
+def test_synthesize_chunked_merges_parts_in_order(vc, tmp_path, monkeypatch):
+    import time
+
+    def synthesize(base_url, api_key, payload):
+        # 前面的块更慢，保证并行完成顺序和原顺序不同
+        time.sleep(0.02 * (3 - int(payload['input'])))
+        return True, payload['input'].encode()
+
+    monkeypatch.setattr(vc, "synthesize_speech", synthesize)
+    output = tmp_path / "out.mp3"
+
+    ok, error = vc.synthesize_chunked("https://api", "sk", {"model": "m"}, ["0", "1", "2"], str(output), workers=3)
+
+    assert ok, error
+    assert output.read_bytes() == b"012"
+    assert list(tmp_path.iterdir()) == [output]
+
+
+def test_synthesize_chunked_fails_when_any_part_fails(vc, tmp_path, monkeypatch):
+    def synthesize(base_url, api_key, payload):
+        if payload['input'] == "1":
+            return False, "上游错误"
+        return True, b"audio"
+
+    monkeypatch.setattr(vc, "synthesize_speech", synthesize)
+    output = tmp_path / "out.mp3"
+
+    ok, error = vc.synthesize_chunked("https://api", "sk", {}, ["0", "1", "2"], str(output))
+
+    assert not ok and error == "上游错误"
+    assert list(tmp_path.iterdir()) == []
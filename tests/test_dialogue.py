@@ -0,0 +1,44 @@
+def test_parse_dialogue_turns(vc):
+    assert vc.parse_dialogue_turns("[S1]你好。[S2]你好呀！[S1]  ") == [("S1", "你好。"), ("S2", "你好呀！")]
+
+
+def test_text_before_first_marker_goes_to_s1(vc):
+    assert vc.parse_dialogue_turns("开场白。[S2]我来回答。") == [("S1", "开场白。"), ("S2", "我来回答。")]
+
+
+def test_plain_text_is_not_a_dialogue(vc):
+    assert vc.parse_dialogue_turns("没有说话人标记的文本") == []
+
+
+def test_failed_turn_is_retried_alone(vc, config, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "OUTPUT_DIR", tmp_path)
+    config['moss'] = {"turn_workers": 2, "turn_retries": 1}
+    attempts = []
+
+    def synthesize(base_url, api_key, payload):
+        attempts.append(payload['input'])
+        if payload['input'] == "[S2]第二句" and attempts.count("[S2]第二句") == 1:
+            return False, "503"
+        return True, payload['input'].encode('utf-8')
+
+    monkeypatch.setattr(vc, "synthesize_speech", synthesize)
+    # S1 的轮次 2 秒，S2 的轮次 3 秒
+    monkeypatch.setattr(vc, "get_mp3_duration", lambda path: 2.0 if b"[S1]" in open(path, 'rb').read() else 3.0)
+
+    turns = [("S1", "第一句"), ("S2", "第二句")]
+    payload = {"model": "fnlp/MOSS-TTSD-v0.5", "voice": "v"}
+    result = vc.run_dialogue_tts(turns, payload, {}, "https://api.example.com/v1", "sk", "tts_test",
+                                 lambda *args, **kwargs: None)
+
+    assert result['success']
+    assert attempts.count("[S1]第一句") == 1
+    assert attempts.count("[S2]第二句") == 2
+    assert result['turns'] == [
+        {"speaker": "S1", "text": "第一句", "start": 0.0, "end": 2.0},
+        {"speaker": "S2", "text": "第二句", "start": 2.0, "end": 5.0},
+    ]
+    assert [(s['speaker'], s['text'], s['start'], s['end']) for s in result['segments']] == [
+        ("S1", "第一句", 0.0, 2.0), ("S2", "第二句", 2.0, 5.0)
+    ]
+    assert (tmp_path / "tts_test.mp3").read_bytes() == "[S1]第一句[S2]第二句".encode('utf-8')
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["tts_test.json", "tts_test.mp3", "tts_test.srt"]
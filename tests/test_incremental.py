@@ -0,0 +1,75 @@
+import os
+import time
+
+
+def write_segment(directory, name, size, age_days=0):
+    path = directory / name
+    path.write_bytes(b"\0" * size)
+    mtime = time.time() - age_days * 86400
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_evict_segments_over_budget_oldest_first(vc, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "SEGMENTS_DIR", tmp_path)
+    old = write_segment(tmp_path, "old.mp3", 600 * 1024, age_days=2)
+    mid = write_segment(tmp_path, "mid.mp3", 600 * 1024, age_days=1)
+    new = write_segment(tmp_path, "new.mp3", 600 * 1024)
+
+    removed = vc.evict_segment_files(set(), max_mb=1.5, max_age_days=0)
+
+    assert removed == 1
+    assert not old.exists() and mid.exists() and new.exists()
+
+
+def test_evict_segments_by_age_keeps_current_generation(vc, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "SEGMENTS_DIR", tmp_path)
+    stale = write_segment(tmp_path, "stale.mp3", 10, age_days=40)
+    in_use = write_segment(tmp_path, "in_use.mp3", 10, age_days=40)
+    fresh = write_segment(tmp_path, "fresh.mp3", 10)
+
+    vc.evict_segment_files({"in_use.mp3"}, max_mb=0, max_age_days=30)
+
+    assert not stale.exists()
+    assert in_use.exists() and fresh.exists()
+
+
+def test_load_generation_manifest_rejects_bad_ids(vc):
+    assert vc.load_generation_manifest("../config") is None
+    assert vc.load_generation_manifest("") is None
+
+
+def test_incremental_tts_resynthesizes_only_edited_sentences(vc, config, tmp_path, monkeypatch):
+    config['audio_cache'] = {"enabled": False}
+    monkeypatch.setattr(vc, "SEGMENTS_DIR", tmp_path / "segments")
+    monkeypatch.setattr(vc, "OUTPUT_DIR", tmp_path)
+    synthesized = []
+
+    def synthesize(base_url, api_key, payload):
+        synthesized.append(payload['input'])
+        return True, payload['input'].encode('utf-8')
+
+    # 每个字 1 秒，每句一段字幕
+    monkeypatch.setattr(vc, "synthesize_speech", synthesize)
+    monkeypatch.setattr(vc, "get_mp3_duration", lambda path: float(len(open(path, 'rb').read().decode('utf-8'))))
+    monkeypatch.setattr(vc, "ai_split_text", lambda text, max_chars=15: [text])
+    monkeypatch.setattr(vc, "time_text_segments", lambda segments, path, words=None, profile=None: [
+        {"text": segments[0], "start": 0.0, "end": vc.get_mp3_duration(path)}
+    ])
+    payload = {"model": "m", "voice": "v", "speed": 1.0, "sample_rate": 32000}
+    report = lambda *args, **kwargs: None
+
+    first = vc.run_incremental_tts("第一句。第二句。第三句。", payload, "https://api", "sk", "tts_1", None, report)
+    assert first['synthesized'] == 3
+    assert [s['start'] for s in first['segments']] == [0.0, 4.0, 8.0]
+
+    synthesized.clear()
+    second = vc.run_incremental_tts("第一句。第二句改了。第三句。", payload, "https://api", "sk", "tts_2", "tts_1", report)
+
+    assert synthesized == ["第二句改了。"]
+    assert (second['reused'], second['synthesized']) == (2, 1)
+    assert [(s['text'], s['start'], s['end']) for s in second['segments']] == [
+        ("第一句。", 0.0, 4.0), ("第二句改了。", 4.0, 10.0), ("第三句。", 10.0, 14.0)
+    ]
+    assert "00:00:10,000 --> 00:00:14,000" in (tmp_path / "tts_2.srt").read_text(encoding='utf-8')
+    assert (tmp_path / "tts_2.mp3").read_bytes().decode('utf-8') == "第一句。第二句改了。第三句。"
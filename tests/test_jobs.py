@@ -0,0 +1,82 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture
+def jobs(vc, config, monkeypatch):
+    """独立的任务表和线程池"""
+    monkeypatch.setattr(vc, "JOBS", {})
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(vc, "get_job_executor", lambda: executor)
+    yield vc.JOBS
+    executor.shutdown(wait=True)
+
+
+def wait_for_job(client, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").get_json()['job']
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("任务没有结束")
+
+
+def test_job_reports_stages_and_result(vc, jobs, monkeypatch):
+    def pipeline(data, progress=None):
+        progress("tts", "合成中")
+        progress("whisper", "识别中")
+        return {"success": True, "message": "完成", "audio_file": "a.mp3"}
+
+    monkeypatch.setattr(vc, "run_tts_pipeline", pipeline)
+    client = vc.app.test_client()
+
+    resp = client.post("/api/jobs/tts", json={"text": "你好", "voice_value": "alex"}).get_json()
+    job = wait_for_job(client, resp['job_id'])
+
+    assert job['status'] == "done"
+    assert job['progress'] == 100
+    assert job['result']['audio_file'] == "a.mp3"
+
+    events = client.get(resp['events_url']).get_data(as_text=True)
+    last = json.loads(events.strip().split("\n\n")[-1][len("data: "):])
+    assert last['status'] == "done"
+
+
+def test_job_failure_is_reported(vc, jobs, monkeypatch):
+    def pipeline(data, progress=None):
+        raise RuntimeError("上游错误")
+
+    monkeypatch.setattr(vc, "run_tts_pipeline", pipeline)
+    client = vc.app.test_client()
+
+    job_id = client.post("/api/jobs/tts", json={"text": "你好", "voice_value": "alex"}).get_json()['job_id']
+    job = wait_for_job(client, job_id)
+
+    assert job['status'] == "failed"
+    assert "上游错误" in job['message']
+
+
+def test_job_submission_is_validated(vc, jobs):
+    client = vc.app.test_client()
+    assert client.post("/api/jobs/tts", json={"text": " ", "voice_value": "alex"}).get_json()['success'] is False
+    assert client.post("/api/jobs/tts", json={"text": "你好"}).get_json()['success'] is False
+    assert client.get("/api/jobs/missing").status_code == 404
+    assert jobs == {}
+
+
+def test_create_job_drops_oldest_finished_jobs(vc, jobs, monkeypatch):
+    monkeypatch.setattr(vc, "MAX_FINISHED_JOBS", 2)
+    finished = [vc.create_job("tts") for _ in range(3)]
+    for job in finished:
+        vc.update_job(job['id'], status="done")
+        time.sleep(0.001)
+
+    vc.create_job("tts")
+
+    assert finished[0]['id'] not in jobs
+    assert finished[2]['id'] in jobs
+
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def pipeline(vc, config, tmp_path, monkeypatch):
+    """run_tts_pipeline 用到的合成、分割、Whisper 全部换成假实现"""
+    config['whisper']['alignment'] = 'segments'
+    monkeypatch.setattr(vc, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(vc, "get_profile_model", lambda profile: None)
+    monkeypatch.setattr(vc, "time_text_segments", lambda segments, path, words=None, profile=None: [
+        {"text": text, "start": float(i), "end": float(i + 1)} for i, text in enumerate(segments)
+    ])
+    events = {"synth_started": threading.Event(), "split_done": threading.Event(), "overlapped": None}
+
+    def synthesize(base_url, api_key, payload, output_path, on_start=None):
+        events['synth_started'].set()
+        # 分割在合成结束前完成，说明两者同时进行
+        events['overlapped'] = events['split_done'].wait(timeout=2)
+        with open(output_path, 'wb') as f:
+            f.write(b"audio")
+        return True, ""
+
+    def split(text, max_chars=15):
+        events['synth_started'].wait(timeout=2)
+        events['split_done'].set()
+        return ["今天天气", "很好"]
+
+    monkeypatch.setattr(vc, "synthesize_speech_to_file", synthesize)
+    monkeypatch.setattr(vc, "ai_split_text", split)
+    return events
+
+
+def test_split_runs_while_audio_is_synthesized(vc, pipeline):
+    result = vc.run_tts_pipeline({"text": "今天天气很好", "voice_type": "preset", "voice_value": "alex"})
+
+    assert result['success'], result
+    assert pipeline['overlapped'] is True
+    assert [item['text'] for item in result['segments']] == ["今天天气", "很好"]
+
+
+def test_pipeline_reports_stages_in_order(vc, pipeline):
+    stages = []
+    vc.run_tts_pipeline(
+        {"text": "今天天气很好", "voice_type": "preset", "voice_value": "alex"},
+        progress=lambda stage, message, **fields: stages.append(stage)
+    )
+
+    order = [stage for i, stage in enumerate(stages) if i == 0 or stages[i - 1] != stage]
+    assert order == ["tts", "whisper", "align", "subtitle"]
@@ -0,0 +1,59 @@
+import pytest
+
+
+@pytest.fixture
+def readiness(vc, config, model_loader, monkeypatch):
+    config['whisper'].update(model="small", alignment="segments")
+    state = {"state": "idle", "started_at": None, "ready_at": None,
+             "load_seconds": None, "warmup_seconds": None, "error": None}
+    monkeypatch.setattr(vc, "WHISPER_READINESS", state)
+    return state
+
+
+def test_ready_endpoint_is_503_until_preload_finishes(vc, readiness, model_loader):
+    client = vc.app.test_client()
+    assert client.get("/api/health/ready").status_code == 503
+
+    vc.preload_whisper_model()
+
+    resp = client.get("/api/health/ready")
+    assert resp.status_code == 200
+    assert resp.get_json()['whisper']['state'] == "ready"
+    assert model_loader == [("small", "cpu", "int8", 0)]
+    assert vc.WHISPER_MODELS[("small", "cpu", "int8", 0)]['model'].calls  # 做过一次预热识别
+
+
+def test_failed_preload_reports_the_error(vc, readiness, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("模型文件不完整")
+
+    monkeypatch.setattr(vc, "load_whisper_model", fail)
+
+    vc.preload_whisper_model()
+
+    resp = vc.app.test_client().get("/api/health/ready")
+    assert resp.status_code == 503
+    assert resp.get_json()['whisper']['state'] == "failed"
+    assert resp.get_json()['whisper']['error']
+
+
+def test_without_preload_the_instance_is_ready_and_loading_marks_it_ready(vc, config, readiness):
+    config['whisper']['preload'] = False
+    client = vc.app.test_client()
+    assert client.get("/api/health/ready").status_code == 200
+
+    vc.get_whisper_model()
+
+    resp = client.get("/api/health/ready")
+    assert resp.status_code == 200
+    assert resp.get_json()['whisper']['state'] == "ready"
+    assert resp.get_json()['whisper']['model_resident'] is True
+
+
+def test_on_demand_load_recovers_from_a_failed_preload(vc, readiness, model_loader):
+    readiness.update(state="failed", error="模型文件不完整")
+
+    vc.get_whisper_model()
+
+    assert readiness['state'] == "ready"
+    assert readiness['error'] is None
@@ -0,0 +1,215 @@
+import io
+
+import numpy as np
+import pytest
+import requests
+
+NODE_A = "http://node-a:7860"
+NODE_B = "http://node-b:7860"
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        if self.data is None:
+            raise ValueError("not json")
+        return self.data
+
+
+class NodeSession:
+    """把请求转给 Flask test_client，模拟运行在某个地址上的节点"""
+
+    def __init__(self, client):
+        self.client = client
+        self.posts = 0
+
+    def get(self, url, headers=None, timeout=None):
+        resp = self.client.get(url.split(":7860", 1)[1], headers=headers)
+        return FakeResponse(resp.status_code, resp.get_json())
+
+    def post(self, url, data=None, files=None, headers=None, timeout=None):
+        self.posts += 1
+        form = dict(data or {})
+        for name, (filename, content, _) in (files or {}).items():
+            form[name] = (io.BytesIO(content), filename)
+        resp = self.client.post(url.split(":7860", 1)[1], data=form, headers=headers)
+        return FakeResponse(resp.status_code, resp.get_json())
+
+
+class BrokenSession:
+    """连不上或返回固定错误的节点"""
+
+    def __init__(self, status_code=None, message="识别失败"):
+        self.status_code = status_code
+        self.message = message
+        self.posts = 0
+
+    def get(self, url, headers=None, timeout=None):
+        raise requests.exceptions.ConnectionError("connection refused")
+
+    def post(self, url, data=None, files=None, headers=None, timeout=None):
+        self.posts += 1
+        if self.status_code is None:
+            raise requests.exceptions.ConnectionError("connection refused")
+        return FakeResponse(self.status_code, {"success": False, "message": self.message})
+
+
+@pytest.fixture
+def remote(vc, config, model_loader, transcript_cache, monkeypatch):
+    """两个节点都指向本进程的 Flask 应用（开启 serve），状态为健康"""
+    config['whisper'].update(
+        batch_size=0, parallel_workers=0,
+        remote={"serve": True, "token": "secret", "nodes": [NODE_A, NODE_B]}
+    )
+    monkeypatch.setattr(vc, "REMOTE_NODES", {})
+    monkeypatch.setattr(vc, "REMOTE_MONITOR", object())  # 不启动后台健康检查
+    client = vc.app.test_client()
+    sessions = {NODE_A: NodeSession(client), NODE_B: NodeSession(client)}
+    monkeypatch.setattr(vc, "REMOTE_SESSIONS", sessions)
+    for url in (NODE_A, NODE_B):
+        vc.mark_remote_node(url, True)
+    return sessions
+
+
+def test_worker_token_refuses_to_serve_without_a_configured_token(vc, config):
+    config['whisper']['remote'] = {"serve": True, "token": ""}
+    resp = vc.app.test_client().get("/api/worker/health")
+    assert resp.status_code == 403
+    assert "whisper.remote.token" in resp.get_json()['message']
+
+
+def test_worker_token_rejects_wrong_and_non_ascii_tokens(vc, config):
+    config['whisper']['remote'] = {"serve": True, "token": "secret"}
+    client = vc.app.test_client()
+    assert client.get("/api/worker/health", headers={"X-Worker-Token": "wrong"}).status_code == 401
+    assert client.get("/api/worker/health", headers={"X-Worker-Token": "caf\xe9"}).status_code == 401
+    assert client.get("/api/worker/health", headers={"X-Worker-Token": "secret"}).status_code == 200
+
+
+def test_worker_transcribe_status_codes(vc, remote, monkeypatch):
+    client = vc.app.test_client()
+    headers = {"X-Worker-Token": "secret"}
+    audio = np.zeros(16000, dtype=np.float32).tobytes()
+
+    assert client.post("/api/worker/transcribe", headers=headers).status_code == 400
+    resp = client.post("/api/worker/transcribe", headers=headers, data={
+        "audio": (io.BytesIO(audio), "audio.f32"), "format": "f32le", "kwargs": "not json"
+    })
+    assert resp.status_code == 400
+
+    monkeypatch.setattr(vc, "get_whisper_model", lambda *args, **kwargs: None)
+    resp = client.post("/api/worker/transcribe", headers=headers, data={
+        "audio": (io.BytesIO(audio), "audio.f32"), "format": "f32le"
+    })
+    assert resp.status_code == 503
+
+
+@pytest.mark.parametrize("broken", [BrokenSession(), BrokenSession(500)])
+def test_remote_transcribe_fails_over_to_the_next_node(vc, remote, broken):
+    # node-a 负载更低，先被选中
+    vc.REMOTE_NODES[NODE_B]['load'] = 3
+    remote[NODE_A] = broken
+
+    result = vc.whisper_remote_transcribe(("small", "cpu", "int8", 0), np.zeros(16000, dtype=np.float32), {})
+
+    assert [item['text'] for item in result['segments']] == ["今天天气", "很好"]
+    assert broken.posts == 1
+    assert vc.REMOTE_NODES[NODE_A]['healthy'] is False
+    assert vc.REMOTE_NODES[NODE_A]['failed'] == 1
+    assert vc.REMOTE_NODES[NODE_A]['inflight'] == 0
+    assert vc.REMOTE_NODES[NODE_B]['completed'] == 1
+
+
+def test_remote_transcribe_does_not_fail_over_on_bad_input(vc, remote):
+    vc.REMOTE_NODES[NODE_B]['load'] = 3
+    remote[NODE_A] = BrokenSession(400, "请求无效")
+
+    with pytest.raises(RuntimeError, match="请求无效"):
+        vc.whisper_remote_transcribe(("small", "cpu", "int8", 0), np.zeros(16000, dtype=np.float32), {})
+    assert remote[NODE_B].posts == 0
+    assert vc.REMOTE_NODES[NODE_A]['healthy'] is True
+
+
+def test_remote_handle_falls_back_to_local_when_all_nodes_fail(vc, remote, model_loader):
+    remote[NODE_A] = BrokenSession(500)
+    remote[NODE_B] = BrokenSession()
+    handle = vc.WhisperRemoteHandle(("small", "cpu", "int8", 0))
+
+    result = vc.whisper_transcribe_cached(handle, np.zeros(16000, dtype=np.float32))
+
+    assert [item['text'] for item in result['segments']] == ["今天天气", "很好"]
+    assert model_loader == [("small", "cpu", "int8", 0)]
+
+
+def test_pick_remote_node_prefers_the_least_loaded_healthy_node(vc, remote):
+    vc.REMOTE_NODES[NODE_A].update(load=4, capacity=2)
+    vc.REMOTE_NODES[NODE_B].update(load=1, capacity=1)
+    assert vc.pick_remote_node([NODE_A, NODE_B], set()) == NODE_B
+    assert vc.REMOTE_NODES[NODE_B]['inflight'] == 1
+
+    vc.mark_remote_node(NODE_B, False, "down")
+    assert vc.pick_remote_node([NODE_A, NODE_B], set()) == NODE_A
+    assert vc.pick_remote_node([NODE_A, NODE_B], {NODE_A}) is None
+
+
+def test_preload_with_remote_nodes_checks_them_and_becomes_ready(vc, remote, model_loader, monkeypatch):
+    monkeypatch.setattr(vc, "WHISPER_READINESS", {"state": "idle"})
+
+    vc.preload_whisper_model()
+
+    assert vc.WHISPER_READINESS['state'] == "ready"
+    assert model_loader == []  # 模型由节点加载，本机不加载
+
+
+def test_preload_fails_when_no_remote_node_answers(vc, remote, monkeypatch):
+    monkeypatch.setattr(vc, "WHISPER_READINESS", {"state": "idle"})
+    remote[NODE_A] = BrokenSession()
+    remote[NODE_B] = BrokenSession()
+
+    vc.preload_whisper_model()
+
+    assert vc.WHISPER_READINESS['state'] == "failed"
+
+
+class PayloadSession:
+    """健康检查返回固定内容的节点"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, url, headers=None, timeout=None):
+        return FakeResponse(200, self.data)
+
+
+@pytest.mark.parametrize("data", [
+    ["not", "a", "dict"],
+    {"success": True, "model": "small"},
+    {"success": True, "active": "x", "waiting": 0, "max_concurrent": 1},
+])
+def test_health_check_marks_nodes_with_bad_payloads_unhealthy(vc, remote, data):
+    remote[NODE_A] = PayloadSession(data)
+
+    assert vc.check_remote_node(NODE_A, vc.get_whisper_remote_config()) is False
+    assert vc.REMOTE_NODES[NODE_A]['healthy'] is False
+
+
+def test_health_monitor_survives_unexpected_errors(vc, config, monkeypatch):
+    config['whisper']['remote'] = {"nodes": [NODE_A], "health_interval": 0}
+    calls = []
+
+    def check(url, remote_config):
+        calls.append(url)
+        if len(calls) == 1:
+            raise RuntimeError("意外错误")
+        if len(calls) == 2:
+            raise SystemExit  # 结束循环
+
+    monkeypatch.setattr(vc, "check_remote_node", check)
+    monkeypatch.setattr(vc.time, "sleep", lambda seconds: None)
+
+    with pytest.raises(SystemExit):
+        vc.remote_health_monitor()
+    assert calls == [NODE_A, NODE_A]
@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class StreamResponse:
+    status_code = 200
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+
+    def iter_content(self, chunk_size):
+        yield from self.blocks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_synthesize_to_file_writes_blocks_and_signals_start(vc, config, tmp_path, monkeypatch):
+    config['audio_cache'] = {"enabled": False}
+    output = tmp_path / "out.mp3"
+    started = []
+
+    def request(*args, **kwargs):
+        assert kwargs['stream'] is True
+        return StreamResponse([b"ab", b"", b"cd"])
+
+    monkeypatch.setattr(vc, "upstream_request", request)
+
+    ok, error = vc.synthesize_speech_to_file("https://api", "sk", {"input": "你好"}, output,
+                                             on_start=lambda: started.append(output.exists()))
+
+    assert ok, error
+    assert started == [True]
+    assert output.read_bytes() == b"abcd"
+
+
+def test_job_audio_follows_the_file_while_it_is_written(vc, config, tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "JOBS", {})
+    monkeypatch.setattr(vc, "OUTPUT_DIR", tmp_path)
+    job = vc.create_job("tts")
+    (tmp_path / "a.mp3").write_bytes(b"first-")
+    vc.update_job(job['id'], audio_file="a.mp3", audio_streaming=True)
+
+    def writer():
+        time.sleep(0.2)
+        with open(tmp_path / "a.mp3", "ab") as f:
+            f.write(b"second")
+        vc.update_job(job['id'], audio_streaming=False, status="done")
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    data = vc.app.test_client().get(f"/api/jobs/{job['id']}/audio").data
+    thread.join()
+
+    assert data == b"first-second"
@@ -0,0 +1,111 @@
+import io
+import json
+
+import pytest
+
+
+@pytest.fixture
+def stt_model(vc, whisper_model, transcript_cache, monkeypatch):
+    whisper_model.texts = ("今天天氣", "很好")
+    monkeypatch.setattr(vc, "get_whisper_model", lambda *args, **kwargs: whisper_model)
+    return whisper_model
+
+
+def parse_sse(body):
+    events = []
+    for block in body.decode('utf-8').strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_stream_rejects_missing_upload_with_400(vc, config):
+    resp = vc.app.test_client().post('/api/stt/stream', data={})
+    assert resp.status_code == 400
+    assert resp.get_json()['success'] is False
+
+
+def test_stream_rejects_undecodable_audio_with_400(vc, config):
+    data = {"audio": (io.BytesIO(b"not audio"), "broken.wav")}
+    resp = vc.app.test_client().post('/api/stt/stream', data=data, content_type='multipart/form-data')
+    assert resp.status_code == 400
+    assert "读取音频失败" in resp.get_json()['message']
+
+
+def test_stream_sends_simplified_segments_then_done(vc, config, stt_model, wav_bytes):
+    data = {"audio": (io.BytesIO(wav_bytes), "clip.wav")}
+    resp = vc.app.test_client().post('/api/stt/stream', data=data, content_type='multipart/form-data')
+
+    assert resp.mimetype == 'text/event-stream'
+    events = parse_sse(resp.data)
+    assert [event for event, _ in events] == ["segment", "segment", "done"]
+    assert events[0][1]['text'] == "今天天气"
+    assert events[2][1]['text'] == "今天天气很好"
+
+
+def test_stt_decodes_small_uploads_in_memory(vc, config, stt_model, wav_bytes, tmp_path, monkeypatch):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    monkeypatch.setattr(vc, "OUTPUT_DIR", output_dir)
+    seen = []
+    original = vc.whisper_transcribe_cached
+
+    def transcribe(model, audio, **kwargs):
+        seen.append(audio)
+        return original(model, audio, **kwargs)
+
+    monkeypatch.setattr(vc, "whisper_transcribe_cached", transcribe)
+    data = {"audio": (io.BytesIO(wav_bytes), "clip.wav")}
+    resp = vc.app.test_client().post('/api/stt', data=data, content_type='multipart/form-data')
+
+    assert resp.get_json()['success']
+    assert hasattr(seen[0], 'shape') and len(seen[0]) == 16000
+    assert list(output_dir.iterdir()) == []
+
+
+def test_stt_large_uploads_use_a_temp_file_that_is_removed(vc, config, stt_model, wav_bytes, tmp_path, monkeypatch):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    monkeypatch.setattr(vc, "OUTPUT_DIR", output_dir)
+    config['whisper']['upload_memory_mb'] = 0
+    seen = []
+    original = vc.whisper_transcribe_cached
+
+    def transcribe(model, audio, **kwargs):
+        seen.append(audio)
+        return original(model, audio, **kwargs)
+
+    monkeypatch.setattr(vc, "whisper_transcribe_cached", transcribe)
+    data = {"audio": (io.BytesIO(wav_bytes), "clip.wav")}
+    resp = vc.app.test_client().post('/api/stt', data=data, content_type='multipart/form-data')
+
+    assert resp.get_json()['success']
+    assert isinstance(seen[0], str) and seen[0].startswith(str(output_dir))
+    assert list(output_dir.iterdir()) == []
+
+
+def test_normalize_segments_text_converts_once_and_splits_back(vc, monkeypatch):
+    calls = []
+    convert = vc.get_t2s_converter()
+    monkeypatch.setattr(vc, "T2S_CONVERTER", lambda text: calls.append(text) or convert(text))
+    items = [{"text": "今天天氣"}, {"text": "很好"}]
+
+    assert vc.normalize_segments_text(items) == "今天天气很好"
+    assert [item['text'] for item in items] == ["今天天气", "很好"]
+    assert calls == ["今天天氣很好"]
+
+
+def test_normalize_segments_text_falls_back_per_item_when_length_changes(vc, monkeypatch):
+    monkeypatch.setattr(vc, "T2S_CONVERTER", lambda text: text.replace("乾隆", "乾隆帝"))
+    words = [{"word": "乾"}, {"word": "隆"}, {"word": "乾隆"}]
+
+    vc.normalize_segments_text(words, 'word')
+
+    assert [item['word'] for item in words] == ["乾", "隆", "乾隆帝"]
+
+
+def test_stt_output_is_simplified(vc, config, stt_model, wav_bytes):
+    data = {"audio": (io.BytesIO(wav_bytes), "clip.wav")}
+    body = vc.app.test_client().post('/api/stt', data=data, content_type='multipart/form-data').get_json()
+
+    assert body['text'] == "今天天气很好"
@@ -0,0 +1,54 @@
+import numpy as np
+
+from conftest import FakeWhisperModel
+
+AUDIO = np.linspace(-1, 1, 16000, dtype=np.float32)
+
+
+def test_cache_key_depends_on_audio_model_and_params(vc):
+    key = vc.transcript_cache_key(AUDIO, "small/cpu/int8", {"language": "zh"})
+    assert key == vc.transcript_cache_key(AUDIO.copy(), "small/cpu/int8", {"language": "zh"})
+    assert key != vc.transcript_cache_key(AUDIO[::-1].copy(), "small/cpu/int8", {"language": "zh"})
+    assert key != vc.transcript_cache_key(AUDIO, "medium/cpu/int8", {"language": "zh"})
+    assert key != vc.transcript_cache_key(AUDIO, "small/cpu/int8", {"language": "en"})
+
+
+def test_cache_params_include_batching_and_parallel_settings(vc):
+    settings = {"batch_size": 8, "batch_min_duration": 60, "parallel_workers": 2,
+                "parallel_min_duration": 600, "parallel_chunk_seconds": 120}
+    params = vc.transcript_cache_params({"language": "zh"}, settings)
+    assert params == {"language": "zh", "batch_size": 8, "batch_min_duration": 60,
+                      "parallel_min_duration": 600, "parallel_chunk_seconds": 120}
+    changed = vc.transcript_cache_params({"language": "zh"}, dict(settings, batch_min_duration=30))
+    assert changed != params
+
+
+def test_second_transcription_is_served_from_cache(vc, whisper_model, transcript_cache):
+    first = vc.whisper_transcribe_cached(whisper_model, AUDIO, language="zh")
+    second = vc.whisper_transcribe_cached(whisper_model, AUDIO, language="zh")
+    assert first == second
+    assert [s['text'] for s in second['segments']] == ["今天天气", "很好"]
+    assert len(whisper_model.calls) == 1
+    assert vc.get_transcript_cache_stats()['hits'] == 1
+
+
+def test_unregistered_model_is_not_cached_under_config_name(vc, config, whisper_model, transcript_cache):
+    stray = FakeWhisperModel(texts=("别的模型",))
+    vc.whisper_transcribe_cached(stray, AUDIO, language="zh")
+    result = vc.whisper_transcribe_cached(whisper_model, AUDIO, language="zh")
+    assert [s['text'] for s in result['segments']] == ["今天天气", "很好"]
+    assert vc.get_transcript_cache_stats()['entries'] == 1
+
+
+def test_model_key_survives_registry_eviction(vc, whisper_model, monkeypatch):
+    monkeypatch.setattr(vc, "WHISPER_MODELS", vc.OrderedDict())
+    assert vc.get_whisper_model_name(whisper_model) == "small/cpu/int8"
+
+
+def test_cache_evicts_least_recently_used(vc, transcript_cache):
+    big = {"segments": [{"text": "字" * 200000}]}
+    vc.transcript_cache_put("a", big, max_mb=1)
+    vc.transcript_cache_put("b", big, max_mb=1)
+    assert vc.transcript_cache_get("a") is None
+    assert vc.transcript_cache_get("b") == big
+    assert vc.get_transcript_cache_stats()['evictions'] == 1
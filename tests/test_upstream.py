@@ -0,0 +1,141 @@
+import io
+
+import pytest
+import requests
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return {"uri": "speech:test"}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """按顺序返回预设的状态码，记录每次请求读到的上传内容"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.uploads = []
+
+    def request(self, method, url, headers=None, files=None, **kwargs):
+        if files:
+            value = files['file']
+            fileobj = value[1] if isinstance(value, tuple) else value
+            self.uploads.append(fileobj.read() if hasattr(fileobj, 'read') else fileobj)
+        status = self.statuses.pop(0)
+        if isinstance(status, Exception):
+            raise status
+        return FakeResponse(status, {"Retry-After": "0"})
+
+
+@pytest.fixture
+def upstream(vc, config, monkeypatch):
+    config['upstream'] = {"retries": 2, "backoff": 0, "breaker_failures": 2, "breaker_cooldown": 60}
+    monkeypatch.setattr(vc, "UPSTREAM_BREAKERS", {})
+    monkeypatch.setattr(vc, "RATE_LIMITERS", {})
+
+    def install(statuses):
+        session = FakeSession(statuses)
+        monkeypatch.setattr(vc, "get_upstream_session", lambda base_url: session)
+        return session
+    return install
+
+
+def test_429_retry_resends_file_content(vc, upstream):
+    session = upstream([429, 200])
+    resp = vc.upstream_request("POST", "https://api.example.com/v1", "/uploads/audio/voice", "upload",
+                               files={"file": io.BytesIO(b"RIFF-audio")})
+    assert resp.status_code == 200
+    assert session.uploads == [b"RIFF-audio", b"RIFF-audio"]
+
+
+def test_upload_voice_sends_bytes_on_every_attempt(vc, upstream, tmp_path):
+    sample = tmp_path / "sample.wav"
+    sample.write_bytes(b"RIFF-sample")
+    session = upstream([429, 429, 200])
+
+    ok, uri, _ = vc.upload_voice_to_server(str(sample), "test", "你好")
+
+    assert ok and uri == "speech:test"
+    assert session.uploads == [b"RIFF-sample"] * 3
+
+
+def test_429_gives_up_after_configured_retries(vc, upstream):
+    session = upstream([429, 429, 429])
+    resp = vc.upstream_request("GET", "https://api.example.com/v1", "/audio/voice/list", "voice_list")
+    assert resp.status_code == 429
+    assert session.statuses == []
+
+
+def test_breaker_opens_after_consecutive_failures(vc, upstream):
+    upstream([requests.exceptions.ConnectionError("down"), requests.exceptions.ConnectionError("down")])
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            vc.upstream_request("GET", "https://api.example.com/v1", "/audio/voice/list", "voice_list")
+    with pytest.raises(vc.UpstreamUnavailableError):
+        vc.upstream_request("GET", "https://api.example.com/v1", "/audio/voice/list", "voice_list")
+
+
+def test_rate_limit_rejects_when_queue_exceeds_max_wait(vc, config, monkeypatch):
+    monkeypatch.setattr(vc, "RATE_LIMITERS", {})
+    config['rate_limits'] = {"slow-model": {"rpm": 1, "burst": 1}, "max_wait": 5}
+    assert vc.rate_limit_acquire("slow-model") == 0.0
+    with pytest.raises(vc.RateLimitTimeoutError):
+        vc.rate_limit_acquire("slow-model")
+
+
+def test_parse_retry_after(vc):
+    assert vc.parse_retry_after(FakeResponse(429, {"Retry-After": "7"}), 1.0) == 7.0
+    assert vc.parse_retry_after(FakeResponse(429), 1.5) == 1.5
+    assert vc.parse_retry_after(FakeResponse(429, {"Retry-After": "soon"}), 2.0) == 2.0
+
+
+def test_session_is_shared_per_base_url_and_does_not_retry_reads(vc, config, monkeypatch):
+    config['upstream'] = {"retries": 4, "pool_size": 6}
+    monkeypatch.setattr(vc, "UPSTREAM_SESSIONS", {})
+
+    session = vc.get_upstream_session("https://api.example.com/v1")
+
+    assert vc.get_upstream_session("https://api.example.com/v1") is session
+    assert vc.get_upstream_session("https://other.example.com/v1") is not session
+    adapter = session.get_adapter("https://api.example.com/v1")
+    assert adapter._pool_maxsize == 6
+    assert adapter.max_retries.total == 4 and adapter.max_retries.read == 0
+    assert adapter.max_retries.allowed_methods is None  # POST 也按状态码重试
+    assert 429 not in adapter.max_retries.status_forcelist
+
+
+def test_breaker_closes_after_cooldown_and_success(vc, upstream, monkeypatch):
+    upstream([requests.exceptions.ConnectionError("down"), requests.exceptions.ConnectionError("down"), 200])
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            vc.upstream_request("GET", "https://api.example.com/v1", "/audio/voice/list", "voice_list")
+
+    now = vc.time.time()
+    monkeypatch.setattr(vc.time, "time", lambda: now + 61)
+    resp = vc.upstream_request("GET", "https://api.example.com/v1", "/audio/voice/list", "voice_list")
+
+    assert resp.status_code == 200
+    assert vc.UPSTREAM_BREAKERS["https://api.example.com/v1"] == {"failures": 0, "open_until": 0}
+
+
+def test_request_uses_endpoint_timeout(vc, config, upstream):
+    config['upstream']['timeouts'] = {"speech": 99}
+    seen = []
+    session = upstream([200])
+    original = session.request
+
+    def request(method, url, **kwargs):
+        seen.append(kwargs['timeout'])
+        return original(method, url, **kwargs)
+
+    session.request = request
+    vc.upstream_request("POST", "https://api.example.com/v1", "/audio/speech", "speech", json={})
+
+    assert seen == [(5.0, 99)]
@@ -0,0 +1,54 @@
+import faster_whisper
+import numpy as np
+import pytest
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, **kwargs):
+        self.calls.append(kwargs)
+        return iter([]), None
+
+
+class FakePipeline:
+    calls = []
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, **kwargs):
+        FakePipeline.calls.append(kwargs)
+        return iter([]), None
+
+
+@pytest.fixture
+def pipeline(vc, config, monkeypatch):
+    config['whisper'] = {"batch_size": 8, "batch_min_duration": 60}
+    FakePipeline.calls = []
+    monkeypatch.setattr(faster_whisper, "BatchedInferencePipeline", FakePipeline)
+    return FakePipeline
+
+
+def test_short_audio_uses_sequential_decoding(vc, pipeline):
+    model = FakeModel()
+    vc.whisper_run_transcribe(model, np.zeros(16000 * 10, dtype=np.float32), language="zh")
+    assert model.calls == [{"language": "zh"}]
+    assert pipeline.calls == []
+
+
+def test_long_audio_uses_batched_pipeline_with_timestamps(vc, pipeline):
+    model = FakeModel()
+    vc.whisper_run_transcribe(model, np.zeros(16000 * 90, dtype=np.float32),
+                              language="zh", condition_on_previous_text=False, vad_filter=False)
+    assert model.calls == []
+    assert pipeline.calls == [{"language": "zh", "condition_on_previous_text": False, "vad_filter": True,
+                               "without_timestamps": False, "batch_size": 8}]
+
+
+def test_batching_disabled_by_batch_size(vc, config, pipeline):
+    config['whisper']['batch_size'] = 0
+    model = FakeModel()
+    vc.whisper_run_transcribe(model, np.zeros(16000 * 90, dtype=np.float32))
+    assert len(model.calls) == 1 and pipeline.calls == []
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from conftest import FakeWhisperModel
+
+
+@pytest.fixture
+def speech(monkeypatch):
+    """代替 VAD，返回预设的语音区间（采样点）"""
+    import faster_whisper.vad
+
+    intervals = []
+    monkeypatch.setattr(faster_whisper.vad, "get_speech_timestamps", lambda audio, options: intervals)
+    return intervals
+
+
+def test_split_cuts_in_the_middle_of_silences(vc, speech):
+    # 三段语音，每段 4 秒，中间各有 2 秒静音；块长上限 7 秒
+    speech.extend([
+        {"start": 0, "end": 64000},
+        {"start": 96000, "end": 160000},
+        {"start": 192000, "end": 256000},
+    ])
+
+    chunks = vc.split_audio_at_silence(np.zeros(256000, dtype=np.float32), 7)
+
+    assert chunks == [(0, 80000), (80000, 176000), (176000, 256000)]
+
+
+def test_split_hard_cuts_audio_without_silence(vc, speech):
+    chunks = vc.split_audio_at_silence(np.zeros(16000 * 25, dtype=np.float32), 10)
+
+    assert len(chunks) == 3
+    assert chunks[0][0] == 0 and chunks[-1][1] == 16000 * 25
+    assert all(end - start <= 16000 * 10 for start, end in chunks)
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+
+
+def test_parallel_workers_respect_memory_budget(vc):
+    settings = {"parallel_workers": 4, "parallel_memory_mb": 5000}
+    assert vc.get_parallel_workers(("small", "cpu", "int8", 0), settings) == 2
+    assert vc.get_parallel_workers(("medium", "cpu", "int8", 0), settings) == 0
+    assert vc.get_parallel_workers(("small", "cpu", "int8", 0), dict(settings, parallel_workers=1)) == 0
+
+
+def test_parallel_iter_offsets_chunks_and_keeps_order(vc, config, speech, monkeypatch):
+    config['whisper'].update(parallel_workers=2, parallel_min_duration=10, parallel_chunk_seconds=10)
+    monkeypatch.setattr(vc, "WHISPER_WORKER_MODEL", FakeWhisperModel(texts=("一",)))
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(vc, "get_whisper_process_pool", lambda key, settings, workers: pool)
+
+    audio = np.zeros(16000 * 25, dtype=np.float32)
+
+    segments, duration = vc.whisper_parallel_iter(("small", "cpu", "int8", 0), audio)
+    segments = list(segments)
+    pool.shutdown()
+
+    assert duration == 25
+    chunks = vc.split_audio_at_silence(audio, 10)
+    assert [item['start'] for item in segments] == [start / 16000 for start, _ in chunks]
+
+
+def test_short_audio_is_not_parallelised(vc, config):
+    config['whisper'].update(parallel_workers=2, parallel_min_duration=60)
+    assert vc.whisper_parallel_iter(("small", "cpu", "int8", 0), np.zeros(16000 * 10, dtype=np.float32)) is None
+
+
+def test_parallel_budget_too_small_for_two_workers_is_reported_once(vc, monkeypatch, capsys):
+    monkeypatch.setattr(vc, "PARALLEL_BUDGET_WARNED", set())
+    settings = {"parallel_workers": 2, "parallel_memory_mb": 8192}
+
+    assert vc.get_parallel_workers(("medium", "cpu", "int8", 0), settings) == 0
+    assert vc.get_parallel_workers(("medium", "cpu", "int8", 0), settings) == 0
+
+    assert capsys.readouterr().out.count("[WARN] parallel_memory_mb=8192MB") == 1
+
+
+def test_default_parallel_budget_fits_two_medium_workers(vc, config):
+    config['whisper'].update(model="medium", parallel_workers=2)
+    settings = vc.get_whisper_settings()
+    assert vc.get_parallel_workers(("medium", "cpu", "int8", 0), settings) == 2
@@ -0,0 +1,67 @@
+import numpy as np
+
+import whisper_calibrate
+
+
+PROFILES = {
+    "fast": {"compute_type": "int8", "cpu_threads": 2, "beam_size": 1, "vad_filter": True},
+    "accurate": {"compute_type": "float32", "cpu_threads": 8, "beam_size": 5, "vad_filter": False}
+}
+
+
+def test_profile_lookup(vc, config):
+    config['whisper'].update(profiles=PROFILES, profile="fast")
+    assert vc.get_whisper_profile() == PROFILES['fast']
+    assert vc.get_whisper_profile("accurate") == PROFILES['accurate']
+    assert vc.get_whisper_profile("missing") is None
+
+
+def test_apply_profile_overrides_decoding_options(vc):
+    kwargs = vc.apply_whisper_profile(PROFILES['accurate'], language="zh", beam_size=1, vad_filter=True)
+    assert kwargs == {"language": "zh", "beam_size": 5, "vad_filter": False}
+    assert vc.apply_whisper_profile(None, beam_size=1) == {"beam_size": 1}
+
+
+def test_profile_threads_load_a_separate_model(vc, config, model_loader):
+    config['whisper'].update(model="small", cpu_threads=0)
+    default = vc.get_profile_model(None)
+    fast = vc.get_profile_model({"compute_type": "int8", "cpu_threads": 2})
+    assert fast is not default
+    assert model_loader == [("small", "cpu", "int8", 0), ("small", "cpu", "int8", 2)]
+    assert vc.get_profile_model({"compute_type": "int8", "cpu_threads": 2}) is fast
+
+
+def test_align_model_follows_profile(vc, config, model_loader):
+    config['whisper'].update(model="medium", align_model="tiny")
+    vc.get_align_model(None)
+    vc.get_align_model(PROFILES['accurate'])
+    assert model_loader == [("tiny", "cpu", "int8", 0), ("tiny", "cpu", "float32", 8)]
+
+
+def test_word_timestamps_use_profile_decoding_options(vc, config, model_loader, transcript_cache):
+    config['whisper'].update(model="medium", align_model="tiny", profiles=PROFILES, batch_size=0, parallel_workers=0)
+    vc.whisper_get_word_timestamps(np.zeros(16000, dtype=np.float32), profile="accurate")
+    model = vc.WHISPER_MODELS[("tiny", "cpu", "float32", 8)]['model']
+    assert model.calls[0]['beam_size'] == 5
+    assert model.calls[0]['word_timestamps'] is True
+
+
+def test_calibration_char_accuracy():
+    assert whisper_calibrate.char_accuracy("今天天气很好", "今天天氣很好。") == 1.0
+    assert whisper_calibrate.char_accuracy("今天天气很好", "今天天气") == 1 - 2 / 6
+
+
+def test_calibration_picks_fastest_within_tolerance():
+    results = [
+        {"compute_type": "float32", "cpu_threads": 8, "beam_size": 5, "vad_filter": False, "vad_parameters": None,
+         "rtf": 0.50, "accuracy": 0.98},
+        {"compute_type": "int8", "cpu_threads": 8, "beam_size": 3, "vad_filter": False, "vad_parameters": None,
+         "rtf": 0.20, "accuracy": 0.97},
+        {"compute_type": "int8", "cpu_threads": 4, "beam_size": 1, "vad_filter": True, "vad_parameters": None,
+         "rtf": 0.05, "accuracy": 0.90}
+    ]
+    profiles = whisper_calibrate.pick_profiles(results)
+    assert profiles['accurate']['rtf'] == 0.50
+    assert profiles['balanced']['rtf'] == 0.20
+    assert profiles['fast']['rtf'] == 0.05
+    assert "vad_parameters" not in profiles['fast']
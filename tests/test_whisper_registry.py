@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def readiness(vc, monkeypatch):
+    state = {"state": "ready", "started_at": None, "ready_at": time.time(),
+             "load_seconds": 1.0, "warmup_seconds": 0.1, "error": None}
+    monkeypatch.setattr(vc, "WHISPER_READINESS", state)
+    return state
+
+
+def test_model_is_loaded_once_under_concurrency(vc, config, model_loader):
+    config['whisper'].update(model="small")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(vc.get_whisper_model())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(model_loader) == 1
+    assert all(model is results[0] for model in results)
+
+
+def test_memory_budget_evicts_least_recently_used(vc, config, model_loader, monkeypatch):
+    released = []
+    monkeypatch.setattr(vc, "release_freed_memory", lambda: released.append(True))
+    config['whisper'].update(model="small", memory_budget_mb=4096)
+    vc.get_whisper_model()                       # small: 2048MB, 默认模型
+    vc.get_whisper_model("base")                 # base: 1024MB
+    vc.get_whisper_model("tiny")                 # tiny: 1024MB -> 4096MB
+    vc.get_whisper_model("base")                 # 刷新 base
+    vc.get_whisper_model("medium")               # medium: 5120MB，超出预算
+    assert list(vc.WHISPER_MODELS) == [("small", "cpu", "int8", 0), ("medium", "cpu", "int8", 0)]
+    assert released
+
+
+def test_config_change_swaps_model_in_background(vc, config, model_loader):
+    config['whisper'].update(model="small")
+    old = vc.get_whisper_model()
+    config['whisper'].update(model="medium")
+    assert vc.get_whisper_model() is old        # 新模型加载完成前继续使用旧模型
+    for _ in range(100):
+        if vc.WHISPER_ACTIVE_KEY == ("medium", "cpu", "int8", 0):
+            break
+        time.sleep(0.01)
+    assert vc.get_whisper_model() is not old
+
+
+def test_idle_unload_keeps_instance_ready_and_reports_residency(vc, config, model_loader, readiness, monkeypatch):
+    monkeypatch.setattr(vc, "release_freed_memory", lambda: None)
+    config['whisper'].update(model="small")
+    client = vc.app.test_client()
+    vc.get_whisper_model()
+    vc.WHISPER_MODELS[vc.WHISPER_ACTIVE_KEY]['last_used'] -= 100
+
+    vc.unload_idle_whisper_models(60)
+    assert vc.WHISPER_MODELS == {}
+    resp = client.get("/api/health/ready")
+    assert resp.status_code == 200
+    assert resp.get_json()['whisper']['model_resident'] is False
+
+    vc.get_whisper_model()
+    assert client.get("/api/health/ready").get_json()['whisper']['model_resident'] is True
+    assert len(model_loader) == 2
+
+
+def test_idle_unload_defaults_off(vc, config):
+    assert vc.get_whisper_settings()['idle_unload_seconds'] == 0
+
+
+def test_process_memory_budget_unloads_until_under_limit(vc, config, model_loader, monkeypatch):
+    monkeypatch.setattr(vc, "release_freed_memory", lambda: None)
+    config['whisper'].update(model="small")
+    vc.get_whisper_model()
+    vc.get_whisper_model("base")
+    vc.get_whisper_model("tiny")
+    rss = iter([9000, 7000, 5000])
+    monkeypatch.setattr(vc, "get_process_rss_mb", lambda: next(rss))
+    vc.enforce_process_memory(6000, keep={vc.WHISPER_ACTIVE_KEY})
+    assert list(vc.WHISPER_MODELS) == [("small", "cpu", "int8", 0)]
+
+
+def test_inference_slots_bound_concurrency(vc, config):
+    config['whisper'].update(max_concurrent=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def job():
+        with vc.whisper_inference_slot():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=job) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+
+def test_failed_load_is_not_cached_and_is_retried(vc, config, model_loader, monkeypatch):
+    load = vc.load_whisper_model
+    attempts = []
+
+    def flaky(model_size, device, compute_type, settings):
+        attempts.append(model_size)
+        if len(attempts) == 1:
+            raise RuntimeError("下载中断")
+        return load(model_size, device, compute_type, settings)
+
+    monkeypatch.setattr(vc, "load_whisper_model", flaky)
+    config['whisper'].update(model="small")
+
+    assert vc.get_whisper_model() is None
+    assert vc.WHISPER_MODELS == {}
+    assert vc.get_whisper_model() is not None
+    assert attempts == ["small", "small"]
+
+
+def test_status_reports_queue_and_loaded_models(vc, config, model_loader, monkeypatch):
+    monkeypatch.setattr(vc, "WHISPER_INFERENCE_STATS", dict(vc.WHISPER_INFERENCE_STATS, active=0, waiting=0, completed=0))
+    config['whisper'].update(model="small", max_concurrent=3)
+    vc.get_whisper_model()
+    with vc.whisper_inference_slot():
+        status = vc.app.test_client().get("/api/whisper/status").get_json()['whisper']
+
+    assert status['queue']['active'] == 1
+    assert status['queue']['max_concurrent'] == 3
+    assert status['loaded'] is True
+    assert [(m['model'], m['cpu_threads']) for m in status['models']] == [("small", 0)]
+
+
+def test_transcription_entry_points_share_the_registered_model(vc, config, model_loader, transcript_cache, tmp_path):
+    config['whisper'].update(model="small", batch_size=0)
+    first, second = tmp_path / "a.wav", tmp_path / "b.wav"
+    first.write_bytes(b"a")
+    second.write_bytes(b"b")
+
+    assert [t['text'] for t in vc.whisper_get_timestamps(str(first))] == ["今天天气", "很好"]
+    vc.whisper_get_timestamps(str(second))
+    vc.whisper_transcribe(str(second))
+
+    assert model_loader == [("small", "cpu", "int8", 0)]
+    assert len(vc.WHISPER_MODELS[("small", "cpu", "int8", 0)]['model'].calls) == 3
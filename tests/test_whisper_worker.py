@@ -0,0 +1,74 @@
+import os
+import queue
+import stat
+import threading
+
+import numpy as np
+import pytest
+
+import whisper_worker
+
+
+@pytest.fixture
+def key_file(vc, tmp_path, monkeypatch):
+    path = tmp_path / "worker.key"
+    monkeypatch.setattr(vc, "WORKER_AUTHKEY_FILE", path)
+    return path
+
+
+def test_authkey_is_generated_once_and_private(vc, key_file):
+    first = vc.get_worker_authkey("")
+    assert len(first) == 64
+    assert vc.get_worker_authkey("") == first
+    if os.name == "posix":
+        assert stat.S_IMODE(key_file.stat().st_mode) == 0o600
+
+
+def test_configured_authkey_wins_but_legacy_default_is_rejected(vc, key_file):
+    assert vc.get_worker_authkey("my-secret") == "my-secret"
+    assert vc.get_worker_authkey(vc.LEGACY_WORKER_AUTHKEY) == key_file.read_text().strip()
+
+
+def test_worker_config_has_no_public_default(vc, config, key_file):
+    assert vc.get_whisper_worker_config()['authkey'] == ""
+
+
+class FakeConn:
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(message)
+
+
+def make_request(key, audio, kwargs=None):
+    return {
+        "conn": FakeConn(),
+        "key": key,
+        "audio": audio,
+        "kwargs": kwargs or {},
+        "identity": whisper_worker.audio_identity(audio),
+        "alive": True,
+        "finished": threading.Event()
+    }
+
+
+def test_identical_requests_are_transcribed_once(vc, whisper_model, transcript_cache, monkeypatch):
+    monkeypatch.setattr(vc, "get_whisper_model", lambda *args, **kwargs: whisper_model)
+    monkeypatch.setattr(whisper_worker, "PENDING", queue.Queue())
+    key = ("small", "cpu", "int8", 0)
+    audio = np.ones(16000, dtype=np.float32)
+    requests_ = [make_request(key, audio, {"language": "zh"}) for _ in range(3)]
+    requests_.append(make_request(key, audio, {"language": "en"}))
+    for req in requests_:
+        whisper_worker.PENDING.put(req)
+
+    from concurrent.futures import ThreadPoolExecutor
+    threading.Thread(target=whisper_worker.dispatcher, args=(ThreadPoolExecutor(4), 200, 8), daemon=True).start()
+    for req in requests_:
+        assert req['finished'].wait(5)
+
+    assert len(whisper_model.calls) == 2
+    for req in requests_:
+        kinds = [next(iter(m.keys() - {"ok"})) for m in req['conn'].messages]
+        assert kinds == ["info", "segment", "segment", "done"]
@@ -2,9 +2,12 @@
 声音克隆工具 - SiliconFlow CosyVoice2
 使用用户预置音色API：上传音频到服务器 -> 获取uri -> 用uri生成语音
 """
-import os, time, json, requests
+import os, time, json, uuid, threading, weakref, requests
 from pathlib import Path
-from flask import Flask, render_template_string, request, jsonify, send_file
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import OrderedDict
+from flask import Flask, render_template_string, request, jsonify, send_file, Response
 from flask_cors import CORS
 
 # 目录配置
@@ -93,55 +96,1034 @@ def load_legacy_config():
 TOOL_CONFIG = load_tool_config()
 LEGACY_CONFIG = load_legacy_config()
 
-# 全局 Whisper 模型缓存（避免每次都加载）
-WHISPER_MODEL = None
-WHISPER_MODEL_LOCK = None
+# 全局 Whisper 模型注册表：按 (模型大小, 设备, 精度, CPU线程数) 缓存，按最近使用排序
+WHISPER_MODELS = OrderedDict()
+# 模型对象 -> 注册表键，模型被卸载后调用方仍持有的对象也能查到自己的键
+WHISPER_MODEL_KEYS = weakref.WeakKeyDictionary()
+WHISPER_MODEL_LOCK = threading.Lock()
+WHISPER_LOAD_LOCKS = {}
+WHISPER_ACTIVE_KEY = None  # 当前配置对应的默认模型
+WHISPER_SWAPPING = set()   # 正在后台加载的新配置模型
+WHISPER_IDLE_MONITOR = None  # 空闲卸载后台线程
+
+# 各模型常驻内存估算（MB），用于内存预算淘汰
+WHISPER_MODEL_MEMORY_MB = {
+    "tiny": 1024,
+    "base": 1024,
+    "small": 2048,
+    "medium": 5120,
+    "large": 10240
+}
+
+# 同时进行的识别数量受 whisper.num_workers 限制，其余请求排队
+WHISPER_INFERENCE_LOCK = threading.Condition()
+WHISPER_INFERENCE_STATS = {
+    "active": 0,
+    "waiting": 0,
+    "completed": 0,
+    "total_wait": 0.0,
+    "max_wait": 0.0
+}
+
+def get_whisper_settings():
+    """从配置文件读取 Whisper 设置"""
+    config = get_config()
+    whisper_config = config.get('whisper', {})
+    num_workers = max(1, int(whisper_config.get('num_workers', 1)))
+    return {
+        "model": whisper_config.get('model', 'small'),  # 默认 small
+        "device": whisper_config.get('device', 'cpu'),
+        "compute_type": whisper_config.get('compute_type', 'int8'),
+        "language": whisper_config.get('language', 'zh'),
+        "cpu_threads": int(whisper_config.get('cpu_threads', 0)),  # 0 = CTranslate2 自动选择
+        "num_workers": num_workers,
+        "max_concurrent": max(1, int(whisper_config.get('max_concurrent', num_workers))),
+        "memory_budget_mb": float(whisper_config.get('memory_budget_mb', 0)),  # 0 = 不限制
+        # TTS字幕对齐用的小模型（原文已知，只需要词级时间戳），留空则使用 model
+        "align_model": whisper_config.get('align_model', 'tiny'),
+        "alignment": whisper_config.get('alignment', 'words'),  # words=词级对齐, segments=按字数比例
+        # 批量识别：VAD 切出的语音片段按 batch_size 一批解码，0/1 = 关闭
+        "batch_size": int(whisper_config.get('batch_size', 8)),
+        "batch_min_duration": float(whisper_config.get('batch_min_duration', 60)),  # 短于该时长(秒)仍逐段识别
+        # 多进程并行识别：长音频在静音处切块，分给进程池（每个进程各自加载模型），0 = 关闭
+        "parallel_workers": int(whisper_config.get('parallel_workers', 0)),
+        "parallel_min_duration": float(whisper_config.get('parallel_min_duration', 600)),
+        "parallel_chunk_seconds": float(whisper_config.get('parallel_chunk_seconds', 120)),
+        "parallel_memory_mb": float(whisper_config.get('parallel_memory_mb', 12288)),  # 进程池模型总内存上限（medium 两个进程约 10GB）
+        # 上传音频不超过该大小时直接在内存中解码，超过才写临时文件
+        "upload_memory_mb": float(whisper_config.get('upload_memory_mb', 50)),
+        # 离线模式：本地没有模型时直接报错，不在请求中下载（用 check_whisper.py download/import 预先准备）
+        "offline": bool(whisper_config.get('offline', False)),
+        # 空闲超过该时长(秒)的模型自动卸载，下次使用时重新加载，0 = 不卸载（默认，保持预热的模型常驻）
+        "idle_unload_seconds": float(whisper_config.get('idle_unload_seconds', 0)),
+        # 进程常驻内存上限(MB)，加载后超出时卸载最久未用的模型，0 = 不限制
+        "process_memory_mb": float(whisper_config.get('process_memory_mb', 0))
+    }
+
+def estimate_whisper_memory_mb(model_size):
+    """按模型名估算内存占用（large-v3 等变体按 large 计）"""
+    for name in ("large", "medium", "small", "base", "tiny"):
+        if name in model_size:
+            return WHISPER_MODEL_MEMORY_MB[name]
+    return WHISPER_MODEL_MEMORY_MB["medium"]
 
-def get_whisper_model():
-    """获取 Whisper 模型（全局缓存，只加载一次）"""
-    global WHISPER_MODEL
+def load_whisper_model(model_size, device, compute_type, settings):
+    """从本地目录加载模型，不存在时自动下载"""
+    from faster_whisper import WhisperModel
     
-    if WHISPER_MODEL is not None:
-        return WHISPER_MODEL
+    model_dir = BASE_DIR / "models"
+    local_model_path = model_dir / f"faster-whisper-{model_size}"
     
+    if local_model_path.exists() and (local_model_path / "model.bin").exists():
+        print(f"[INFO] 加载 Whisper 模型(faster-whisper-{model_size})...")
+        return WhisperModel(
+            str(local_model_path), 
+            device=device, 
+            compute_type=compute_type,
+            cpu_threads=settings['cpu_threads'],
+            num_workers=settings['num_workers']
+        )
+    
+    print(f"[WARN] 本地模型不存在: {local_model_path}")
+    if settings.get('offline'):
+        raise FileNotFoundError(
+            f"离线模式下本地模型不存在: {local_model_path}，"
+            f"请先运行 python check_whisper.py download {model_size} 或 python check_whisper.py import <目录或压缩包>"
+        )
+    print(f"[INFO] 自动下载 Whisper {model_size} 模型...")
+    return WhisperModel(
+        model_size,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=settings['cpu_threads'],
+        num_workers=settings['num_workers'],
+        download_root=str(model_dir)
+    )
+
+def get_process_rss_mb():
+    """当前进程常驻内存(MB)，无法获取时返回 None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def release_freed_memory():
+    """卸载模型后回收内存，并尽量把空闲堆内存还给操作系统"""
+    import gc
+    gc.collect()
     try:
-        from faster_whisper import WhisperModel
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+def model_memory_mb(entry):
+    """模型占用内存：优先用加载时实测的常驻内存增量，否则用估算值"""
+    return entry.get('resident_mb') or entry['memory_mb']
+
+def evict_whisper_models(budget_mb, keep):
+    """超出内存预算时淘汰最久未用的模型（调用方持有 WHISPER_MODEL_LOCK）"""
+    if budget_mb <= 0:
+        return
+    total = sum(model_memory_mb(entry) for entry in WHISPER_MODELS.values())
+    evicted = False
+    for key in list(WHISPER_MODELS.keys()):
+        if total <= budget_mb:
+            break
+        if key in keep:
+            continue
+        total -= model_memory_mb(WHISPER_MODELS.pop(key))
+        evicted = True
+        print(f"[INFO] 内存预算{budget_mb:.0f}MB，卸载最久未用的 Whisper 模型: {key[0]}")
+    if evicted:
+        release_freed_memory()
+
+def enforce_process_memory(budget_mb, keep):
+    """进程常驻内存超出上限时，按最久未用顺序卸载模型直到回到上限以内"""
+    if budget_mb <= 0:
+        return
+    while True:
+        rss = get_process_rss_mb()
+        if rss is None:
+            print("[WARN] 无法获取进程内存（请安装 psutil），process_memory_mb 不生效")
+            return
+        if rss <= budget_mb:
+            return
+        with WHISPER_MODEL_LOCK:
+            victim = next((key for key in WHISPER_MODELS if key not in keep), None)
+            if victim is None:
+                print(f"[WARN] 进程内存{rss:.0f}MB 超出上限{budget_mb:.0f}MB，但没有可卸载的模型")
+                return
+            WHISPER_MODELS.pop(victim)
+        print(f"[INFO] 进程内存{rss:.0f}MB 超出上限{budget_mb:.0f}MB，卸载 Whisper 模型: {victim[0]}")
+        release_freed_memory()
+
+def unload_idle_whisper_models(idle_seconds):
+    """卸载空闲超时的模型；有识别正在进行时跳过，避免卸载后立即重新加载"""
+    with WHISPER_INFERENCE_LOCK:
+        if WHISPER_INFERENCE_STATS['active'] or WHISPER_INFERENCE_STATS['waiting']:
+            return
+    now = time.time()
+    with WHISPER_MODEL_LOCK:
+        idle_keys = [key for key, entry in WHISPER_MODELS.items() if now - entry['last_used'] > idle_seconds]
+        for key in idle_keys:
+            WHISPER_MODELS.pop(key)
+            print(f"[INFO] Whisper 模型空闲超过{idle_seconds:.0f}秒，已卸载: {key[0]}（下次使用时重新加载）")
+    if idle_keys:
+        release_freed_memory()
+
+def whisper_idle_monitor():
+    """后台线程：定期检查并卸载空闲模型"""
+    while True:
+        idle_seconds = get_whisper_settings()['idle_unload_seconds']
+        time.sleep(min(60, idle_seconds / 4) if idle_seconds > 0 else 60)
+        if idle_seconds > 0:
+            try:
+                unload_idle_whisper_models(idle_seconds)
+            except Exception as e:
+                print(f"[WARN] 空闲模型卸载失败: {e}")
+
+def start_whisper_idle_monitor():
+    """首次加载模型时启动空闲卸载线程"""
+    global WHISPER_IDLE_MONITOR
+    with WHISPER_MODEL_LOCK:
+        if WHISPER_IDLE_MONITOR is None:
+            WHISPER_IDLE_MONITOR = threading.Thread(target=whisper_idle_monitor, daemon=True)
+            WHISPER_IDLE_MONITOR.start()
+
+def ensure_whisper_model(key, settings, activate):
+    """加载指定模型到注册表；同一个模型在并发请求下只加载一次"""
+    global WHISPER_ACTIVE_KEY
+    
+    with WHISPER_MODEL_LOCK:
+        load_lock = WHISPER_LOAD_LOCKS.setdefault(key, threading.Lock())
+    
+    with load_lock:
+        # 等锁期间其他线程可能已经加载完成
+        with WHISPER_MODEL_LOCK:
+            entry = WHISPER_MODELS.get(key)
+            if entry is not None:
+                if activate:
+                    WHISPER_ACTIVE_KEY = key
+                return entry['model']
         
-        # 从配置文件读取 Whisper 设置
-        config = get_config()
-        whisper_config = config.get('whisper', {})
-        model_size = whisper_config.get('model', 'small')  # 默认 small
-        device = whisper_config.get('device', 'cpu')
-        compute_type = whisper_config.get('compute_type', 'int8')
-        language = whisper_config.get('language', 'zh')
-        
-        model_dir = BASE_DIR / "models"
-        local_model_path = model_dir / f"faster-whisper-{model_size}"
-        
-        if local_model_path.exists() and (local_model_path / "model.bin").exists():
-            print(f"[INFO] 首次加载 Whisper 模型(faster-whisper-{model_size})...")
-            WHISPER_MODEL = WhisperModel(
-                str(local_model_path), 
-                device=device, 
-                compute_type=compute_type
+        try:
+            rss_before = get_process_rss_mb()
+            start = time.time()
+            model = load_whisper_model(key[0], key[1], key[2], settings)
+            load_seconds = time.time() - start
+            rss_after = get_process_rss_mb()
+        except Exception as e:
+            print(f"[ERROR] 加载 Whisper 模型失败: {e}")
+            return None
+        
+        # 加载前后的常驻内存差作为模型实测占用（并发加载时仅供参考）
+        resident_mb = None
+        if rss_before is not None and rss_after is not None and rss_after > rss_before:
+            resident_mb = round(rss_after - rss_before, 1)
+        print(f"[INFO] Whisper 模型加载完成！模型={key[0]}, 设备={key[1]}, 精度={key[2]}, 线程={key[3] or '自动'}, 耗时{load_seconds:.1f}秒"
+              + (f", 常驻内存+{resident_mb:.0f}MB" if resident_mb else ""))
+        if activate and WHISPER_READINESS['state'] in ('idle', 'failed'):
+            # 没有启动预热（whisper.preload 为 false）或预热失败后，请求按需加载了默认模型
+            WHISPER_READINESS.update(state="ready", ready_at=time.time(), load_seconds=round(load_seconds, 2), error=None)
+        with WHISPER_MODEL_LOCK:
+            WHISPER_MODEL_KEYS[model] = key
+            WHISPER_MODELS[key] = {
+                "model": model,
+                "loaded_at": time.time(),
+                "last_used": time.time(),
+                "load_seconds": load_seconds,
+                "memory_mb": estimate_whisper_memory_mb(key[0]),
+                "resident_mb": resident_mb
+            }
+            if activate:
+                WHISPER_ACTIVE_KEY = key
+            keep = {key, WHISPER_ACTIVE_KEY}
+            evict_whisper_models(settings['memory_budget_mb'], keep=keep)
+        enforce_process_memory(settings['process_memory_mb'], keep=keep)
+        start_whisper_idle_monitor()
+        return model
+
+def swap_whisper_model(key, settings):
+    """后台加载新配置的模型，加载完成后切换为默认模型"""
+    try:
+        ensure_whisper_model(key, settings, activate=True)
+    finally:
+        with WHISPER_MODEL_LOCK:
+            WHISPER_SWAPPING.discard(key)
+
+def get_whisper_model(model_size=None, device=None, compute_type=None, cpu_threads=None, local=False, remote=True):
+    """获取 Whisper 模型（注册表缓存，每个模型只加载一次）
+    
+    不传参数时使用 config.json 中的 whisper 配置。配置修改后，新模型在后台加载，
+    加载完成前继续使用旧模型，不需要重启。cpu_threads 是注册表键的一部分，
+    线程数不同的档位各自加载一份模型。
+    配置了 whisper.remote.nodes 且有健康节点时返回 WhisperRemoteHandle（remote=False 跳过），
+    开启 whisper.worker 且 worker 可用时返回 WhisperWorkerHandle，local=True 强制本进程加载。
+    """
+    settings = get_whisper_settings()
+    if cpu_threads:
+        settings['cpu_threads'] = int(cpu_threads)
+    use_config = model_size is None and device is None and compute_type is None and not cpu_threads
+    key = (
+        model_size or settings['model'],
+        device or settings['device'],
+        compute_type or settings['compute_type'],
+        settings['cpu_threads']
+    )
+    
+    if not local and remote and get_whisper_remote_config()['nodes']:
+        if whisper_remote_available():
+            return WhisperRemoteHandle(key)
+        if not get_whisper_remote_config()['fallback_local']:
+            return None
+        print("[WARN] 没有可用的远程识别节点，在本机识别")
+    
+    if not local and get_whisper_worker_config()['enabled']:
+        if whisper_worker_available():
+            return WhisperWorkerHandle(key)
+        if not get_whisper_worker_config()['fallback_local']:
+            return None
+        print("[WARN] Whisper worker 不可用，在本进程加载模型")
+    
+    with WHISPER_MODEL_LOCK:
+        entry = WHISPER_MODELS.get(key)
+        if entry is not None:
+            WHISPER_MODELS.move_to_end(key)
+            entry['last_used'] = time.time()
+            return entry['model']
+        
+        active = WHISPER_MODELS.get(WHISPER_ACTIVE_KEY)
+        if use_config and active is not None:
+            # 配置已修改：后台加载新模型，这次先用旧模型
+            if key not in WHISPER_SWAPPING:
+                WHISPER_SWAPPING.add(key)
+                print(f"[INFO] Whisper 配置已修改，后台加载新模型: {key[0]}")
+                threading.Thread(target=swap_whisper_model, args=(key, settings), daemon=True).start()
+            WHISPER_MODELS.move_to_end(WHISPER_ACTIVE_KEY)
+            active['last_used'] = time.time()
+            return active['model']
+    
+    return ensure_whisper_model(key, settings, activate=use_config)
+
+def get_whisper_profile(name=None):
+    """按名称取校准生成的识别档位（fast / balanced / accurate，见 whisper_calibrate.py）
+    
+    不传名称时使用 whisper.profile；未设置或档位不存在时返回 None，按原有参数识别
+    """
+    whisper_config = get_config().get('whisper', {})
+    name = name or whisper_config.get('profile', '')
+    if not name:
+        return None
+    profile = whisper_config.get('profiles', {}).get(name)
+    if profile is None:
+        print(f"[WARN] Whisper 档位不存在: {name}，使用默认参数")
+    return profile
+
+def get_profile_model(profile):
+    """按档位的精度和线程数获取模型，没有档位时使用配置的模型"""
+    if not profile:
+        return get_whisper_model()
+    return get_whisper_model(compute_type=profile.get('compute_type'), cpu_threads=profile.get('cpu_threads'))
+
+def apply_whisper_profile(profile, **kwargs):
+    """用档位中的 beam_size / VAD 参数覆盖 transcribe 参数"""
+    if profile:
+        for name in ('beam_size', 'vad_filter', 'vad_parameters'):
+            if name in profile:
+                kwargs[name] = profile[name]
+    return kwargs
+
+@contextmanager
+def whisper_inference_slot():
+    """占用一个识别名额；名额用完时排队等待
+    
+    faster-whisper 的 segments 是惰性生成器，必须在 with 块内把结果全部取完
+    """
+    max_concurrent = get_whisper_settings()['max_concurrent']
+    wait_start = time.time()
+    with WHISPER_INFERENCE_LOCK:
+        WHISPER_INFERENCE_STATS['waiting'] += 1
+        while WHISPER_INFERENCE_STATS['active'] >= max_concurrent:
+            WHISPER_INFERENCE_LOCK.wait()
+        WHISPER_INFERENCE_STATS['waiting'] -= 1
+        WHISPER_INFERENCE_STATS['active'] += 1
+        waited = time.time() - wait_start
+        WHISPER_INFERENCE_STATS['total_wait'] += waited
+        WHISPER_INFERENCE_STATS['max_wait'] = max(WHISPER_INFERENCE_STATS['max_wait'], waited)
+    if waited > 0.5:
+        print(f"[INFO] Whisper 排队等待 {waited:.1f}秒")
+    try:
+        yield
+    finally:
+        with WHISPER_INFERENCE_LOCK:
+            WHISPER_INFERENCE_STATS['active'] -= 1
+            WHISPER_INFERENCE_STATS['completed'] += 1
+            WHISPER_INFERENCE_LOCK.notify_all()
+
+def whisper_run_transcribe(model, audio, **kwargs):
+    """调用 model.transcribe，长音频自动改用 faster-whisper 的批量识别管线
+    
+    批量模式用 VAD 把音频切成语音片段后按 batch_size 成批解码，多核 CPU 上吞吐提升明显；
+    返回值结构与 model.transcribe 相同 (segments, info)。调用方需持有 whisper_inference_slot。
+    """
+    settings = get_whisper_settings()
+    batch_size = settings['batch_size']
+    if batch_size <= 1:
+        return model.transcribe(audio, **kwargs)
+    
+    try:
+        from faster_whisper import BatchedInferencePipeline, decode_audio
+    except ImportError:
+        print("[WARN] 当前 faster-whisper 版本不支持批量识别（需要 1.1+），改为逐段识别")
+        return model.transcribe(audio, **kwargs)
+    
+    # 先解码一次，按时长决定走哪条路径，两条路径都直接用解码后的数组
+    if not hasattr(audio, 'shape'):
+        audio = decode_audio(str(audio), sampling_rate=16000)
+    duration = len(audio) / 16000
+    if duration < settings['batch_min_duration']:
+        return model.transcribe(audio, **kwargs)
+    
+    # 批量管线必须开启 VAD；condition_on_previous_text 等参数原样传入（对齐路径显式传 False）。
+    # 它默认 without_timestamps=True，整个 VAD 片段只有一个时间段，字幕计时需要句级时间戳
+    kwargs['vad_filter'] = True
+    kwargs.setdefault('without_timestamps', False)
+    print(f"[INFO] Whisper 批量识别: 时长{duration:.0f}秒, batch_size={batch_size}")
+    pipeline = BatchedInferencePipeline(model=model)
+    return pipeline.transcribe(audio, batch_size=batch_size, **kwargs)
+
+# ============ 多进程并行识别 ============
+# 进程池常驻，每个 worker 进程启动时加载一次模型；配置变化时重建进程池
+WHISPER_PROCESS_POOL = {"pool": None, "config": None, "workers": 0}
+WHISPER_PROCESS_LOCK = threading.Lock()
+WHISPER_WORKER_MODEL = None  # worker 进程内的模型
+
+def parallel_worker_init(key, settings):
+    """worker 进程初始化：加载自己的模型实例"""
+    global WHISPER_WORKER_MODEL
+    WHISPER_WORKER_MODEL = load_whisper_model(key[0], key[1], key[2], settings)
+
+def parallel_transcribe_chunk(audio, offset, kwargs):
+    """在 worker 进程中识别一个音频块，时间戳加上块的起始偏移"""
+    segments, info = WHISPER_WORKER_MODEL.transcribe(audio, **kwargs)
+    results = []
+    for segment in segments:
+        words = None
+        if segment.words is not None:
+            words = [{"word": w.word, "start": w.start + offset, "end": w.end + offset} for w in segment.words]
+        results.append({
+            "start": segment.start + offset,
+            "end": segment.end + offset,
+            "text": segment.text,
+            "words": words
+        })
+    return results
+
+PARALLEL_BUDGET_WARNED = set()  # 已提示过内存上限不足的 (模型, 上限)
+
+def get_parallel_workers(key, settings):
+    """按配置的进程数和内存上限计算实际 worker 数，0 表示不启用"""
+    workers = settings['parallel_workers']
+    if workers <= 1:
+        return 0
+    if settings['parallel_memory_mb'] > 0:
+        model_mb = estimate_whisper_memory_mb(key[0])
+        workers = min(workers, int(settings['parallel_memory_mb'] // model_mb))
+        if workers <= 1 and (key[0], settings['parallel_memory_mb']) not in PARALLEL_BUDGET_WARNED:
+            PARALLEL_BUDGET_WARNED.add((key[0], settings['parallel_memory_mb']))
+            print(f"[WARN] parallel_memory_mb={settings['parallel_memory_mb']:.0f}MB 只够 {max(workers, 0)} 个 {key[0]} 模型进程"
+                  f"（每个约{model_mb:.0f}MB），多进程并行识别未启用；至少需要 {model_mb * 2:.0f}MB")
+    return workers if workers > 1 else 0
+
+def get_whisper_process_pool(key, settings, workers):
+    """获取（必要时创建/重建）识别进程池"""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    worker_settings = dict(settings)
+    if not worker_settings['cpu_threads']:
+        # 多个进程分摊 CPU 核心，避免线程数超订
+        worker_settings['cpu_threads'] = max(1, (os.cpu_count() or 1) // workers)
+    pool_config = (key, workers, worker_settings['cpu_threads'])
+    
+    with WHISPER_PROCESS_LOCK:
+        if WHISPER_PROCESS_POOL['pool'] is not None and WHISPER_PROCESS_POOL['config'] != pool_config:
+            print("[INFO] Whisper 并行识别配置已修改，重建进程池")
+            WHISPER_PROCESS_POOL['pool'].shutdown(wait=False)
+            WHISPER_PROCESS_POOL['pool'] = None
+        if WHISPER_PROCESS_POOL['pool'] is None:
+            print(f"[INFO] 启动 Whisper 识别进程池: {workers}个进程, 模型={key[0]}")
+            WHISPER_PROCESS_POOL['pool'] = ProcessPoolExecutor(
+                max_workers=workers,
+                # Flask 进程里有多个线程，fork 可能复制到被占用的锁，统一用 spawn
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=parallel_worker_init,
+                initargs=(key, worker_settings)
             )
-            print(f"[INFO] Whisper 模型加载完成！设备={device}, 精度={compute_type}, 语言={language}")
-            print("[INFO] 后续调用将直接使用缓存")
-            return WHISPER_MODEL
-        else:
-            print(f"[WARN] 本地模型不存在: {local_model_path}")
-            print(f"[INFO] 自动下载 Whisper {model_size} 模型...")
-            WHISPER_MODEL = WhisperModel(
-                model_size,
-                device=device,
-                compute_type=compute_type,
-                download_root=str(model_dir)
+            WHISPER_PROCESS_POOL['config'] = pool_config
+            WHISPER_PROCESS_POOL['workers'] = workers
+        return WHISPER_PROCESS_POOL['pool']
+
+def split_audio_at_silence(audio, chunk_seconds, sampling_rate=16000):
+    """用 VAD 找到语音区间，在静音处切成不超过 chunk_seconds 的块
+    
+    返回 [(起始采样点, 结束采样点)]，各块首尾相接覆盖整段音频
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+    
+    total = len(audio)
+    max_samples = int(chunk_seconds * sampling_rate)
+    speech = get_speech_timestamps(audio, VadOptions(
+        min_silence_duration_ms=500,
+        max_speech_duration_s=chunk_seconds
+    ))
+    
+    chunks = []
+    chunk_start = 0
+    for prev, cur in zip(speech, speech[1:]):
+        if cur['end'] - chunk_start > max_samples:
+            # 在两段语音之间的静音中点切开
+            cut = (prev['end'] + cur['start']) // 2
+            if cut > chunk_start:
+                chunks.append((chunk_start, cut))
+                chunk_start = cut
+    chunks.append((chunk_start, total))
+    
+    # 长时间没有静音（或 VAD 没检测到语音）的块按固定长度硬切
+    result = []
+    for start, end in chunks:
+        pieces = max(1, -(-(end - start) // max_samples))
+        step = -(-(end - start) // pieces)
+        result.extend((pos, min(pos + step, end)) for pos in range(start, end, step))
+    return result
+
+def whisper_parallel_iter(key, audio, **kwargs):
+    """长音频多进程并行识别，按时间顺序逐块产出段落；不满足条件时返回 None
+    
+    audio 为 16kHz 的 float32 数组
+    """
+    settings = get_whisper_settings()
+    workers = get_parallel_workers(key, settings)
+    if not workers:
+        return None
+    
+    duration = len(audio) / 16000
+    if duration < settings['parallel_min_duration']:
+        return None
+    
+    chunks = split_audio_at_silence(audio, settings['parallel_chunk_seconds'])
+    pool = get_whisper_process_pool(key, settings, workers)
+    print(f"[INFO] Whisper 并行识别: 时长{duration:.0f}秒, 切成{len(chunks)}块, {workers}个进程")
+    futures = [
+        pool.submit(parallel_transcribe_chunk, audio[start:end], start / 16000, kwargs)
+        for start, end in chunks
+    ]
+    
+    def generate():
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            for future in futures:
+                yield from future.result()
+        except BrokenProcessPool:
+            # worker 进程崩溃（例如模型加载失败），丢弃进程池，下次重新创建
+            with WHISPER_PROCESS_LOCK:
+                if WHISPER_PROCESS_POOL['pool'] is pool:
+                    WHISPER_PROCESS_POOL['pool'] = None
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    return generate(), duration
+
+# ============ 独立 Whisper worker 进程 ============
+# 开启 whisper.worker 后，模型由 whisper_worker.py 守护进程持有，多个 Web 进程通过本地 socket
+# 共用；worker 崩溃时由守护进程自动重启，Web 进程等待重连，超时后可退回本进程识别
+WHISPER_WORKER_STATE = {"alive": None, "checked_at": 0.0, "error": None}
+WHISPER_WORKER_LOCK = threading.Lock()
+
+class WhisperWorkerError(RuntimeError):
+    """worker 进程不可用或识别失败"""
+
+class WhisperWorkerHandle:
+    """worker 进程中模型的句柄，代替本地模型传给识别函数"""
+    def __init__(self, key):
+        self.key = key
+
+# 未配置 authkey 时使用首次运行生成的随机密钥（仅当前用户可读），Web 进程和 worker 共用
+WORKER_AUTHKEY_FILE = BASE_DIR / "worker.key"
+# 旧版本示例配置里的公开默认值，不再接受
+LEGACY_WORKER_AUTHKEY = "voice-clone-whisper"
+WORKER_AUTHKEY_WARNED = False
+
+def get_worker_authkey(configured):
+    """worker 认证密钥：优先使用配置的 authkey，否则使用本机随机密钥
+    
+    multiprocessing.connection 会反序列化已认证客户端发来的数据，知道密钥就能在 worker 进程中执行代码，
+    所以不提供公开的默认值
+    """
+    global WORKER_AUTHKEY_WARNED
+    if configured and configured != LEGACY_WORKER_AUTHKEY:
+        return configured
+    if configured and not WORKER_AUTHKEY_WARNED:
+        WORKER_AUTHKEY_WARNED = True
+        print(f"[WARN] whisper.worker.authkey 是公开的旧默认值，已改用本机随机密钥 {WORKER_AUTHKEY_FILE}")
+    
+    if not WORKER_AUTHKEY_FILE.exists():
+        import secrets
+        tmp_path = WORKER_AUTHKEY_FILE.with_name(f"worker.key.{uuid.uuid4().hex[:6]}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # 多个进程同时首次启动时只有一个能创建成功，其余读取它生成的密钥
+            os.link(tmp_path, WORKER_AUTHKEY_FILE)
+            print(f"[INFO] 已生成 Whisper worker 密钥: {WORKER_AUTHKEY_FILE}")
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+    return WORKER_AUTHKEY_FILE.read_text(encoding='utf-8').strip()
+
+def get_whisper_worker_config():
+    config = get_config()
+    worker_config = config.get('whisper', {}).get('worker', {})
+    return {
+        "enabled": worker_config.get('enabled', False),
+        "address": worker_config.get('address', '127.0.0.1:7861'),
+        "authkey": worker_config.get('authkey', ''),  # 留空使用 get_worker_authkey 生成的本机密钥
+        "timeout": float(worker_config.get('timeout', 600)),           # 单次识别等待结果的超时(秒)
+        "connect_wait": float(worker_config.get('connect_wait', 10)),  # worker 重启期间等待重连的时间(秒)
+        "fallback_local": worker_config.get('fallback_local', True),   # worker 不可用时在本进程识别
+        "batch_window_ms": float(worker_config.get('batch_window_ms', 50)),
+        "max_batch": int(worker_config.get('max_batch', 8))
+    }
+
+def parse_worker_address(address):
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+def whisper_worker_connect(worker_config, wait=None):
+    """连接 worker；worker 正在重启时在 wait 秒内重试"""
+    from multiprocessing.connection import Client
+    
+    address = parse_worker_address(worker_config['address'])
+    authkey = get_worker_authkey(worker_config['authkey']).encode('utf-8')
+    deadline = time.time() + (worker_config['connect_wait'] if wait is None else wait)
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except (OSError, EOFError) as e:
+            if time.time() >= deadline:
+                raise WhisperWorkerError(f"无法连接 Whisper worker {worker_config['address']}: {e}")
+            time.sleep(0.5)
+
+def whisper_worker_call(message, worker_config=None, timeout=None):
+    """发送一条请求并等待单个回复（ping / load / status）"""
+    worker_config = worker_config or get_whisper_worker_config()
+    conn = whisper_worker_connect(worker_config)
+    try:
+        conn.send(message)
+        if not conn.poll(timeout or worker_config['timeout']):
+            raise WhisperWorkerError("等待 Whisper worker 回复超时")
+        reply = conn.recv()
+    except (OSError, EOFError) as e:
+        raise WhisperWorkerError(f"Whisper worker 连接中断: {e}")
+    finally:
+        conn.close()
+    if not reply.get('ok'):
+        raise WhisperWorkerError(reply.get('error', 'worker 返回错误'))
+    return reply
+
+def whisper_worker_available():
+    """worker 是否可用（结果缓存 5 秒，避免每次识别都 ping）"""
+    worker_config = get_whisper_worker_config()
+    if not worker_config['enabled']:
+        return False
+    with WHISPER_WORKER_LOCK:
+        if time.time() - WHISPER_WORKER_STATE['checked_at'] < 5 and WHISPER_WORKER_STATE['alive'] is not None:
+            return WHISPER_WORKER_STATE['alive']
+    try:
+        whisper_worker_call({"op": "ping"}, worker_config, timeout=5)
+        alive, error = True, None
+    except WhisperWorkerError as e:
+        alive, error = False, str(e)
+        print(f"[WARN] {e}")
+    with WHISPER_WORKER_LOCK:
+        WHISPER_WORKER_STATE.update(alive=alive, checked_at=time.time(), error=error)
+    return alive
+
+def whisper_worker_transcribe(key, audio, result, segments_list, kwargs):
+    """在 worker 进程中识别，worker 每解码一段就推送一段"""
+    worker_config = get_whisper_worker_config()
+    conn = whisper_worker_connect(worker_config)
+    try:
+        # 本机文件直接传路径，由 worker 读取；内存中的音频传数组
+        conn.send({
+            "op": "transcribe",
+            "key": key,
+            "audio": audio if hasattr(audio, 'shape') else str(audio),
+            "kwargs": kwargs
+        })
+        while True:
+            if not conn.poll(worker_config['timeout']):
+                raise WhisperWorkerError("等待 Whisper worker 识别结果超时")
+            message = conn.recv()
+            if not message.get('ok'):
+                raise WhisperWorkerError(message.get('error', 'worker 识别失败'))
+            if 'info' in message:
+                result.update(message['info'], segments=segments_list)
+            elif 'segment' in message:
+                segments_list.append(message['segment'])
+                yield message['segment']
+            elif message.get('done'):
+                return
+    except (OSError, EOFError) as e:
+        with WHISPER_WORKER_LOCK:
+            WHISPER_WORKER_STATE.update(alive=None, checked_at=0.0)
+        raise WhisperWorkerError("Whisper worker 连接中断（可能正在重启）" + (f": {e}" if str(e) else ""))
+    finally:
+        conn.close()
+
+def get_whisper_worker_status():
+    worker_config = get_whisper_worker_config()
+    if not worker_config['enabled']:
+        return {"enabled": False}
+    status = {"enabled": True, "address": worker_config['address']}
+    try:
+        reply = whisper_worker_call({"op": "status"}, worker_config, timeout=5)
+        status.update(alive=True, **reply['status'])
+    except WhisperWorkerError as e:
+        status.update(alive=False, error=str(e))
+    return status
+
+# ============ 远程识别节点 ============
+# whisper.remote.nodes 列出其他机器上运行的本程序（需开启 whisper.remote.serve），
+# 识别请求发给负载最低的健康节点；节点全部不可用时退回本机（worker 进程或本进程）识别
+REMOTE_NODES = {}
+REMOTE_SESSIONS = {}
+REMOTE_LOCK = threading.Lock()
+REMOTE_MONITOR = None
+
+class WhisperRemoteHandle:
+    """远程节点识别的句柄，代替本地模型传给识别函数"""
+    def __init__(self, key):
+        self.key = key
+
+def get_whisper_remote_config():
+    config = get_config()
+    remote_config = config.get('whisper', {}).get('remote', {})
+    return {
+        "serve": remote_config.get('serve', False),  # 本机作为节点接受其他机器的识别请求
+        "nodes": [url.rstrip('/') for url in remote_config.get('nodes', [])],
+        "token": remote_config.get('token', ''),
+        "timeout": float(remote_config.get('timeout', 600)),
+        "health_interval": float(remote_config.get('health_interval', 10)),
+        "fallback_local": remote_config.get('fallback_local', True)
+    }
+
+def get_remote_node_state(url):
+    """节点状态（调用方持有 REMOTE_LOCK）"""
+    return REMOTE_NODES.setdefault(url, {
+        "healthy": None,
+        "inflight": 0,    # 本进程发出、还没返回的请求
+        "load": 0,        # 节点上报的正在识别 + 排队数
+        "capacity": 1,    # 节点上报的并发识别数
+        "checked_at": 0.0,
+        "error": None,
+        "completed": 0,
+        "failed": 0
+    })
+
+def mark_remote_node(url, healthy, error=None):
+    with REMOTE_LOCK:
+        state = get_remote_node_state(url)
+        if state['healthy'] and not healthy:
+            print(f"[WARN] 远程识别节点不可用: {url} ({error})")
+        elif state['healthy'] is False and healthy:
+            print(f"[INFO] 远程识别节点已恢复: {url}")
+        state.update(healthy=healthy, checked_at=time.time(), error=error)
+        return state
+
+def get_remote_session(url):
+    """节点的共享 Session：不在同一节点上重试，失败直接换下一个节点"""
+    with REMOTE_LOCK:
+        session = REMOTE_SESSIONS.get(url)
+        if session is None:
+            from requests.adapters import HTTPAdapter
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=get_upstream_config()['pool_size'], max_retries=0)
+            session = requests.Session()
+            session.trust_env = False  # 不走系统代理
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            REMOTE_SESSIONS[url] = session
+        return session
+
+def check_remote_node(url, remote_config):
+    """健康检查：节点可用时同时更新负载"""
+    try:
+        resp = get_remote_session(url).get(
+            f"{url}/api/worker/health",
+            headers={"X-Worker-Token": remote_config['token']},
+            timeout=(3, 5)
+        )
+        if resp.status_code != 200:
+            raise ValueError(f"HTTP {resp.status_code}")
+        data = resp.json()
+        if not isinstance(data, dict) or not data.get('success'):
+            raise ValueError("健康检查返回无效")
+        # 其他版本的节点可能缺少负载字段
+        load = int(data['active']) + int(data['waiting'])
+        capacity = max(1, int(data['max_concurrent']))
+        error = None
+    except (requests.exceptions.RequestException, ValueError, TypeError, KeyError) as e:
+        error = f"缺少字段 {e}" if isinstance(e, KeyError) else str(e)
+    state = mark_remote_node(url, error is None, error)
+    if error is None:
+        with REMOTE_LOCK:
+            state.update(load=load, capacity=capacity)
+    return error is None
+
+def remote_health_monitor():
+    """后台线程：定期检查所有节点，单次检查出错不会让线程退出"""
+    while True:
+        try:
+            remote_config = get_whisper_remote_config()
+            time.sleep(max(1.0, remote_config['health_interval']))
+            for url in remote_config['nodes']:
+                check_remote_node(url, remote_config)
+        except Exception as e:
+            print(f"[WARN] 远程节点健康检查失败: {e}")
+            time.sleep(1)
+
+def start_remote_health_monitor(remote_config):
+    """首次使用远程节点时同步检查一遍，并启动后台健康检查"""
+    global REMOTE_MONITOR
+    with REMOTE_LOCK:
+        if REMOTE_MONITOR is not None:
+            return
+        REMOTE_MONITOR = threading.Thread(target=remote_health_monitor, daemon=True)
+    for url in remote_config['nodes']:
+        check_remote_node(url, remote_config)
+    REMOTE_MONITOR.start()
+
+def whisper_remote_available():
+    """是否有健康的远程节点"""
+    remote_config = get_whisper_remote_config()
+    if not remote_config['nodes']:
+        return False
+    start_remote_health_monitor(remote_config)
+    with REMOTE_LOCK:
+        return any(get_remote_node_state(url)['healthy'] for url in remote_config['nodes'])
+
+def pick_remote_node(nodes, exclude):
+    """选择负载最低的健康节点：(节点上报的排队数 + 本进程在途数) / 并发数"""
+    with REMOTE_LOCK:
+        candidates = [(url, get_remote_node_state(url)) for url in nodes if url not in exclude]
+        candidates = [(url, state) for url, state in candidates if state['healthy']]
+        if not candidates:
+            return None
+        url, state = min(candidates, key=lambda item: (item[1]['load'] + item[1]['inflight']) / item[1]['capacity'])
+        state['inflight'] += 1
+        return url
+
+def whisper_remote_transcribe(key, audio, kwargs):
+    """把音频发给负载最低的节点识别，节点故障时换下一个；全部失败抛 WhisperWorkerError"""
+    remote_config = get_whisper_remote_config()
+    upstream_config = get_upstream_config()
+    if hasattr(audio, 'shape'):
+        # 已解码的音频直接传 16kHz float32 原始数据
+        files = {"audio": ("audio.f32", audio.astype('float32').tobytes(), "application/octet-stream")}
+        audio_format = "f32le"
+    else:
+        with open(audio, 'rb') as f:
+            files = {"audio": (os.path.basename(str(audio)), f.read(), "application/octet-stream")}
+        audio_format = "file"
+    form = {"model": key[0], "format": audio_format, "kwargs": json.dumps(kwargs, ensure_ascii=False)}
+    
+    tried = set()
+    while True:
+        url = pick_remote_node(remote_config['nodes'], tried)
+        if url is None:
+            raise WhisperWorkerError("没有可用的远程识别节点")
+        tried.add(url)
+        start = time.time()
+        try:
+            resp = get_remote_session(url).post(
+                f"{url}/api/worker/transcribe",
+                data=form,
+                files=files,
+                headers={"X-Worker-Token": remote_config['token']},
+                timeout=(upstream_config['connect_timeout'], remote_config['timeout'])
             )
-            print(f"[INFO] Whisper 模型下载并加载完成！")
-            return WHISPER_MODEL
-    except Exception as e:
-        print(f"[ERROR] 加载 Whisper 模型失败: {e}")
+            try:
+                data = resp.json()
+            except ValueError:
+                data = {}
+            if resp.status_code == 400:
+                # 请求本身有问题（例如音频无法解码），换节点也没用
+                with REMOTE_LOCK:
+                    state = get_remote_node_state(url)
+                    state['inflight'] -= 1
+                    state['completed'] += 1
+                raise RuntimeError(data.get('message') or '远程识别失败')
+            if resp.status_code != 200 or not data.get('success'):
+                # 5xx：节点上模型加载或识别出错；401/403/404：节点配置不对
+                raise ValueError(data.get('message') or f"HTTP {resp.status_code}")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # 节点故障：标记不可用，换下一个节点
+            print(f"[WARN] 远程节点 {url} 识别失败: {e}")
+            state = mark_remote_node(url, False, str(e))
+            with REMOTE_LOCK:
+                state['inflight'] -= 1
+                state['failed'] += 1
+            continue
+        
+        with REMOTE_LOCK:
+            state = get_remote_node_state(url)
+            state['inflight'] -= 1
+            state['completed'] += 1
+        print(f"[INFO] 远程节点 {url} 识别完成，耗时{time.time() - start:.1f}秒")
+        return data['result']
+
+def get_whisper_remote_status():
+    remote_config = get_whisper_remote_config()
+    with REMOTE_LOCK:
+        nodes = {url: dict(get_remote_node_state(url)) for url in remote_config['nodes']}
+    return {"serve": remote_config['serve'], "nodes": nodes}
+
+# 启动预热状态：idle -> loading -> ready / failed
+WHISPER_READINESS = {
+    "state": "idle",
+    "started_at": None,
+    "ready_at": None,
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "error": None
+}
+
+def warm_whisper_model(model):
+    """做一次空音频识别让 CTranslate2 初始化计算内核
+    
+    worker 句柄由 worker 进程自己加载并预热，返回 worker 报告的加载耗时；
+    远程句柄由各节点自己预热，这里只检查节点，没有可用节点时抛 WhisperWorkerError；本进程模型返回 None
+    """
+    if isinstance(model, WhisperRemoteHandle):
+        remote_config = get_whisper_remote_config()
+        healthy = [url for url in remote_config['nodes'] if check_remote_node(url, remote_config)]
+        if not healthy:
+            raise WhisperWorkerError("没有可用的远程识别节点")
         return None
+    if isinstance(model, WhisperWorkerHandle):
+        reply = whisper_worker_call({"op": "load", "key": model.key})
+        return reply.get('load_seconds')
+    
+    import numpy as np
+    with whisper_inference_slot():
+        segments, info = model.transcribe(
+            np.zeros(16000, dtype=np.float32),
+            language=get_whisper_settings()['language'],
+            beam_size=1
+        )
+        list(segments)
+    return None
+
+def preload_align_model():
+    """TTS 字幕按词对齐时预先加载并预热 align_model，避免第一次生成时冷启动"""
+    settings = get_whisper_settings()
+    if settings['alignment'] != 'words' or not settings['align_model'] or settings['align_model'] == settings['model']:
+        return
+    try:
+        start = time.time()
+        model = get_align_model(get_whisper_profile())
+        if model is None:
+            raise RuntimeError("模型加载失败")
+        warm_whisper_model(model)
+        print(f"[INFO] 对齐模型 {settings['align_model']} 预热完成，耗时{time.time() - start:.1f}秒")
+    except Exception as e:
+        # 对齐模型不可用时字幕退回 segment 时间戳，不影响就绪状态
+        print(f"[WARN] 对齐模型 {settings['align_model']} 预热失败: {e}")
+
+def preload_whisper_model():
+    """启动时在后台加载 Whisper 模型（和字幕对齐模型），并做一次空音频识别让 CTranslate2 初始化计算内核"""
+    WHISPER_READINESS.update(state="loading", started_at=time.time(), error=None)
+    try:
+        start = time.time()
+        # 加载默认档位（whisper.profile）使用的模型，未设置档位时即配置的模型
+        model = get_profile_model(get_whisper_profile())
+        if model is None:
+            raise RuntimeError("Whisper 模型加载失败")
+        load_seconds = time.time() - start
+        
+        start = time.time()
+        reported_load_seconds = warm_whisper_model(model)
+        if reported_load_seconds is not None:
+            load_seconds = reported_load_seconds
+        warmup_seconds = time.time() - start
+        preload_align_model()
+        
+        WHISPER_READINESS.update(
+            state="ready",
+            ready_at=time.time(),
+            load_seconds=round(load_seconds, 2),
+            warmup_seconds=round(warmup_seconds, 2)
+        )
+        print(f"[INFO] Whisper 预热完成：加载{load_seconds:.1f}秒，首次推理{warmup_seconds:.1f}秒")
+    except Exception as e:
+        WHISPER_READINESS.update(state="failed", error=str(e))
+        print(f"[ERROR] Whisper 预热失败: {e}")
+
+def get_whisper_status():
+    """模型加载状态和识别队列统计"""
+    settings = get_whisper_settings()
+    with WHISPER_INFERENCE_LOCK:
+        stats = dict(WHISPER_INFERENCE_STATS)
+    started = stats['completed'] + stats['active']
+    stats['avg_wait'] = round(stats['total_wait'] / started, 3) if started else 0.0
+    stats['total_wait'] = round(stats['total_wait'], 3)
+    stats['max_wait'] = round(stats['max_wait'], 3)
+    stats['max_concurrent'] = settings['max_concurrent']
+    with WHISPER_MODEL_LOCK:
+        models = [
+            {
+                "model": key[0],
+                "device": key[1],
+                "compute_type": key[2],
+                "cpu_threads": key[3],
+                "active": key == WHISPER_ACTIVE_KEY,
+                "load_seconds": round(entry['load_seconds'], 2),
+                "idle_seconds": round(time.time() - entry['last_used'], 1),
+                "memory_mb": entry['memory_mb'],
+                "resident_mb": entry['resident_mb']
+            }
+            for key, entry in WHISPER_MODELS.items()
+        ]
+        swapping = [key[0] for key in WHISPER_SWAPPING]
+    with WHISPER_PROCESS_LOCK:
+        parallel_workers = WHISPER_PROCESS_POOL['workers'] if WHISPER_PROCESS_POOL['pool'] else 0
+    rss = get_process_rss_mb()
+    return {
+        "model": settings['model'],
+        "loaded": any(m['active'] for m in models),
+        "models": models,
+        "swapping": swapping,
+        "memory_budget_mb": settings['memory_budget_mb'],
+        "resident_model_mb": round(sum(m['resident_mb'] or m['memory_mb'] for m in models), 1),
+        "process_rss_mb": round(rss, 1) if rss is not None else None,
+        "process_memory_mb": settings['process_memory_mb'],
+        "idle_unload_seconds": settings['idle_unload_seconds'],
+        "parallel_workers": parallel_workers,
+        "worker": get_whisper_worker_status(),
+        "remote": get_whisper_remote_status(),
+        "queue": stats
+    }
 
 # API密钥优先从新配置读取，没有则从旧配置读取
 def get_tts_api_key():
@@ -179,6 +1161,264 @@ def save_voices_db(voices):
     with open(VOICES_JSON, 'w', encoding='utf-8') as f:
         json.dump(voices, f, ensure_ascii=False, indent=2)
 
+# ============ 上游 HTTP 客户端 ============
+# 所有 SiliconFlow 调用共用：每个 base_url 一个连接池（keep-alive），
+# 429/5xx 指数退避重试，按接口设置超时，连续失败时熔断一段时间
+UPSTREAM_SESSIONS = {}
+UPSTREAM_BREAKERS = {}
+UPSTREAM_LOCK = threading.Lock()
+
+# 各接口的读取超时（秒），可在 config.json 的 upstream.timeouts 中覆盖
+UPSTREAM_TIMEOUTS = {
+    "upload": 60,
+    "voice_list": 30,
+    "voice_delete": 30,
+    "speech": 180,
+    "split": 30,
+    "optimize": 180
+}
+
+class UpstreamUnavailableError(requests.exceptions.ConnectionError):
+    """熔断打开期间拒绝请求"""
+
+class RateLimitTimeoutError(requests.exceptions.RequestException):
+    """限流排队超过最长等待时间"""
+
+def get_upstream_config():
+    config = get_config()
+    upstream_config = config.get('upstream', {})
+    timeouts = dict(UPSTREAM_TIMEOUTS)
+    timeouts.update(upstream_config.get('timeouts', {}))
+    return {
+        "pool_size": int(upstream_config.get('pool_size', 10)),
+        "retries": int(upstream_config.get('retries', 3)),
+        "backoff": float(upstream_config.get('backoff', 0.5)),
+        "connect_timeout": float(upstream_config.get('connect_timeout', 5)),
+        "breaker_failures": int(upstream_config.get('breaker_failures', 5)),
+        "breaker_cooldown": float(upstream_config.get('breaker_cooldown', 30)),
+        "timeouts": timeouts
+    }
+
+def get_upstream_session(base_url):
+    """获取 base_url 对应的共享 Session（首次调用时创建连接池）"""
+    with UPSTREAM_LOCK:
+        session = UPSTREAM_SESSIONS.get(base_url)
+        if session is not None:
+            return session
+        
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        upstream_config = get_upstream_config()
+        retry = Retry(
+            total=upstream_config['retries'],
+            connect=upstream_config['retries'],
+            read=0,  # 读取中途断开不重试，避免重复计费
+            status=upstream_config['retries'],
+            backoff_factor=upstream_config['backoff'],
+            status_forcelist=(500, 502, 503, 504),  # 429 由 upstream_request 结合限流器处理
+            allowed_methods=None,  # POST 也重试
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=upstream_config['pool_size'],
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.trust_env = False  # 不走系统代理
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        UPSTREAM_SESSIONS[base_url] = session
+        return session
+
+def upstream_breaker_check(base_url):
+    """熔断打开时抛出 UpstreamUnavailableError"""
+    with UPSTREAM_LOCK:
+        breaker = UPSTREAM_BREAKERS.get(base_url)
+        if breaker and breaker['open_until'] > time.time():
+            remaining = breaker['open_until'] - time.time()
+            raise UpstreamUnavailableError(f"{base_url} 连续失败，已熔断，{remaining:.0f}秒后重试")
+
+def upstream_breaker_record(base_url, success):
+    """记录一次调用结果，连续失败达到阈值时打开熔断"""
+    upstream_config = get_upstream_config()
+    with UPSTREAM_LOCK:
+        breaker = UPSTREAM_BREAKERS.setdefault(base_url, {"failures": 0, "open_until": 0})
+        if success:
+            breaker['failures'] = 0
+            breaker['open_until'] = 0
+            return
+        breaker['failures'] += 1
+        if breaker['failures'] >= upstream_config['breaker_failures']:
+            breaker['open_until'] = time.time() + upstream_config['breaker_cooldown']
+            print(f"[WARN] {base_url} 连续失败{breaker['failures']}次，熔断{upstream_config['breaker_cooldown']:.0f}秒")
+
+# ============ 模型限流 ============
+# 每个模型一个令牌桶（config.json 的 rate_limits，按模型名配置 rpm 和 burst）。
+# 令牌允许为负数，表示已预约的请求，按预约顺序排队；收到 429 时按 Retry-After 暂停整个桶
+RATE_LIMITERS = {}
+RATE_LIMIT_LOCK = threading.Lock()
+
+def get_rate_limit_config(key):
+    """返回模型的限流设置 {"rate": 每秒请求数, "burst": 突发容量}，未配置时返回 None"""
+    rate_limits = get_config().get('rate_limits', {})
+    limit = rate_limits.get(key) or rate_limits.get('default')
+    if not isinstance(limit, dict) or not limit.get('rpm'):
+        return None
+    return {
+        "rate": float(limit['rpm']) / 60.0,
+        "burst": max(1.0, float(limit.get('burst', 1)))
+    }
+
+def rate_limit_acquire(key, enforce_max_wait=True):
+    """为一次请求预约令牌，必要时排队等待
+    
+    等待超过 rate_limits.max_wait 秒时抛出 RateLimitTimeoutError（429 后的重试不受此限制）
+    """
+    limit = get_rate_limit_config(key) if key else None
+    if limit is None:
+        return 0.0
+    max_wait = float(get_config().get('rate_limits', {}).get('max_wait', 30))
+    
+    with RATE_LIMIT_LOCK:
+        now = time.time()
+        bucket = RATE_LIMITERS.setdefault(key, {"tokens": limit['burst'], "updated": now, "waiting": 0})
+        # 补充令牌（暂停期间 updated 在未来，不补充）
+        if now > bucket['updated']:
+            bucket['tokens'] = min(limit['burst'], bucket['tokens'] + (now - bucket['updated']) * limit['rate'])
+            bucket['updated'] = now
+        ready_at = bucket['updated'] + max(0.0, (1 - bucket['tokens']) / limit['rate'])
+        wait = ready_at - now
+        if enforce_max_wait and wait > max_wait:
+            raise RateLimitTimeoutError(f"{key} 请求过多，排队需要{wait:.0f}秒，超过上限{max_wait:.0f}秒")
+        bucket['tokens'] -= 1
+        bucket['waiting'] += 1
+    
+    if wait > 0:
+        print(f"[INFO] 限流排队: {key} 等待{wait:.1f}秒")
+        time.sleep(wait)
+    with RATE_LIMIT_LOCK:
+        bucket['waiting'] -= 1
+    return wait
+
+def rate_limit_penalize(key, retry_after):
+    """收到 429 后暂停该模型的令牌桶 retry_after 秒，并清空剩余令牌"""
+    if not key or get_rate_limit_config(key) is None:
+        return
+    with RATE_LIMIT_LOCK:
+        bucket = RATE_LIMITERS.get(key)
+        if bucket is None:
+            return
+        bucket['tokens'] = min(bucket['tokens'], 0.0)
+        bucket['updated'] = max(bucket['updated'], time.time() + retry_after)
+    print(f"[WARN] {key} 触发服务商限流，暂停{retry_after:.1f}秒")
+
+def parse_retry_after(resp, default):
+    """解析 Retry-After 头（秒数或HTTP日期）"""
+    value = resp.headers.get('Retry-After')
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return default
+
+def get_rate_limit_status():
+    """各模型令牌桶的当前状态"""
+    now = time.time()
+    with RATE_LIMIT_LOCK:
+        status = {}
+        for key, bucket in RATE_LIMITERS.items():
+            limit = get_rate_limit_config(key)
+            tokens = bucket['tokens']
+            if limit and now > bucket['updated']:
+                tokens = min(limit['burst'], tokens + (now - bucket['updated']) * limit['rate'])
+            status[key] = {
+                "tokens": round(tokens, 2),
+                "waiting": bucket['waiting'],
+                "paused_for": round(max(0.0, bucket['updated'] - now), 1)
+            }
+        return status
+
+def request_file_objects(files):
+    """requests 的 files 参数中可以 seek 的文件对象
+    
+    files 可以是字典或 (字段名, 值) 列表，值为文件对象或 (文件名, 文件对象, ...) 元组
+    """
+    values = files.values() if isinstance(files, dict) else [value for _, value in files or []]
+    fileobjs = [value[1] if isinstance(value, (tuple, list)) else value for value in values]
+    return [f for f in fileobjs if hasattr(f, 'seek') and hasattr(f, 'tell')]
+
+def upstream_request(method, base_url, path, endpoint, api_key=None, headers=None, rate_key=None, **kwargs):
+    """通过共享连接池调用上游接口
+    
+    endpoint 是 UPSTREAM_TIMEOUTS 中的接口名，决定超时时间；rate_key 是限流用的模型名。
+    429 时按 Retry-After 暂停该模型并重新排队。返回 requests.Response
+    """
+    upstream_config = get_upstream_config()
+    
+    headers = dict(headers or {})
+    if api_key is not None:
+        headers["Authorization"] = f"Bearer {api_key}"
+    kwargs.setdefault('timeout', (upstream_config['connect_timeout'], upstream_config['timeouts'][endpoint]))
+    
+    session = get_upstream_session(base_url)
+    # 上传的文件在第一次发送后已读到末尾，429 重试前移回起始位置
+    file_positions = [(f, f.tell()) for f in request_file_objects(kwargs.get('files'))]
+    for attempt in range(upstream_config['retries'] + 1):
+        upstream_breaker_check(base_url)
+        rate_limit_acquire(rate_key, enforce_max_wait=(attempt == 0))
+        for fileobj, position in file_positions:
+            fileobj.seek(position)
+        try:
+            resp = session.request(method, f"{base_url}{path}", headers=headers, **kwargs)
+        except requests.exceptions.RequestException:
+            upstream_breaker_record(base_url, False)
+            raise
+        upstream_breaker_record(base_url, resp.status_code < 500)
+        
+        if resp.status_code != 429 or attempt == upstream_config['retries']:
+            return resp
+        retry_after = parse_retry_after(resp, upstream_config['backoff'] * (2 ** attempt))
+        resp.close()
+        if get_rate_limit_config(rate_key) is not None:
+            rate_limit_penalize(rate_key, retry_after)
+        else:
+            time.sleep(retry_after)
+    return resp
+
+@app.route('/api/upstream/status')
+def api_upstream_status():
+    """上游熔断和模型限流状态"""
+    now = time.time()
+    with UPSTREAM_LOCK:
+        breakers = {
+            base_url: {"failures": b['failures'], "open_for": round(max(0.0, b['open_until'] - now), 1)}
+            for base_url, b in UPSTREAM_BREAKERS.items()
+        }
+    return jsonify({"success": True, "breakers": breakers, "rate_limits": get_rate_limit_status()})
+
+def warm_upstream_connections():
+    """启动时预先建立到各上游的连接（TCP+TLS握手），放入连接池"""
+    config = get_config()
+    base_urls = set()
+    for section in ('tts', 'indextts2', 'moss', 'llm_split', 'llm_optimize'):
+        base_url = config.get(section, {}).get('base_url')
+        if base_url:
+            base_urls.add(base_url)
+    
+    for base_url in base_urls:
+        try:
+            get_upstream_session(base_url).head(base_url, timeout=5)
+            print(f"[INFO] 已预热上游连接: {base_url}")
+        except requests.exceptions.RequestException as e:
+            print(f"[WARN] 预热上游连接失败 {base_url}: {e}")
+
 # ============ API 函数 ============
 def upload_voice_to_server(file_path, custom_name, ref_text, model=None):
     """上传音频到SiliconFlow服务器，获取预置音色uri"""
@@ -190,18 +1430,15 @@ def upload_voice_to_server(file_path, custom_name, ref_text, model=None):
     if model is None:
         model = config['tts'].get('model', 'FunAudioLLM/CosyVoice2-0.5B')
     
-    url = f"{base_url}/uploads/audio/voice"
-    headers = {"Authorization": f"Bearer {api_key}"}
-    
     with open(file_path, 'rb') as f:
-        files = {"file": f}
-        data = {
-            "model": model,
-            "customName": custom_name,
-            "text": ref_text
-        }
-        resp = requests.post(url, headers=headers, files=files, data=data, 
-                           timeout=60, proxies={"http": None, "https": None})
+        files = {"file": (os.path.basename(file_path), f.read())}
+    data = {
+        "model": model,
+        "customName": custom_name,
+        "text": ref_text
+    }
+    resp = upstream_request("POST", base_url, "/uploads/audio/voice", "upload",
+                            api_key=api_key, files=files, data=data)
     
     if resp.status_code == 200:
         result = resp.json()
@@ -215,9 +1452,7 @@ def get_server_voices():
     api_key = config['tts'].get('api_key') or LEGACY_CONFIG.get('siliconflow_api_key', '')
     base_url = config['tts'].get('base_url', 'https://api.siliconflow.cn/v1')
     
-    url = f"{base_url}/audio/voice/list"
-    headers = {"Authorization": f"Bearer {api_key}"}
-    resp = requests.get(url, headers=headers, timeout=30, proxies={"http": None, "https": None})
+    resp = upstream_request("GET", base_url, "/audio/voice/list", "voice_list", api_key=api_key)
     if resp.status_code == 200:
         return resp.json()
     return {"result": []}
@@ -228,50 +1463,314 @@ def delete_server_voice(uri):
     api_key = config['tts'].get('api_key') or LEGACY_CONFIG.get('siliconflow_api_key', '')
     base_url = config['tts'].get('base_url', 'https://api.siliconflow.cn/v1')
     
-    url = f"{base_url}/audio/voice/deletions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    resp = requests.post(url, headers=headers, json={"uri": uri}, 
-                        timeout=30, proxies={"http": None, "https": None})
+    resp = upstream_request("POST", base_url, "/audio/voice/deletions", "voice_delete",
+                            api_key=api_key, json={"uri": uri})
     return resp.status_code == 200
 
+# ============ 识别结果缓存 ============
+# Whisper 结果（segments/words/language/duration）存在 SQLite 中，
+# 键为 音频内容哈希 + 模型 + 识别参数，超过容量上限时淘汰最久未用的记录
+TRANSCRIPT_CACHE_DB = BASE_DIR / "cache" / "transcripts.db"
+TRANSCRIPT_CACHE_LOCK = threading.Lock()
+TRANSCRIPT_CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+def get_transcript_cache_config():
+    config = get_config()
+    cache_config = config.get('transcript_cache', {})
+    return {
+        "enabled": cache_config.get('enabled', True),
+        "max_mb": float(cache_config.get('max_mb', 256))
+    }
+
+def transcript_cache_connect():
+    """打开缓存数据库（每次调用新建连接，sqlite 连接不跨线程共享）"""
+    import sqlite3
+    TRANSCRIPT_CACHE_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(TRANSCRIPT_CACHE_DB), timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS transcripts ("
+        "key TEXT PRIMARY KEY, result TEXT NOT NULL, size INTEGER NOT NULL, "
+        "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+    )
+    return conn
+
+def transcript_cache_key(audio, model_name, params):
+    """计算识别缓存键：音频内容哈希 + 模型 + 识别参数"""
+    import hashlib
+    digest = hashlib.sha256()
+    if hasattr(audio, 'tobytes'):
+        digest.update(audio.tobytes())
+    else:
+        with open(audio, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    key_data = json.dumps([model_name, params], sort_keys=True, ensure_ascii=False)
+    digest.update(key_data.encode('utf-8'))
+    return digest.hexdigest()
+
+def transcript_cache_get(key):
+    """读取缓存结果，命中时刷新最近使用时间"""
+    with TRANSCRIPT_CACHE_LOCK:
+        conn = transcript_cache_connect()
+        try:
+            row = conn.execute("SELECT result FROM transcripts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                TRANSCRIPT_CACHE_STATS['misses'] += 1
+                return None
+            conn.execute("UPDATE transcripts SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            TRANSCRIPT_CACHE_STATS['hits'] += 1
+            return json.loads(row[0])
+        finally:
+            conn.close()
+
+def transcript_cache_put(key, result, max_mb):
+    """写入缓存并按LRU淘汰超出容量的记录"""
+    data = json.dumps(result, ensure_ascii=False)
+    now = time.time()
+    with TRANSCRIPT_CACHE_LOCK:
+        conn = transcript_cache_connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts (key, result, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data.encode('utf-8')), now, now)
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+            limit = max_mb * 1024 * 1024
+            if total > limit:
+                rows = conn.execute(
+                    "SELECT key, size FROM transcripts WHERE key != ? ORDER BY last_used", (key,)
+                ).fetchall()
+                for old_key, size in rows:
+                    if total <= limit:
+                        break
+                    conn.execute("DELETE FROM transcripts WHERE key = ?", (old_key,))
+                    total -= size
+                    TRANSCRIPT_CACHE_STATS['evictions'] += 1
+            conn.commit()
+        finally:
+            conn.close()
+
+def get_transcript_cache_stats():
+    """识别缓存命中统计和占用空间"""
+    with TRANSCRIPT_CACHE_LOCK:
+        stats = dict(TRANSCRIPT_CACHE_STATS)
+        stats['entries'] = 0
+        stats['size_mb'] = 0.0
+        if TRANSCRIPT_CACHE_DB.exists():
+            conn = transcript_cache_connect()
+            try:
+                count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts").fetchone()
+            finally:
+                conn.close()
+            stats['entries'] = count
+            stats['size_mb'] = round(size / 1024 / 1024, 2)
+    return stats
+
+def get_whisper_model_key(model):
+    """反查模型的 (模型, 设备, 精度, CPU线程数)，不是通过注册表加载的模型返回 None"""
+    if isinstance(model, (WhisperWorkerHandle, WhisperRemoteHandle)):
+        return model.key
+    with WHISPER_MODEL_LOCK:
+        return WHISPER_MODEL_KEYS.get(model)
+
+def get_whisper_model_name(model):
+    """模型名称、设备和精度（作为缓存键的一部分，线程数不影响结果），未知模型返回 None"""
+    key = get_whisper_model_key(model)
+    return f"{key[0]}/{key[1]}/{key[2]}" if key else None
+
+def transcript_cache_params(kwargs, settings):
+    """识别参数加上会影响识别结果的配置（批量识别、多进程分块），作为缓存键的一部分"""
+    params = dict(kwargs)
+    if settings['batch_size'] > 1:
+        params['batch_size'] = settings['batch_size']
+        params['batch_min_duration'] = settings['batch_min_duration']
+    if settings['parallel_workers'] > 1:
+        params['parallel_min_duration'] = settings['parallel_min_duration']
+        params['parallel_chunk_seconds'] = settings['parallel_chunk_seconds']
+    return params
+
+def whisper_transcribe_iter(model, audio, result, **kwargs):
+    """逐段产出识别结果（解码出一段就产出一段），相同音频+模型+参数直接读缓存
+    
+    result 传入空字典，开始产出前写入 language/duration，全部取完后 segments 为完整列表。
+    每段为 {"start", "end", "text", "words"}，word_timestamps=False 时 words 为 None。
+    中途停止迭代时不写缓存。
+    """
+    cache_config = get_transcript_cache_config()
+    model_name = get_whisper_model_name(model)
+    key = None
+    if cache_config['enabled'] and model_name:
+        params = transcript_cache_params(kwargs, get_whisper_settings())
+        try:
+            key = transcript_cache_key(audio, model_name, params)
+            cached = transcript_cache_get(key)
+        except Exception as e:
+            print(f"[WARN] 读取识别缓存失败: {e}")
+            key = cached = None
+        if cached is not None:
+            print(f"[INFO] 识别缓存命中: {len(cached['segments'])}段")
+            result.update(cached)
+            yield from cached['segments']
+            return
+    
+    segments_list = []
+    model_key = get_whisper_model_key(model)
+    parallel = None
+    if model_key and not isinstance(model, (WhisperWorkerHandle, WhisperRemoteHandle)) and get_parallel_workers(model_key, get_whisper_settings()):
+        if not hasattr(audio, 'shape'):
+            # 先解码一次，并行/批量/普通识别都直接使用解码后的数组
+            from faster_whisper import decode_audio
+            audio = decode_audio(str(audio), sampling_rate=16000)
+        parallel = whisper_parallel_iter(model_key, audio, **kwargs)
+    if parallel is not None:
+        # 多进程识别不占用本进程的识别名额
+        segments, duration = parallel
+        result.update(language=kwargs.get('language'), duration=duration, segments=segments_list)
+        for item in segments:
+            segments_list.append(item)
+            yield item
+    else:
+        yield from whisper_collect_segments(model, audio, result, segments_list, **kwargs)
+    
+    if key is not None:
+        try:
+            transcript_cache_put(key, result, cache_config['max_mb'])
+        except Exception as e:
+            print(f"[WARN] 写入识别缓存失败: {e}")
+
+def whisper_collect_segments(model, audio, result, segments_list, **kwargs):
+    """在本进程内识别，逐段转换为可序列化的字典；model 为 worker/远程句柄时交给 worker/远程节点识别"""
+    if isinstance(model, WhisperRemoteHandle):
+        try:
+            remote_result = whisper_remote_transcribe(model.key, audio, kwargs)
+        except WhisperWorkerError as e:
+            if not get_whisper_remote_config()['fallback_local']:
+                raise
+            print(f"[WARN] {e}，改为本机识别")
+            model = get_whisper_model(*model.key, remote=False)
+            if model is None:
+                raise
+        else:
+            result.update(language=remote_result['language'], duration=remote_result['duration'], segments=segments_list)
+            for item in remote_result['segments']:
+                segments_list.append(item)
+                yield item
+            return
+    
+    if isinstance(model, WhisperWorkerHandle):
+        # worker 崩溃重启后重试一次；仍然失败且还没产出段落时退回本进程识别
+        for attempt in range(2):
+            try:
+                yield from whisper_worker_transcribe(model.key, audio, result, segments_list, kwargs)
+                return
+            except WhisperWorkerError as e:
+                # 已经产出的段落无法撤回
+                if segments_list:
+                    raise
+                error = e
+                print(f"[WARN] {e}")
+        if not get_whisper_worker_config()['fallback_local']:
+            raise error
+        print("[WARN] Whisper worker 识别失败，改为本进程识别")
+        model = get_whisper_model(*model.key, local=True)
+        if model is None:
+            raise error
+    
+    with whisper_inference_slot():
+        segments, info = whisper_run_transcribe(model, audio, **kwargs)
+        result.update(language=info.language, duration=info.duration, segments=segments_list)
+        for segment in segments:
+            words = None
+            if segment.words is not None:
+                words = [{"word": w.word, "start": w.start, "end": w.end} for w in segment.words]
+            item = {
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "words": words
+            }
+            segments_list.append(item)
+            yield item
+
+def whisper_transcribe_cached(model, audio, **kwargs):
+    """识别音频并返回可序列化的结果，相同音频+模型+参数直接读缓存
+    
+    返回 {"language", "duration", "segments": [{"start", "end", "text", "words"}]}，
+    word_timestamps=False 时 words 为 None
+    """
+    result = {}
+    for _ in whisper_transcribe_iter(model, audio, result, **kwargs):
+        pass
+    return result
+
+# ============ 繁简转换 ============
+# Whisper 中文输出常夹杂繁体，识别结果统一在这里转成简体；转换器只创建一次
+T2S_CONVERTER = None
+T2S_LOCK = threading.Lock()
+
+def get_t2s_converter():
+    """获取繁体转简体函数，OpenCC 未安装时原样返回"""
+    global T2S_CONVERTER
+    if T2S_CONVERTER is None:
+        with T2S_LOCK:
+            if T2S_CONVERTER is None:
+                try:
+                    from opencc import OpenCC
+                    T2S_CONVERTER = OpenCC('t2s').convert  # 繁体转简体
+                except Exception:
+                    print("[WARN] OpenCC 未安装，跳过繁简转换")
+                    T2S_CONVERTER = lambda text: text
+    return T2S_CONVERTER
+
+def normalize_segments_text(items, field='text'):
+    """把段落/词列表的文字转成简体（原地修改），返回拼接后的全文
+    
+    全文只转换一次，再按各段在全文中的偏移切回去；
+    个别词组转换后长度变化时，退回逐段转换
+    """
+    convert = get_t2s_converter()
+    texts = [item[field] for item in items]
+    full_text = ''.join(texts)
+    converted = convert(full_text)
+    if len(converted) == len(full_text):
+        offset = 0
+        for item, text in zip(items, texts):
+            item[field] = converted[offset:offset + len(text)]
+            offset += len(text)
+    else:
+        for item in items:
+            item[field] = convert(item[field])
+    return converted
+
 # ============ STT 语音识别函数 ============
-def stt_transcribe(audio_path):
-    """使用 faster-whisper 进行语音识别"""
+def stt_transcribe(audio_path, profile=None):
+    """使用 faster-whisper 进行语音识别（audio_path 也可以是已解码的 16kHz float32 数组）
+    
+    profile 为识别档位名称（fast / balanced / accurate），不传时使用 whisper.profile
+    """
     try:
-        model = get_whisper_model()
+        profile = get_whisper_profile(profile)
+        model = get_profile_model(profile)
         if model is None:
             return {"success": False, "message": "Whisper 模型加载失败"}
         
-        segments, info = model.transcribe(str(audio_path), language="zh", beam_size=5)
-        
-        # 收集所有文本
-        full_text = ""
-        segments_list = []
-        for segment in segments:
-            full_text += segment.text
-            segments_list.append({
-                "start": segment.start,
-                "end": segment.end,
-                "text": segment.text
-            })
+        audio = audio_path if hasattr(audio_path, 'shape') else str(audio_path)
+        result = whisper_transcribe_cached(model, audio, **apply_whisper_profile(profile, language="zh", beam_size=5))
         
-        # 繁简转换
-        try:
-            from opencc import OpenCC
-            cc = OpenCC('t2s')  # 繁体转简体
-            full_text_simplified = cc.convert(full_text)
-            for seg in segments_list:
-                seg['text'] = cc.convert(seg['text'])
-        except:
-            print("[WARN] OpenCC 未安装，跳过繁简转换")
-            full_text_simplified = full_text
+        segments_list = [
+            {"start": segment['start'], "end": segment['end'], "text": segment['text']}
+            for segment in result['segments']
+        ]
+        # 繁简转换（全文转换一次，再按偏移分回各段）
+        full_text_simplified = normalize_segments_text(segments_list)
         
         return {
             "success": True,
             "text": full_text_simplified,
             "segments": segments_list,
-            "language": info.language,
-            "duration": info.duration
+            "language": result['language'],
+            "duration": result['duration']
         }
     except Exception as e:
         import traceback
@@ -279,6 +1778,44 @@ def stt_transcribe(audio_path):
         print(f"[ERROR] STT识别失败: {error_detail}")
         return {"success": False, "message": f"识别失败: {str(e)}"}
 
+def stt_transcribe_stream(audio_path, profile=None):
+    """流式语音识别：每解码出一段就产出 ("segment", 段落)，最后产出 ("done", 汇总)
+    
+    段落已做繁简转换；出错时产出 ("error", {"message"})
+    """
+    try:
+        profile = get_whisper_profile(profile)
+        model = get_profile_model(profile)
+        if model is None:
+            yield "error", {"message": "Whisper 模型加载失败"}
+            return
+        
+        convert = get_t2s_converter()
+        audio = audio_path if hasattr(audio_path, 'shape') else str(audio_path)
+        result = {}
+        full_text = ""
+        kwargs = apply_whisper_profile(profile, language="zh", beam_size=5)
+        for index, segment in enumerate(whisper_transcribe_iter(model, audio, result, **kwargs)):
+            text = convert(segment['text'])
+            full_text += text
+            yield "segment", {
+                "index": index,
+                "start": segment['start'],
+                "end": segment['end'],
+                "text": text
+            }
+        
+        yield "done", {
+            "text": full_text,
+            "language": result['language'],
+            "duration": result['duration'],
+            "count": len(result['segments'])
+        }
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] STT流式识别失败: {traceback.format_exc()}")
+        yield "error", {"message": f"识别失败: {str(e)}"}
+
 # ============ HTML界面 ============
 HTML = r'''
 <!DOCTYPE html>
@@ -961,6 +2498,9 @@ HTML = r'''
                             </div>
                         </div>
                     </div>
+                    <label style="font-size:12px;color:#64748b;display:flex;align-items:center;gap:6px;margin-top:8px;">
+                        <input type="checkbox" id="incrementalMode"> 增量生成（再次生成时只重新合成修改过的句子）
+                    </label>
                 </div>
 
                 <!-- Voice Selection Card -->
@@ -1386,7 +2926,8 @@ HTML = r'''
             resultArea.style.display = 'none';
 
             try {
-                const res = await fetch('/api/tts', {
+                // 提交异步任务，音频开始下载后就可以边收边播
+                const res = await fetch('/api/jobs/tts', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify({
@@ -1394,18 +2935,52 @@ HTML = r'''
                         speed: parseFloat(speed),
                         voice_type: selectedVoice.type,
                         voice_value: selectedVoice.value,
-                        model: model
+                        model: model,
+                        incremental: document.getElementById('incrementalMode').checked,
+                        base_id: window.lastGenerationId || null
                     })
                 });
-                const data = await res.json();
+                const submitted = await res.json();
+                if (!submitted.success) {
+                    showMsg(msgDiv, submitted.message, false);
+                    return;
+                }
+
+                let playing = false;
+                const data = await new Promise((resolve, reject) => {
+                    const events = new EventSource(submitted.events_url);
+                    events.onmessage = (e) => {
+                        const job = JSON.parse(e.data);
+                        if (job.audio_file && !playing) {
+                            playing = true;
+                            resultArea.style.display = 'block';
+                            player.src = submitted.stream_url + '?t=' + Date.now();
+                            player.play().catch(() => {});
+                        }
+                        if (job.status === 'done' || job.status === 'failed') {
+                            events.close();
+                            resolve(job.result || { success: false, message: job.message });
+                        } else {
+                            showMsg(msgDiv, `${job.message}（${job.progress}%）`, true);
+                        }
+                    };
+                    events.addEventListener('error', (e) => {
+                        if (events.readyState === EventSource.CLOSED) {
+                            reject('任务状态连接中断');
+                        }
+                    });
+                });
+
                 showMsg(msgDiv, data.message, data.success);
                 if (data.success) {
                     // 显示结果区域
                     resultArea.style.display = 'block';
                     
-                    // 设置音频播放器
-                    player.src = data.audio_url + '?t=' + Date.now();
-                    player.play();
+                    // 流式播放没有开始时（如任务很快完成），直接加载完整音频
+                    if (!playing) {
+                        player.src = data.audio_url + '?t=' + Date.now();
+                        player.play().catch(() => {});
+                    }
                     
                     // 显示识别文本（如果有）
                     const recognizedTextArea = document.getElementById('recognizedTextArea');
@@ -1453,6 +3028,7 @@ HTML = r'''
                     window.lastSrtFile = data.srt_url ? data.srt_url.split('/').pop() : null;
                     window.lastJsonFile = data.json_url ? data.json_url.split('/').pop() : null;
                     window.lastSegments = data.segments || [];
+                    window.lastGenerationId = data.generation_id;
                     document.getElementById('davinciBtn').style.display = 'inline-flex';
                 }
             } catch(e) {
@@ -1778,31 +3354,70 @@ HTML = r'''
             }
             
             try {
+                // 流式识别：每识别出一段就追加到文本框，120秒没有新结果才算超时
                 const controller = new AbortController();
-                const timeoutId = setTimeout(() => controller.abort(), 120000); // 120秒超时
+                let timeoutId = setTimeout(() => controller.abort(), 120000);
                 
-                const res = await fetch('/api/stt', {
+                const res = await fetch('/api/stt/stream', {
                     method: 'POST',
                     body: formData,
                     signal: controller.signal
                 });
+                const contentType = res.headers.get('Content-Type') || '';
+                if (!res.ok || !res.body || !contentType.startsWith('text/event-stream')) {
+                    const data = await res.json().catch(() => ({}));
+                    clearTimeout(timeoutId);
+                    showMsg(msgDiv, data.message || '识别失败', false);
+                    return;
+                }
                 
-                clearTimeout(timeoutId);
-                const data = await res.json();
+                const resultText = document.getElementById('sttResultText');
+                resultText.value = '';
+                document.getElementById('sttResult').style.display = 'block';
+                window.sttSegments = [];
                 
-                if (data.success) {
-                    document.getElementById('sttResultText').value = data.text;
-                    document.getElementById('sttResult').style.display = 'block';
-                    document.getElementById('sttInsertBtn').style.display = 'inline-flex';
-                    document.getElementById('sttDownloadBtn').style.display = 'inline-flex';
-                    window.sttSegments = data.segments; // 保存字幕数据
-                    showMsg(msgDiv, `识别成功！语言: ${data.language || '未知'}, 时长: ${data.duration ? data.duration.toFixed(1) + '秒' : '未知'}`, true);
-                } else {
-                    showMsg(msgDiv, data.message || '识别失败', false);
+                const reader = res.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                let finished = false;
+                while (!finished) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    clearTimeout(timeoutId);
+                    timeoutId = setTimeout(() => controller.abort(), 120000);
+                    buffer += decoder.decode(value, { stream: true });
+                    
+                    let sep;
+                    while ((sep = buffer.indexOf('\n\n')) >= 0) {
+                        const block = buffer.slice(0, sep);
+                        buffer = buffer.slice(sep + 2);
+                        let event = 'message', payload = '';
+                        block.split('\n').forEach(line => {
+                            if (line.startsWith('event: ')) event = line.slice(7);
+                            else if (line.startsWith('data: ')) payload += line.slice(6);
+                        });
+                        if (!payload) continue;
+                        const data = JSON.parse(payload);
+                        
+                        if (event === 'segment') {
+                            resultText.value += data.text;
+                            window.sttSegments.push(data); // 保存字幕数据
+                            showMsg(msgDiv, `识别中... 已识别到 ${data.end.toFixed(1)} 秒`, true);
+                        } else if (event === 'done') {
+                            finished = true;
+                            document.getElementById('sttInsertBtn').style.display = 'inline-flex';
+                            document.getElementById('sttDownloadBtn').style.display = 'inline-flex';
+                            showMsg(msgDiv, `识别成功！语言: ${data.language || '未知'}, 时长: ${data.duration ? data.duration.toFixed(1) + '秒' : '未知'}`, true);
+                        } else if (event === 'error') {
+                            finished = true;
+                            showMsg(msgDiv, data.message || '识别失败', false);
+                        }
+                    }
                 }
+                clearTimeout(timeoutId);
             } catch(e) {
                 if (e.name === 'AbortError') {
-                    showMsg(msgDiv, '识别超时（超过2分钟），请使用较短的音频文件', false);
+                    showMsg(msgDiv, '识别超时（超过2分钟没有新结果）', false);
                 } else {
                     showMsg(msgDiv, '识别失败: ' + e, false);
                 }
@@ -2089,11 +3704,6 @@ def ai_split_text(text, max_chars=15):
 文本：{clean_text}"""
     
     try:
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "model": model,
             "messages": [
@@ -2104,13 +3714,8 @@ def ai_split_text(text, max_chars=15):
             "max_tokens": 2000
         }
         
-        resp = requests.post(
-            f"{base_url}/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30,
-            proxies={"http": None, "https": None}
-        )
+        resp = upstream_request("POST", base_url, "/chat/completions", "split",
+                                api_key=api_key, json=payload, rate_key=model)
         
         if resp.status_code == 200:
             result = resp.json()
@@ -2165,198 +3770,1147 @@ def generate_srt(segments_info, output_path):
     
     print(f"[INFO] SRT字幕已生成: {output_path}")
 
-@app.route('/api/tts', methods=['POST'])
-def api_tts():
-    """文字转语音 - 一次性生成音频，用Whisper识别精确时间戳"""
-    try:
-        data = request.json
-        text = data.get('text', '').strip()
-        voice_type = data.get('voice_type', '')
-        voice_value = data.get('voice_value', '')
-        speed = float(data.get('speed', 1.0))
-        model_type = data.get('model', 'cosyvoice')
-        
-        if not text:
-            return jsonify({"success": False, "message": "请输入文字"})
-        if not voice_value:
-            return jsonify({"success": False, "message": "请选择声音"})
-        
-        # 去除空格
-        text = text.replace(' ', '').replace('　', '')
-        
-        # 获取TTS配置
-        config = get_config()
-        tts_config = config['tts']
-        api_key = tts_config.get('api_key') or LEGACY_CONFIG.get('siliconflow_api_key', '')
-        base_url = tts_config.get('base_url', 'https://api.siliconflow.cn/v1')
-        
-        # 根据用户选择的模型类型，设置对应的模型名称
-        if model_type == 'moss':
-            tts_model = 'fnlp/MOSS-TTSD-v0.5'
-        elif model_type == 'indextts2':
-            tts_model = 'IndexTeam/IndexTTS-2'
-            print("[INFO] 使用 IndexTTS-2 模型")
-        else:  # cosyvoice
-            tts_model = 'FunAudioLLM/CosyVoice2-0.5B'
-        
-        print(f"[INFO] 使用模型: {tts_model}")
-        
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # 根据类型设置voice参数
-        if voice_type == "preset":
-            voice = f"{tts_model}:{voice_value}"
-        else:
-            voice = voice_value
-        
-        # ========== 第1步：一次性生成完整音频 ==========
-        print(f"[INFO] 生成音频: {text[:50]}...")
-        
-        # 所有模型统一使用 voice 参数（IndexTTS-2 也支持！）
-        payload = {
-            "model": tts_model,
-            "input": text,
-            "voice": voice,
-            "response_format": "mp3",
-            "sample_rate": 32000,
-            "speed": speed,
-            "max_tokens": 2048
-        }
-        
-        print(f"[DEBUG] Payload: model={payload['model']}, voice={payload['voice'][:50]}...")
-        
-        resp = requests.post(
-            f"{base_url}/audio/speech",
-            headers=headers,
-            json=payload,
-            timeout=180,
-            proxies={"http": None, "https": None}
-        )
-        
+# ============ 合成音频缓存 ============
+# 按 (模型, 音色, 语速, 采样率, 规范化文本) 的哈希存储已合成的音频，
+# 文件 mtime 作为最近使用时间，超过容量上限时淘汰最久未用的文件
+AUDIO_CACHE_DIR = BASE_DIR / "cache" / "audio"
+AUDIO_CACHE_LOCK = threading.Lock()
+AUDIO_CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+def get_audio_cache_config():
+    config = get_config()
+    cache_config = config.get('audio_cache', {})
+    return {
+        "enabled": cache_config.get('enabled', True),
+        "max_mb": float(cache_config.get('max_mb', 1024))
+    }
+
+def audio_cache_key(payload):
+    """计算合成请求的缓存键"""
+    import hashlib
+    # 规范化文本：去掉空白，全角空格同样处理
+    text = ''.join(payload.get('input', '').split()).replace('　', '')
+    key_data = json.dumps([
+        payload.get('model', ''),
+        payload.get('voice', ''),
+        float(payload.get('speed', 1.0)),
+        int(payload.get('sample_rate', 32000)),
+        payload.get('response_format', 'mp3'),
+        text
+    ], ensure_ascii=False)
+    return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+def audio_cache_get(key):
+    """读取缓存音频，命中时刷新最近使用时间"""
+    path = AUDIO_CACHE_DIR / f"{key}.mp3"
+    with AUDIO_CACHE_LOCK:
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            os.utime(path, None)
+            AUDIO_CACHE_STATS['hits'] += 1
+            return content
+        except FileNotFoundError:
+            AUDIO_CACHE_STATS['misses'] += 1
+            return None
+
+def audio_cache_put(key, content, max_mb):
+    """写入缓存并按LRU淘汰超出容量的文件"""
+    AUDIO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = AUDIO_CACHE_DIR / f"{key}.mp3"
+    tmp_path = AUDIO_CACHE_DIR / f"{key}.{uuid.uuid4().hex[:6]}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    
+    with AUDIO_CACHE_LOCK:
+        files = [(p, p.stat()) for p in AUDIO_CACHE_DIR.glob("*.mp3")]
+        total = sum(st.st_size for _, st in files)
+        limit = max_mb * 1024 * 1024
+        for p, st in sorted(files, key=lambda item: item[1].st_mtime):
+            if total <= limit:
+                break
+            if p == path:
+                continue
+            try:
+                p.unlink()
+                total -= st.st_size
+                AUDIO_CACHE_STATS['evictions'] += 1
+            except OSError:
+                pass
+
+def get_audio_cache_stats():
+    """缓存命中统计和占用空间"""
+    with AUDIO_CACHE_LOCK:
+        stats = dict(AUDIO_CACHE_STATS)
+        files = list(AUDIO_CACHE_DIR.glob("*.mp3")) if AUDIO_CACHE_DIR.exists() else []
+        stats['entries'] = len(files)
+        stats['size_mb'] = round(sum(p.stat().st_size for p in files) / 1024 / 1024, 2)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+    stats.update(get_audio_cache_config())
+    return stats
+
+def synthesize_speech(base_url, api_key, payload):
+    """调用 /audio/speech 合成一段语音，返回 (成功, 音频内容或错误信息)
+    
+    相同参数和文本的请求直接返回缓存音频，不再调用服务商
+    """
+    cache_config = get_audio_cache_config()
+    if cache_config['enabled']:
+        key = audio_cache_key(payload)
+        content = audio_cache_get(key)
+        if content is not None:
+            print(f"[INFO] 音频缓存命中: {key[:12]}")
+            return True, content
+    
+    resp = upstream_request("POST", base_url, "/audio/speech", "speech",
+                            api_key=api_key, json=payload, rate_key=payload.get('model'))
+    if resp.status_code != 200:
+        return False, resp.text
+    
+    if cache_config['enabled']:
+        audio_cache_put(key, resp.content, cache_config['max_mb'])
+    return True, resp.content
+
+def synthesize_speech_to_file(base_url, api_key, payload, output_path, on_start=None):
+    """流式下载合成音频，边接收边写入 output_path
+    
+    开始写文件时调用 on_start()，调用方可以据此提前开放播放。返回 (成功, 错误信息)
+    """
+    cache_config = get_audio_cache_config()
+    if cache_config['enabled']:
+        key = audio_cache_key(payload)
+        content = audio_cache_get(key)
+        if content is not None:
+            print(f"[INFO] 音频缓存命中: {key[:12]}")
+            with open(output_path, 'wb') as f:
+                f.write(content)
+            if on_start:
+                on_start()
+            return True, ""
+    
+    resp = upstream_request("POST", base_url, "/audio/speech", "speech",
+                            api_key=api_key, json=payload, stream=True, rate_key=payload.get('model'))
+    with resp:
         if resp.status_code != 200:
-            return jsonify({"success": False, "message": f"TTS错误: {resp.text[:200]}"})
-        
-        # 保存音频
-        timestamp = int(time.time())
-        out_name = f"tts_{timestamp}.mp3"
-        out_path = OUTPUT_DIR / out_name
-        with open(out_path, 'wb') as f:
-            f.write(resp.content)
-        print(f"[INFO] 音频已保存: {out_path}")
-        
-        # ========== 第2步：用AI分割原文 + Whisper获取时间戳 ==========
-        max_chars = TOOL_CONFIG.get('max_subtitle_chars', 15)
-        
-        # 先用AI智能分割原文（保证文字正确）
-        text_segments = ai_split_text(text, max_chars)
-        print(f"[INFO] 文本分割: {len(text_segments)}段")
-        
-        # 用Whisper获取时间戳
-        print("[INFO] 调用Whisper获取时间戳...")
-        whisper_timestamps = whisper_get_timestamps(str(out_path))
-        
-        # 合并：原文 + 时间戳
-        if whisper_timestamps and len(whisper_timestamps) > 0:
+            return False, resp.text
+        
+        with open(output_path, 'wb') as f:
+            if on_start:
+                on_start()
+            for block in resp.iter_content(chunk_size=16 * 1024):
+                if block:
+                    f.write(block)
+                    f.flush()
+    
+    if cache_config['enabled']:
+        with open(output_path, 'rb') as f:
+            audio_cache_put(key, f.read(), cache_config['max_mb'])
+    return True, ""
+
+def split_instruction(text):
+    """拆出开头的情感/方言指令（xxx<|endofprompt|>），返回 (指令, 正文)"""
+    import re
+    
+    match = re.match(r'^[^<\n]*<\|endofprompt\|>', text)
+    if match:
+        return match.group(0), text[len(match.group(0)):]
+    return "", text
+
+def split_text_into_chunks(text, chunk_chars=300):
+    """按句子边界把长文本拆成若干合成块，每块不超过chunk_chars字
+    
+    开头的情感/方言指令（xxx<|endofprompt|>）会加到每一块前面，保证整段语气一致
+    """
+    instruction, text = split_instruction(text)
+    
+    chunks = []
+    current = ""
+    for sentence in split_text_by_sentences(text, chunk_chars):
+        if current and len(current) + len(sentence) > chunk_chars:
+            chunks.append(current)
+            current = ""
+        current += sentence
+    if current:
+        chunks.append(current)
+    
+    return [instruction + chunk for chunk in chunks]
+
+def synthesize_chunked(base_url, api_key, payload, chunks, output_path, workers=4):
+    """多个文本块并行合成，按原顺序用 merge_mp3_files 拼接成一个文件
+    
+    返回 (成功, 错误信息)
+    """
+    part_paths = [f"{output_path}.part{i}" for i in range(len(chunks))]
+    
+    def synthesize_part(index):
+        part_payload = dict(payload, input=chunks[index])
+        ok, content = synthesize_speech(base_url, api_key, part_payload)
+        if ok:
+            with open(part_paths[index], 'wb') as f:
+                f.write(content)
+        return ok, content
+    
+    print(f"[INFO] 分块并行合成: {len(chunks)}块, 并发{workers}")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as executor:
+            results = list(executor.map(synthesize_part, range(len(chunks))))
+        
+        for i, (ok, content) in enumerate(results):
+            if not ok:
+                print(f"[ERROR] 第{i+1}块合成失败: {content[:200]}")
+                return False, content
+        
+        merge_mp3_files(part_paths, output_path)
+        return True, ""
+    finally:
+        for part in part_paths:
+            if os.path.exists(part):
+                os.remove(part)
+
+def estimate_segments_by_duration(text_segments, duration, offset=0.0):
+    """Whisper不可用时，按字数比例把音频时长分配给各字幕段"""
+    total_chars = sum(len(s) for s in text_segments)
+    current_time = offset
+    segments_info = []
+    for seg in text_segments:
+        seg_duration = (len(seg) / total_chars) * duration if total_chars > 0 else duration / len(text_segments)
+        segments_info.append({
+            "text": seg,
+            "start": current_time,
+            "end": current_time + seg_duration
+        })
+        current_time += seg_duration
+    return segments_info
+
+def time_text_segments(text_segments, audio_path, words=None, profile=None):
+    """给已知文本的字幕段落计时
+    
+    优先用小模型词级时间戳做字符对齐；失败时退回 segment 时间戳（按 profile 档位识别）按字数分配，
+    Whisper 完全不可用时按音频时长估算
+    """
+    segments_info = None
+    if get_whisper_settings()['alignment'] == 'words':
+        if words is None:
+            words = whisper_get_word_timestamps(audio_path, profile=profile)
+        if words:
+            segments_info = align_text_with_words(text_segments, words)
+    
+    if not segments_info:
+        whisper_timestamps = whisper_get_timestamps(audio_path, profile=profile)
+        if whisper_timestamps:
             # 用Whisper的时间戳分配给原文段落
             segments_info = align_text_with_timestamps(text_segments, whisper_timestamps)
+    
+    if not segments_info:
+        # Whisper失败，按字数比例估算时间
+        print("[WARN] Whisper失败，使用估算时间")
+        segments_info = estimate_segments_by_duration(text_segments, get_mp3_duration(audio_path))
+    return segments_info
+
+def get_align_model(profile=None):
+    """获取字幕对齐用的 Whisper 模型，有档位时按档位的精度和线程数加载"""
+    align_model = get_whisper_settings()['align_model'] or None
+    if not profile:
+        return get_whisper_model(align_model)
+    return get_whisper_model(align_model, compute_type=profile.get('compute_type'), cpu_threads=profile.get('cpu_threads'))
+
+# ============ 增量合成 ============
+# 增量模式按句子合成，每次生成写一个 manifest（每句的文本哈希、音频、时长和句内字幕时间）。
+# 再次生成时只合成文本变化的句子，未变化的句子直接复用音频和字幕时间并整体平移。
+# 句子音频按 mtime 作为最近使用时间，超过 segment_cache 的容量或天数时淘汰。
+SEGMENTS_DIR = BASE_DIR / "segments"
+SEGMENTS_LOCK = threading.Lock()
+
+def get_segment_cache_config():
+    config = get_config()
+    cache_config = config.get('segment_cache', {})
+    return {
+        "max_mb": float(cache_config.get('max_mb', 1024)),
+        "max_age_days": float(cache_config.get('max_age_days', 30))
+    }
+
+def evict_segment_files(keep, max_mb, max_age_days):
+    """淘汰超过天数或超出容量的句子音频（最久未用的先删），keep 中的文件不删除
+    
+    被删除的句子在下次增量生成时视为已修改，重新合成
+    """
+    limit = max_mb * 1024 * 1024
+    expire_before = time.time() - max_age_days * 86400 if max_age_days > 0 else None
+    removed = 0
+    with SEGMENTS_LOCK:
+        files = [(p, p.stat()) for p in SEGMENTS_DIR.glob("*.mp3")]
+        total = sum(st.st_size for _, st in files)
+        for p, st in sorted(files, key=lambda item: item[1].st_mtime):
+            expired = expire_before is not None and st.st_mtime < expire_before
+            if not expired and (max_mb <= 0 or total <= limit):
+                break
+            if p.name in keep:
+                continue
+            try:
+                p.unlink()
+                total -= st.st_size
+                removed += 1
+            except OSError:
+                pass
+    if removed:
+        print(f"[INFO] 淘汰 {removed} 个增量合成句子音频")
+    return removed
+
+def load_generation_manifest(generation_id):
+    """读取某次生成的 manifest，不存在或ID非法时返回 None"""
+    import re
+    if not generation_id or not re.fullmatch(r'tts_[0-9a-zA-Z_]+', generation_id):
+        return None
+    manifest_path = OUTPUT_DIR / f"{generation_id}.manifest.json"
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARN] 读取manifest失败 {generation_id}: {e}")
+        return None
+
+def run_incremental_tts(text, payload, base_url, api_key, stem, base_id, report, profile=None):
+    """按句子增量合成：只重新合成和重新计时相对 base_id 发生变化的句子
+    
+    返回结果字典（同 /api/tts 的响应，额外带 reused/synthesized 统计）；profile 为字幕计时使用的识别档位
+    """
+    import hashlib
+    
+    config = get_config()
+    tts_config = config['tts']
+    max_chars = TOOL_CONFIG.get('max_subtitle_chars', 15)
+    instruction, body = split_instruction(text)
+    sentences = [instruction + s for s in split_text_by_sentences(body, int(tts_config.get('chunk_chars', 300)))]
+    
+    # 合成参数一致时才能复用上一次的句子
+    params = {
+        "model": payload['model'],
+        "voice": payload['voice'],
+        "speed": payload['speed'],
+        "sample_rate": payload['sample_rate'],
+        "max_chars": max_chars
+    }
+    base_sentences = {}
+    base_manifest = load_generation_manifest(base_id)
+    if base_manifest and base_manifest.get('params') == params:
+        for entry in base_manifest.get('sentences', []):
+            if (SEGMENTS_DIR / entry['audio']).exists():
+                base_sentences[entry['hash']] = entry
+    elif base_id:
+        print(f"[INFO] 无可复用的历史生成（{base_id}），全部重新合成")
+    
+    SEGMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    entries = []
+    changed = []
+    for sentence in sentences:
+        sentence_hash = hashlib.sha256(sentence.encode('utf-8')).hexdigest()
+        if sentence_hash in base_sentences:
+            entry = dict(base_sentences[sentence_hash])
+            try:
+                # 刷新最近使用时间，避免被淘汰
+                os.utime(SEGMENTS_DIR / entry['audio'], None)
+                entries.append(entry)
+                continue
+            except OSError:
+                pass
+            entries.append({"text": sentence, "hash": sentence_hash})
+            changed.append(len(entries) - 1)
         else:
-            # Whisper失败，按字数比例估算时间
-            print("[WARN] Whisper失败，使用估算时间")
-            duration = get_mp3_duration(str(out_path))
-            total_chars = sum(len(s) for s in text_segments)
-            current_time = 0.0
-            segments_info = []
-            for seg in text_segments:
-                seg_duration = (len(seg) / total_chars) * duration if total_chars > 0 else duration / len(text_segments)
+            entries.append({"text": sentence, "hash": sentence_hash})
+            changed.append(len(entries) - 1)
+    print(f"[INFO] 增量合成: 共{len(entries)}句，复用{len(entries) - len(changed)}句，重新合成{len(changed)}句")
+    
+    def render_sentence(index):
+        """合成一句并计算句内字幕时间（相对本句开头）"""
+        entry = entries[index]
+        sentence_payload = dict(payload, input=entry['text'])
+        ok, content = synthesize_speech(base_url, api_key, sentence_payload)
+        if not ok:
+            return False, content
+        audio_name = f"{audio_cache_key(sentence_payload)}.mp3"
+        audio_path = SEGMENTS_DIR / audio_name
+        with open(audio_path, 'wb') as f:
+            f.write(content)
+        
+        duration = get_mp3_duration(str(audio_path))
+        text_segments = ai_split_text(entry['text'], max_chars)
+        subtitles = time_text_segments(text_segments, str(audio_path), profile=profile)
+        entry.update({"audio": audio_name, "duration": duration, "subtitles": subtitles})
+        return True, ""
+    
+    report("tts", f"正在合成{len(changed)}个修改过的句子")
+    if changed:
+        workers = int(tts_config.get('chunk_workers', 4))
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(changed)))) as executor:
+            results = list(executor.map(render_sentence, changed))
+        for ok, error in results:
+            if not ok:
+                return {"success": False, "message": f"TTS错误: {error[:200]}"}
+    
+    # 拼接音频，按累计时长平移每句的字幕
+    report("align", "拼接音频并平移字幕时间")
+    out_name = f"{stem}.mp3"
+    out_path = OUTPUT_DIR / out_name
+    merge_mp3_files([str(SEGMENTS_DIR / e['audio']) for e in entries], str(out_path))
+    cache_config = get_segment_cache_config()
+    evict_segment_files({e['audio'] for e in entries}, cache_config['max_mb'], cache_config['max_age_days'])
+    
+    segments_info = []
+    offset = 0.0
+    for entry in entries:
+        entry['start'] = round(offset, 2)
+        for sub in entry['subtitles']:
+            segments_info.append({
+                "text": sub['text'],
+                "start": round(offset + sub['start'], 2),
+                "end": round(offset + sub['end'], 2)
+            })
+        offset += entry['duration']
+        entry['end'] = round(offset, 2)
+    report("align", "音频拼接完成", audio_file=out_name, audio_streaming=False)
+    
+    report("subtitle", "生成字幕文件")
+    srt_name = f"{stem}.srt"
+    json_name = f"{stem}.json"
+    if segments_info:
+        generate_srt(segments_info, str(OUTPUT_DIR / srt_name))
+        with open(OUTPUT_DIR / json_name, 'w', encoding='utf-8') as f:
+            json.dump({"segments": segments_info}, f, ensure_ascii=False, indent=2)
+    with open(OUTPUT_DIR / f"{stem}.manifest.json", 'w', encoding='utf-8') as f:
+        json.dump({"params": params, "sentences": entries}, f, ensure_ascii=False, indent=2)
+    
+    reused = len(entries) - len(changed)
+    print(f"[INFO] 增量生成成功: {out_path} (复用{reused}句，合成{len(changed)}句)")
+    return {
+        "success": True,
+        "message": f"✅ 生成成功！(共{len(segments_info)}段字幕，复用{reused}句，重新合成{len(changed)}句)",
+        "generation_id": stem,
+        "audio_url": f"/audio/{out_name}",
+        "srt_url": f"/audio/{srt_name}" if segments_info else None,
+        "json_url": f"/audio/{json_name}" if segments_info else None,
+        "segments": segments_info,
+        "reused": reused,
+        "synthesized": len(changed)
+    }
+
+# ============ MOSS-TTSD 对话模式 ============
+def parse_dialogue_turns(text):
+    """把 [S1]...[S2]... 格式的对话脚本拆成 [(说话人, 文本), ...]
+    
+    第一个标记之前的文本归给 S1；没有任何标记时返回空列表
+    """
+    import re
+    
+    parts = re.split(r'\[(S\d+)\]', text)
+    turns = []
+    if len(parts) > 1 and parts[0].strip():
+        turns.append(("S1", parts[0].strip()))
+    for i in range(1, len(parts), 2):
+        turn_text = parts[i + 1].strip() if i + 1 < len(parts) else ""
+        if turn_text:
+            turns.append((parts[i], turn_text))
+    return turns
+
+def run_dialogue_tts(turns, payload, voices, base_url, api_key, stem, report):
+    """按说话轮次并发合成对话，按顺序拼接，字幕段落带说话人信息
+    
+    单个轮次失败只重试该轮次（moss.turn_retries 次），不重新合成整段对话
+    """
+    config = get_config()
+    moss_config = config.get('moss', {})
+    workers = int(moss_config.get('turn_workers', 3))
+    retries = int(moss_config.get('turn_retries', 1))
+    max_chars = TOOL_CONFIG.get('max_subtitle_chars', 15)
+    
+    out_name = f"{stem}.mp3"
+    out_path = OUTPUT_DIR / out_name
+    part_paths = [f"{out_path}.part{i}" for i in range(len(turns))]
+    
+    def synthesize_turn(index):
+        speaker, turn_text = turns[index]
+        turn_payload = dict(payload, input=f"[{speaker}]{turn_text}", voice=voices.get(speaker, payload['voice']))
+        for attempt in range(retries + 1):
+            try:
+                ok, content = synthesize_speech(base_url, api_key, turn_payload)
+            except requests.exceptions.RequestException as e:
+                ok, content = False, str(e)
+            if ok:
+                with open(part_paths[index], 'wb') as f:
+                    f.write(content)
+                return True, ""
+            print(f"[WARN] 第{index+1}轮({speaker})合成失败（第{attempt+1}次）: {content[:100]}")
+        return False, content
+    
+    report("tts", f"正在并发合成{len(turns)}个对话轮次")
+    print(f"[INFO] 对话模式: {len(turns)}轮, 并发{workers}")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(turns)))) as executor:
+            results = list(executor.map(synthesize_turn, range(len(turns))))
+        for i, (ok, error) in enumerate(results):
+            if not ok:
+                return {"success": False, "message": f"TTS错误（第{i+1}轮 {turns[i][0]}）: {error[:200]}"}
+        
+        # 按顺序拼接，每轮的时长决定字幕偏移
+        report("align", "拼接对话音频")
+        segments_info = []
+        turns_info = []
+        offset = 0.0
+        for i, (speaker, turn_text) in enumerate(turns):
+            duration = get_mp3_duration(part_paths[i])
+            subtitle_text = clean_text_for_subtitle(turn_text)
+            for seg in split_text_with_duration(subtitle_text, duration, max_chars):
                 segments_info.append({
-                    "text": seg,
-                    "start": current_time,
-                    "end": current_time + seg_duration
+                    "text": seg['text'],
+                    "start": round(offset + seg['start'], 2),
+                    "end": round(offset + seg['end'], 2),
+                    "speaker": speaker
                 })
-                current_time += seg_duration
-        
-        # ========== 第3步：生成字幕文件 ==========
-        srt_name = f"tts_{timestamp}.srt"
-        srt_path = OUTPUT_DIR / srt_name
-        json_name = f"tts_{timestamp}.json"
-        json_path = OUTPUT_DIR / json_name
-        
-        if segments_info:
-            generate_srt(segments_info, str(srt_path))
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump({"segments": segments_info}, f, ensure_ascii=False, indent=2)
-        
-        print(f"[INFO] 生成成功: {out_path} (共{len(segments_info)}段字幕)")
-        return jsonify({
-            "success": True, 
-            "message": f"✅ 生成成功！(共{len(segments_info)}段字幕)", 
-            "audio_url": f"/audio/{out_name}",
-            "srt_url": f"/audio/{srt_name}" if segments_info else None,
-            "json_url": f"/audio/{json_name}" if segments_info else None,
-            "segments": segments_info
-        })
+            turns_info.append({
+                "speaker": speaker,
+                "text": subtitle_text,
+                "start": round(offset, 2),
+                "end": round(offset + duration, 2)
+            })
+            offset += duration
+        merge_mp3_files(part_paths, str(out_path))
+    finally:
+        for part in part_paths:
+            if os.path.exists(part):
+                os.remove(part)
+    report("align", "对话音频拼接完成", audio_file=out_name, audio_streaming=False)
+    
+    report("subtitle", "生成字幕文件")
+    srt_name = f"{stem}.srt"
+    json_name = f"{stem}.json"
+    generate_srt(segments_info, str(OUTPUT_DIR / srt_name))
+    with open(OUTPUT_DIR / json_name, 'w', encoding='utf-8') as f:
+        json.dump({"segments": segments_info, "turns": turns_info}, f, ensure_ascii=False, indent=2)
+    
+    print(f"[INFO] 对话生成成功: {out_path} (共{len(turns)}轮)")
+    return {
+        "success": True,
+        "message": f"✅ 生成成功！(共{len(turns)}轮对话，{len(segments_info)}段字幕)",
+        "generation_id": stem,
+        "audio_url": f"/audio/{out_name}",
+        "srt_url": f"/audio/{srt_name}",
+        "json_url": f"/audio/{json_name}",
+        "segments": segments_info,
+        "turns": turns_info
+    }
+
+# TTS流程内部可并行阶段（AI分割、Whisper预热）使用的线程池
+# 用全局线程池而不是 with 语句，TTS失败提前返回时不必等待分割请求结束
+STAGE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tts-stage")
+
+def run_tts_pipeline(data, progress=None):
+    """TTS 完整流程：合成音频 -> AI分割原文 -> Whisper时间戳 -> 生成字幕文件
+    
+    AI分割和Whisper模型预热只依赖输入文本，与TTS合成同时开始；
+    只有对齐步骤需要等待分割结果和音频时间戳。
+    progress(stage, message, **fields) 用于向异步任务报告当前阶段和音频文件状态，
+    返回结果字典（同 /api/tts 的响应）
+    """
+    def report(stage, message, **fields):
+        if progress:
+            progress(stage, message, **fields)
+    
+    text = data.get('text', '').strip()
+    voice_type = data.get('voice_type', '')
+    voice_value = data.get('voice_value', '')
+    speed = float(data.get('speed', 1.0))
+    model_type = data.get('model', 'cosyvoice')
+    
+    if not text:
+        return {"success": False, "message": "请输入文字"}
+    if not voice_value:
+        return {"success": False, "message": "请选择声音"}
+    
+    # 去除空格
+    text = text.replace(' ', '').replace('　', '')
+    
+    # 获取TTS配置
+    config = get_config()
+    tts_config = config['tts']
+    api_key = tts_config.get('api_key') or LEGACY_CONFIG.get('siliconflow_api_key', '')
+    base_url = tts_config.get('base_url', 'https://api.siliconflow.cn/v1')
+    
+    # 根据用户选择的模型类型，设置对应的模型名称
+    if model_type == 'moss':
+        tts_model = 'fnlp/MOSS-TTSD-v0.5'
+    elif model_type == 'indextts2':
+        tts_model = 'IndexTeam/IndexTTS-2'
+        print("[INFO] 使用 IndexTTS-2 模型")
+    else:  # cosyvoice
+        tts_model = 'FunAudioLLM/CosyVoice2-0.5B'
+    
+    print(f"[INFO] 使用模型: {tts_model}")
+    
+    # 根据类型设置voice参数
+    if voice_type == "preset":
+        voice = f"{tts_model}:{voice_value}"
+    else:
+        voice = voice_value
+    
+    # 所有模型统一使用 voice 参数（IndexTTS-2 也支持！）
+    payload = {
+        "model": tts_model,
+        "input": text,
+        "voice": voice,
+        "response_format": "mp3",
+        "sample_rate": 32000,
+        "speed": speed,
+        "max_tokens": 2048
+    }
+    
+    print(f"[DEBUG] Payload: model={payload['model']}, voice={payload['voice'][:50]}...")
+    
+    # 加随机后缀，避免同一秒内的并发任务互相覆盖输出文件
+    timestamp = f"{int(time.time())}_{uuid.uuid4().hex[:6]}"
+    out_name = f"tts_{timestamp}.mp3"
+    out_path = OUTPUT_DIR / out_name
+    
+    # 增量模式：按句子合成，只重新合成相对上一次生成（base_id）改动过的句子
+    if data.get('incremental') and model_type != 'moss':
+        return run_incremental_tts(text, payload, base_url, api_key, f"tts_{timestamp}",
+                                   data.get('base_id'), report, profile=data.get('whisper_profile'))
+    
+    # MOSS-TTSD 对话模式：脚本带 [S1]/[S2] 标记时按说话轮次并发合成
+    if model_type == 'moss' and data.get('dialogue', True):
+        turns = parse_dialogue_turns(text)
+        if len(turns) > 1:
+            # 可以为每个说话人指定音色：{"S1": "alex", "S2": "speech:..."}
+            voices = {}
+            for speaker, value in (data.get('voices') or {}).items():
+                voices[speaker] = f"{tts_model}:{value}" if value in PRESETS else value
+            return run_dialogue_tts(turns, payload, voices, base_url, api_key, f"tts_{timestamp}", report)
+    
+    # ========== 并行启动：AI分割原文 + Whisper模型预热 ==========
+    # 先用AI智能分割原文（保证文字正确），不需要等音频
+    max_chars = TOOL_CONFIG.get('max_subtitle_chars', 15)
+    split_future = STAGE_EXECUTOR.submit(ai_split_text, text, max_chars)
+    # 按词对齐只用 align_model；按 segment 对齐用识别档位对应的模型
+    profile = get_whisper_profile(data.get('whisper_profile'))
+    if get_whisper_settings()['alignment'] == 'words':
+        warmup_future = STAGE_EXECUTOR.submit(get_align_model, profile)
+    else:
+        warmup_future = STAGE_EXECUTOR.submit(get_profile_model, profile)
+    
+    # ========== 第1步：生成完整音频（长文本分块并行合成） ==========
+    report("tts", "正在合成音频（同时进行AI分割）")
+    print(f"[INFO] 生成音频: {text[:50]}...")
+    
+    # MOSS-TTSD 是双人对话模型，整段发送才能保持对话连贯
+    chunk_chars = int(tts_config.get('chunk_chars', 300))
+    chunked = data.get('chunked')
+    if chunked is None:
+        chunked = len(text) > chunk_chars
+    if model_type == 'moss':
+        chunked = False
+    
+    if chunked:
+        chunks = split_text_into_chunks(text, chunk_chars)
+        ok, error = synthesize_chunked(base_url, api_key, payload, chunks, out_path,
+                                       workers=int(tts_config.get('chunk_workers', 4)))
+        if not ok:
+            return {"success": False, "message": f"TTS错误: {error[:200]}"}
+        report("tts", "音频合成完成", audio_file=out_name, audio_streaming=False)
+    else:
+        # 边下载边写文件，异步任务可以在下载过程中就开始播放
+        try:
+            ok, error = synthesize_speech_to_file(
+                base_url, api_key, payload, out_path,
+                on_start=lambda: report("tts", "正在接收音频", audio_file=out_name, audio_streaming=True)
+            )
+        finally:
+            report("tts", "音频接收完成", audio_streaming=False)
+        if not ok:
+            return {"success": False, "message": f"TTS错误: {error[:200]}"}
+    print(f"[INFO] 音频已保存: {out_path}")
+    
+    # ========== 第2步：Whisper获取词级时间戳，与AI分割结果对齐 ==========
+    report("whisper", "Whisper识别时间戳")
+    warmup_future.result()
+    print("[INFO] 调用Whisper获取时间戳...")
+    words = None
+    if get_whisper_settings()['alignment'] == 'words':
+        words = whisper_get_word_timestamps(str(out_path), profile=data.get('whisper_profile'))
+    
+    report("align", "等待AI分割结果并对齐")
+    text_segments = split_future.result()
+    print(f"[INFO] 文本分割: {len(text_segments)}段")
+    
+    # 合并：原文 + 时间戳
+    segments_info = time_text_segments(text_segments, str(out_path), words=words,
+                                       profile=data.get('whisper_profile'))
+    
+    # ========== 第3步：生成字幕文件 ==========
+    report("subtitle", "生成字幕文件")
+    srt_name = f"tts_{timestamp}.srt"
+    srt_path = OUTPUT_DIR / srt_name
+    json_name = f"tts_{timestamp}.json"
+    json_path = OUTPUT_DIR / json_name
+    
+    if segments_info:
+        generate_srt(segments_info, str(srt_path))
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({"segments": segments_info}, f, ensure_ascii=False, indent=2)
+    
+    print(f"[INFO] 生成成功: {out_path} (共{len(segments_info)}段字幕)")
+    return {
+        "success": True, 
+        "message": f"✅ 生成成功！(共{len(segments_info)}段字幕)", 
+        "generation_id": f"tts_{timestamp}",
+        "audio_url": f"/audio/{out_name}",
+        "srt_url": f"/audio/{srt_name}" if segments_info else None,
+        "json_url": f"/audio/{json_name}" if segments_info else None,
+        "segments": segments_info
+    }
+
+@app.route('/api/tts', methods=['POST'])
+def api_tts():
+    """文字转语音 - 生成音频（长文本分块并行合成），用Whisper识别精确时间戳"""
+    try:
+        return jsonify(run_tts_pipeline(request.json))
     except Exception as e:
         print(f"[ERROR] /api/tts: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({"success": False, "message": f"生成失败: {e}"})
 
-def whisper_transcribe(audio_path):
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    """音频缓存、识别缓存的命中/未命中统计"""
+    return jsonify({
+        "success": True,
+        "audio_cache": get_audio_cache_stats(),
+        "transcript_cache": get_transcript_cache_stats()
+    })
+
+# ============ 异步任务队列 ============
+# 任务状态保存在内存中，worker 线程池执行与 /api/tts 相同的流程
+JOBS = {}
+JOBS_COND = threading.Condition()
+JOB_EXECUTOR = None
+MAX_FINISHED_JOBS = 200
+
+# 各阶段对应的进度百分比
+JOB_STAGE_PROGRESS = {
+    "queued": 0,
+    "tts": 10,
+    "whisper": 50,
+    "align": 80,
+    "subtitle": 90,
+    "done": 100
+}
+
+def get_job_executor():
+    """获取任务线程池（首次调用时按配置创建）"""
+    global JOB_EXECUTOR
+    with JOBS_COND:
+        if JOB_EXECUTOR is None:
+            workers = int(get_config().get('jobs', {}).get('workers', 2))
+            JOB_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tts-job")
+            print(f"[INFO] 任务线程池已启动: {workers}个worker")
+        return JOB_EXECUTOR
+
+def create_job(kind):
+    """创建任务记录，顺便清理过多的已完成任务"""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    job = {
+        "id": job_id,
+        "kind": kind,
+        "status": "queued",
+        "stage": "queued",
+        "progress": 0,
+        "message": "排队中",
+        "created_at": now,
+        "updated_at": now,
+        "version": 0,
+        "audio_file": None,
+        "audio_streaming": False,
+        "result": None
+    }
+    with JOBS_COND:
+        finished = sorted(
+            (j for j in JOBS.values() if j['status'] in ('done', 'failed')),
+            key=lambda j: j['updated_at']
+        )
+        for old in finished[:max(0, len(finished) - MAX_FINISHED_JOBS + 1)]:
+            del JOBS[old['id']]
+        JOBS[job_id] = job
+    return job
+
+def update_job(job_id, **fields):
+    """更新任务状态并唤醒等待中的 SSE 连接"""
+    with JOBS_COND:
+        job = JOBS.get(job_id)
+        if job is None:
+            return
+        job.update(fields)
+        if 'stage' in fields:
+            job['progress'] = JOB_STAGE_PROGRESS.get(fields['stage'], job['progress'])
+        job['updated_at'] = time.time()
+        job['version'] += 1
+        JOBS_COND.notify_all()
+
+def get_job_snapshot(job_id):
+    """返回任务状态的副本（供接口序列化）"""
+    with JOBS_COND:
+        job = JOBS.get(job_id)
+        return dict(job) if job else None
+
+def run_tts_job(job_id, data):
+    """worker 线程中执行 TTS 流程"""
+    update_job(job_id, status="running")
+    try:
+        result = run_tts_pipeline(
+            data,
+            progress=lambda stage, message, **fields: update_job(job_id, stage=stage, message=message, **fields)
+        )
+    except Exception as e:
+        print(f"[ERROR] 任务 {job_id} 失败: {e}")
+        import traceback
+        traceback.print_exc()
+        result = {"success": False, "message": f"生成失败: {e}"}
+    
+    if result.get('success'):
+        update_job(job_id, status="done", stage="done", message=result['message'], result=result)
+    else:
+        update_job(job_id, status="failed", message=result.get('message', '生成失败'), result=result)
+
+@app.route('/api/jobs/tts', methods=['POST'])
+def api_jobs_tts():
+    """提交异步TTS任务，立即返回任务ID"""
+    data = request.json or {}
+    if not data.get('text', '').strip():
+        return jsonify({"success": False, "message": "请输入文字"})
+    if not data.get('voice_value', ''):
+        return jsonify({"success": False, "message": "请选择声音"})
+    
+    job = create_job("tts")
+    get_job_executor().submit(run_tts_job, job['id'], data)
+    print(f"[INFO] 已提交TTS任务: {job['id']}")
+    return jsonify({
+        "success": True,
+        "job_id": job['id'],
+        "status_url": f"/api/jobs/{job['id']}",
+        "events_url": f"/api/jobs/{job['id']}/events",
+        "stream_url": f"/api/jobs/{job['id']}/audio"
+    })
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """轮询任务状态"""
+    job = get_job_snapshot(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "任务不存在"}), 404
+    return jsonify({"success": True, "job": job})
+
+@app.route('/api/jobs/<job_id>/events')
+def api_job_events(job_id):
+    """SSE 推送任务进度，任务结束后关闭连接"""
+    if get_job_snapshot(job_id) is None:
+        return jsonify({"success": False, "message": "任务不存在"}), 404
+    
+    def stream():
+        last_version = -1
+        while True:
+            with JOBS_COND:
+                job = JOBS.get(job_id)
+                if job is not None and job['version'] == last_version:
+                    JOBS_COND.wait(timeout=15)
+                    job = JOBS.get(job_id)
+                job = dict(job) if job else None
+            
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'message': '任务不存在'}, ensure_ascii=False)}\n\n"
+                return
+            if job['version'] == last_version:
+                # 保持连接，防止代理超时断开
+                yield ": keepalive\n\n"
+                continue
+            
+            last_version = job['version']
+            yield f"data: {json.dumps(job, ensure_ascii=False)}\n\n"
+            if job['status'] in ('done', 'failed'):
+                return
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/api/jobs/<job_id>/audio')
+def api_job_audio(job_id):
+    """分块传输任务音频：文件还在下载时跟随写入进度输出，浏览器可以边收边播"""
+    if get_job_snapshot(job_id) is None:
+        return jsonify({"success": False, "message": "任务不存在"}), 404
+    
+    def stream():
+        offset = 0
+        audio_file = None
+        while True:
+            job = get_job_snapshot(job_id)
+            if job is None:
+                return
+            audio_file = audio_file or job['audio_file']
+            if audio_file is None:
+                # 音频还没开始写入
+                if job['status'] in ('done', 'failed'):
+                    return
+                time.sleep(0.1)
+                continue
+            
+            with open(OUTPUT_DIR / audio_file, 'rb') as f:
+                f.seek(offset)
+                block = f.read(64 * 1024)
+            if block:
+                offset += len(block)
+                yield block
+            elif job['audio_streaming']:
+                time.sleep(0.1)
+            else:
+                # 写入结束后再读一次，确保不漏掉最后一块
+                with open(OUTPUT_DIR / audio_file, 'rb') as f:
+                    f.seek(offset)
+                    rest = f.read()
+                if rest:
+                    yield rest
+                return
+    
+    return Response(stream(), mimetype='audio/mpeg', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+# ============ 批量生成 ============
+# 每个批次在 OUTPUT_DIR/batch_<id>.json 中记录各条目的状态和结果，
+# 重试时只重新运行失败的条目
+BATCH_LOCK = threading.Lock()
+
+def parse_batch_items(raw, filename=''):
+    """解析 JSON 数组 / JSONL / CSV 格式的批量条目"""
+    import csv, io
+    
+    raw = raw.strip().lstrip('\ufeff')
+    if not raw:
+        return []
+    if filename.endswith('.csv') or (not filename.endswith(('.json', '.jsonl')) and raw[0] not in '[{'):
+        return [dict(row) for row in csv.DictReader(io.StringIO(raw))]
+    if raw[0] == '[':
+        return json.loads(raw)
+    try:
+        data = json.loads(raw)
+        return data.get('items', []) if isinstance(data, dict) and 'items' in data else [data]
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in raw.splitlines() if line.strip()]
+
+# 批量条目的 model 可以写 run_tts_pipeline 的模型类型，也可以写服务商的完整模型名
+BATCH_MODEL_NAMES = {
+    "cosyvoice": "cosyvoice",
+    "indextts2": "indextts2",
+    "moss": "moss",
+    "funaudiollm/cosyvoice2-0.5b": "cosyvoice",
+    "indexteam/indextts-2": "indextts2",
+    "fnlp/moss-ttsd-v0.5": "moss"
+}
+
+def batch_item_to_request(item):
+    """把批量条目 {text, voice, model, speed} 转换为 run_tts_pipeline 的参数，model 不支持时抛 ValueError"""
+    voice = (item.get('voice') or item.get('voice_value') or '').strip()
+    voice_type = item.get('voice_type') or ('preset' if voice in PRESETS else 'clone')
+    model = (item.get('model') or 'cosyvoice').strip()
+    model_type = BATCH_MODEL_NAMES.get(model.lower())
+    if model_type is None:
+        raise ValueError(f"不支持的模型: {model}（可选: cosyvoice, indextts2, moss 或对应的完整模型名）")
+    return {
+        "text": item.get('text', ''),
+        "voice_type": voice_type,
+        "voice_value": voice,
+        "model": model_type,
+        "speed": float(item.get('speed') or 1.0)
+    }
+
+def batch_state_path(batch_id):
+    return OUTPUT_DIR / f"batch_{batch_id}.json"
+
+def save_batch_state(batch):
+    with BATCH_LOCK:
+        with open(batch_state_path(batch['id']), 'w', encoding='utf-8') as f:
+            json.dump(batch, f, ensure_ascii=False, indent=2)
+
+def load_batch_state(batch_id):
+    import re
+    if not re.fullmatch(r'[0-9a-f]+', batch_id):
+        return None
+    path = batch_state_path(batch_id)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def batch_option(options, key, default):
+    """读取整数选项，未填写（None 或空字符串）时用默认值，显式的 0 保留"""
+    value = options.get(key)
+    return int(default if value is None or value == '' else value)
+
+def run_batch(batch, concurrency, retries):
+    """运行批次中所有未成功的条目，失败的条目最多再重试 retries 轮"""
+    def run_item(item):
+        item['attempts'] += 1
+        try:
+            result = run_tts_pipeline(batch_item_to_request(item['request']))
+        except Exception as e:
+            print(f"[ERROR] 批量条目 {item['index']} 失败: {e}")
+            result = {"success": False, "message": f"生成失败: {e}"}
+        item['status'] = 'done' if result.get('success') else 'failed'
+        item['message'] = result.get('message', '')
+        item['result'] = {k: result.get(k) for k in ('generation_id', 'audio_url', 'srt_url', 'json_url')} if result.get('success') else None
+        save_batch_state(batch)
+    
+    for round_index in range(retries + 1):
+        pending = [item for item in batch['items'] if item['status'] != 'done']
+        if not pending:
+            break
+        if round_index > 0:
+            print(f"[INFO] 批量重试第{round_index}轮: {len(pending)}条")
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pending)))) as executor:
+            list(executor.map(run_item, pending))
+
+def build_batch_zip(batch):
+    """把批次中成功条目的 MP3/SRT/JSON 和状态报告打包成zip"""
+    import io, zipfile
+    
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        report = []
+        for item in batch['items']:
+            report.append({k: item[k] for k in ('index', 'status', 'message', 'attempts', 'result')})
+            if item['status'] != 'done':
+                continue
+            for key in ('audio_url', 'srt_url', 'json_url'):
+                url = item['result'].get(key)
+                if url:
+                    name = url.split('/')[-1]
+                    path = OUTPUT_DIR / name
+                    if path.exists():
+                        zf.write(path, f"{item['index']:03d}/{name}")
+        zf.writestr("report.json", json.dumps({"batch_id": batch['id'], "items": report}, ensure_ascii=False, indent=2))
+    buffer.seek(0)
+    return buffer
+
+def send_batch_zip(batch):
+    failed = sum(1 for item in batch['items'] if item['status'] != 'done')
+    response = send_file(build_batch_zip(batch), mimetype='application/zip',
+                         as_attachment=True, download_name=f"batch_{batch['id']}.zip")
+    response.headers['X-Batch-Id'] = batch['id']
+    response.headers['X-Batch-Failed'] = str(failed)
+    return response
+
+@app.route('/api/tts/batch', methods=['POST'])
+def api_tts_batch():
+    """批量生成：接收 JSON/JSONL/CSV 条目列表，返回包含各条目音频、字幕和状态报告的zip"""
+    try:
+        options = {}
+        upload = request.files.get('file')
+        if upload:
+            items = parse_batch_items(upload.read().decode('utf-8'), upload.filename or '')
+            options = request.form
+        elif request.is_json:
+            data = request.get_json()
+            if isinstance(data, dict):
+                items = data.get('items', [])
+                options = data
+            else:
+                items = data
+        else:
+            items = parse_batch_items(request.get_data(as_text=True), request.args.get('format', ''))
+            options = request.args
+        
+        if not items:
+            return jsonify({"success": False, "message": "没有可生成的条目"})
+        
+        batch_config = get_config().get('batch', {})
+        concurrency = batch_option(options, 'concurrency', batch_config.get('concurrency', 2))
+        retries = batch_option(options, 'retries', batch_config.get('retries', 1))
+        
+        batch = {
+            "id": uuid.uuid4().hex,
+            "created_at": time.time(),
+            "items": [
+                {"index": i, "request": item, "status": "pending", "message": "", "attempts": 0, "result": None}
+                for i, item in enumerate(items, 1)
+            ]
+        }
+        save_batch_state(batch)
+        print(f"[INFO] 批量生成 {batch['id']}: {len(items)}条, 并发{concurrency}")
+        run_batch(batch, concurrency, retries)
+        return send_batch_zip(batch)
+    except Exception as e:
+        print(f"[ERROR] /api/tts/batch: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"success": False, "message": f"批量生成失败: {e}"})
+
+@app.route('/api/tts/batch/<batch_id>')
+def api_tts_batch_status(batch_id):
+    """查询批次中各条目的状态"""
+    batch = load_batch_state(batch_id)
+    if batch is None:
+        return jsonify({"success": False, "message": "批次不存在"}), 404
+    return jsonify({"success": True, "batch": batch})
+
+@app.route('/api/tts/batch/<batch_id>/retry', methods=['POST'])
+def api_tts_batch_retry(batch_id):
+    """只重新运行失败的条目，返回更新后的zip"""
+    try:
+        batch = load_batch_state(batch_id)
+        if batch is None:
+            return jsonify({"success": False, "message": "批次不存在"}), 404
+        
+        data = request.get_json(silent=True) or {}
+        batch_config = get_config().get('batch', {})
+        concurrency = batch_option(data, 'concurrency', batch_config.get('concurrency', 2))
+        run_batch(batch, concurrency, retries=0)
+        return send_batch_zip(batch)
+    except Exception as e:
+        print(f"[ERROR] /api/tts/batch/{batch_id}/retry: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"success": False, "message": f"批量重试失败: {e}"})
+
+def whisper_transcribe(audio_path, profile=None):
     """用本地faster-whisper识别音频，返回带时间戳的字幕段落"""
     try:
-        from faster_whisper import WhisperModel
-        
         # 从配置文件读取设置
         config = get_config()
-        whisper_config = config.get('whisper', {})
-        model_size = whisper_config.get('model', 'small')
-        device = whisper_config.get('device', 'cpu')
-        compute_type = whisper_config.get('compute_type', 'int8')
-        language = whisper_config.get('language', 'zh')
+        language = config.get('whisper', {}).get('language', 'zh')
         max_chars = config.get('max_subtitle_chars', 15)
         
-        # 模型下载到项目目录
-        model_dir = BASE_DIR / "models"
-        model_dir.mkdir(exist_ok=True)
-        local_model_path = model_dir / f"faster-whisper-{model_size}"
-        
-        print(f"[INFO] 加载Whisper模型({model_size})...")
-        if local_model_path.exists() and (local_model_path / "model.bin").exists():
-            model = WhisperModel(
-                str(local_model_path),
-                device=device,
-                compute_type=compute_type
-            )
-        else:
-            print(f"[INFO] 自动下载 {model_size} 模型...")
-            model = WhisperModel(
-                model_size,
-                device=device,
-                compute_type=compute_type,
-                download_root=str(model_dir)
-            )
+        # 与其他入口共用模型注册表，不再每次重新加载
+        profile = get_whisper_profile(profile)
+        model = get_profile_model(profile)
+        if model is None:
+            return None
         
         print(f"[INFO] Whisper识别: {audio_path}")
-        segments, info = model.transcribe(
-            audio_path,
+        result = whisper_transcribe_cached(model, audio_path, **apply_whisper_profile(
+            profile,
             language=language,
             word_timestamps=True,
             vad_filter=True
-        )
+        ))
         
         # 收集所有词和时间戳
         all_words = []
-        for segment in segments:
-            if segment.words:
-                for word in segment.words:
-                    all_words.append({
-                        "word": word.word,
-                        "start": word.start,
-                        "end": word.end
-                    })
+        for segment in result['segments']:
+            all_words.extend(segment['words'] or [])
+        normalize_segments_text(all_words, 'word')
         
         if not all_words:
             print("[WARN] Whisper没有识别到词")
@@ -2377,29 +4931,31 @@ def whisper_transcribe(audio_path):
         traceback.print_exc()
         return None
 
-def whisper_get_timestamps(audio_path):
+def whisper_get_timestamps(audio_path, profile=None):
     """用Whisper获取segment级别时间戳（更准确）"""
     try:
-        model = get_whisper_model()
+        profile = get_whisper_profile(profile)
+        model = get_profile_model(profile)
         if model is None:
             return None
         
-        segments, info = model.transcribe(
-            audio_path,
+        result = whisper_transcribe_cached(model, audio_path, **apply_whisper_profile(
+            profile,
             language="zh",
             word_timestamps=False,  # 用segment级别，更稳定
             vad_filter=True
-        )
+        ))
         
         # 收集segment时间戳
         timestamps = []
-        for segment in segments:
+        for segment in result['segments']:
             timestamps.append({
-                "start": segment.start,
-                "end": segment.end,
-                "text": segment.text.strip()
+                "start": segment['start'],
+                "end": segment['end'],
+                "text": segment['text'].strip()
             })
-            print(f"[DEBUG] Segment: {segment.start:.2f}-{segment.end:.2f} | {segment.text.strip()[:20]}...")
+            print(f"[DEBUG] Segment: {segment['start']:.2f}-{segment['end']:.2f} | {segment['text'].strip()[:20]}...")
+        normalize_segments_text(timestamps)
         
         print(f"[INFO] Whisper获取时间戳: {len(timestamps)}个segment")
         return timestamps
@@ -2410,6 +4966,126 @@ def whisper_get_timestamps(audio_path):
         traceback.print_exc()
         return None
 
+def whisper_get_word_timestamps(audio_path, profile=None):
+    """用对齐小模型（whisper.align_model）获取词级时间戳
+    
+    原文已知，识别文字只用来定位时间，所以用 tiny/small 模型和 beam_size=1 就足够；
+    选择了识别档位时按档位的精度、线程数和 beam_size / VAD 参数识别
+    """
+    try:
+        profile = get_whisper_profile(profile)
+        model = get_align_model(profile)
+        if model is None:
+            return None
+        
+        result = whisper_transcribe_cached(model, audio_path, **apply_whisper_profile(
+            profile,
+            language=get_whisper_settings()['language'],
+            beam_size=1,
+            word_timestamps=True,
+            vad_filter=True,
+            condition_on_previous_text=False
+        ))
+        words = []
+        for segment in result['segments']:
+            words.extend(segment['words'] or [])
+        normalize_segments_text(words, 'word')
+        
+        print(f"[INFO] Whisper获取词级时间戳: {len(words)}个词")
+        return words
+    except Exception as e:
+        print(f"[ERROR] Whisper获取词级时间戳失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def align_text_with_words(text_segments, words):
+    """把原文字幕段落与 Whisper 词级时间戳做字符级序列对齐
+    
+    识别文字和原文逐字比对（difflib），匹配上的字直接使用识别出的时间，
+    没匹配上的字在前后匹配点之间线性插值。每段字幕取首字开始和末字结束时间。
+    """
+    from difflib import SequenceMatcher
+    
+    def normalize(text):
+        return [ch for ch in text.lower() if ch.isalnum()]
+    
+    # 原文逐字展开，记录每个字属于哪一段
+    ref_chars = []
+    ref_owner = []
+    for i, seg in enumerate(text_segments):
+        chars = normalize(seg)
+        ref_chars.extend(chars)
+        ref_owner.extend([i] * len(chars))
+    
+    # 识别结果逐字展开，词的时长平均分给每个字
+    hyp_chars = []
+    hyp_times = []
+    for word in words:
+        chars = normalize(word['word'])
+        if not chars:
+            continue
+        step = (word['end'] - word['start']) / len(chars)
+        for k, ch in enumerate(chars):
+            hyp_chars.append(ch)
+            hyp_times.append((word['start'] + k * step, word['start'] + (k + 1) * step))
+    
+    if not ref_chars or not hyp_chars:
+        return None
+    
+    matcher = SequenceMatcher(None, ref_chars, hyp_chars, autojunk=False)
+    char_times = [None] * len(ref_chars)
+    matched = 0
+    for block in matcher.get_matching_blocks():
+        for k in range(block.size):
+            char_times[block.a + k] = hyp_times[block.b + k]
+        matched += block.size
+    
+    if matched < len(ref_chars) * 0.3:
+        print(f"[WARN] 词级对齐匹配率过低({matched}/{len(ref_chars)})，改用segment对齐")
+        return None
+    
+    # 未匹配的字：在前后匹配点之间线性插值
+    audio_start = hyp_times[0][0]
+    audio_end = hyp_times[-1][1]
+    i = 0
+    while i < len(char_times):
+        if char_times[i] is not None:
+            i += 1
+            continue
+        j = i
+        while j < len(char_times) and char_times[j] is None:
+            j += 1
+        left = char_times[i - 1][1] if i > 0 else audio_start
+        right = char_times[j][0] if j < len(char_times) else audio_end
+        step = max(0.0, right - left) / (j - i)
+        for k in range(i, j):
+            char_times[k] = (left + (k - i) * step, left + (k - i + 1) * step)
+        i = j
+    
+    segments_info = []
+    for i, seg in enumerate(text_segments):
+        indexes = [k for k, owner in enumerate(ref_owner) if owner == i]
+        if indexes:
+            start, end = char_times[indexes[0]][0], char_times[indexes[-1]][1]
+        else:
+            # 纯标点段落，紧接上一段
+            start = end = segments_info[-1]['end'] if segments_info else audio_start
+        segments_info.append({"text": seg, "start": start, "end": end})
+    
+    # 后处理：保证最小时长0.3秒、时间单调且不重叠
+    for i, seg in enumerate(segments_info):
+        if i > 0 and seg['start'] < segments_info[i - 1]['end']:
+            seg['start'] = segments_info[i - 1]['end']
+        if seg['end'] - seg['start'] < 0.3:
+            seg['end'] = seg['start'] + 0.3
+    for seg in segments_info:
+        seg['start'] = round(seg['start'], 2)
+        seg['end'] = round(seg['end'], 2)
+    
+    print(f"[INFO] 词级对齐完成: {len(segments_info)}个字幕段落，匹配{matched}/{len(ref_chars)}字")
+    return segments_info
+
 def align_text_with_timestamps(text_segments, timestamps):
     """将原文段落与Whisper segment时间戳对齐
     
@@ -2567,6 +5243,41 @@ def api_delete():
     except Exception as e:
         return jsonify({"success": False, "message": f"删除失败: {e}"})
 
+def load_stt_upload(audio_file):
+    """读取上传的音频，返回 (audio, temp_path)
+    
+    小文件直接从请求流解码为 16kHz float32 数组，不落盘（temp_path 为 None）；
+    超过 whisper.upload_memory_mb 的文件写入唯一命名的临时文件，audio 为文件路径，
+    调用方识别结束后负责删除
+    """
+    stream = audio_file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    
+    if size <= get_whisper_settings()['upload_memory_mb'] * 1024 * 1024:
+        from faster_whisper import decode_audio
+        audio = decode_audio(stream, sampling_rate=16000)
+        print(f"[INFO] 音频已在内存中解码: {size / 1024 / 1024:.2f}MB, 时长{len(audio) / 16000:.1f}秒")
+        return audio, None
+    
+    # 保存临时文件 - 保持原始扩展名
+    ext = os.path.splitext(audio_file.filename)[1] or '.wav'
+    temp_path = OUTPUT_DIR / f"stt_temp_{int(time.time())}_{uuid.uuid4().hex[:6]}{ext}"
+    audio_file.save(temp_path)
+    print(f"[INFO] 大文件({size / 1024 / 1024:.1f}MB)保存到临时文件: {temp_path}")
+    return temp_path, temp_path
+
+def remove_stt_temp(temp_path):
+    """删除识别用的临时文件"""
+    if temp_path is None:
+        return
+    try:
+        temp_path.unlink()
+        print("[INFO] 临时文件已删除")
+    except OSError as e:
+        print(f"[WARN] 删除临时文件失败: {e}")
+
 @app.route('/api/stt', methods=['POST'])
 def api_stt():
     """语音转文字 - STT识别"""
@@ -2583,26 +5294,15 @@ def api_stt():
             return jsonify({"success": False, "message": "文件名为空"})
         
         print(f"[INFO] 收到音频文件: {audio_file.filename}")
-        
-        # 保存临时文件 - 保持原始扩展名
-        import os
-        ext = os.path.splitext(audio_file.filename)[1] or '.wav'
-        temp_path = OUTPUT_DIR / f"stt_temp_{int(time.time())}{ext}"
-        audio_file.save(temp_path)
-        print(f"[INFO] 临时文件保存到: {temp_path}")
+        audio, temp_path = load_stt_upload(audio_file)
         
         # 执行识别
         print("[INFO] 开始识别...")
-        result = stt_transcribe(temp_path)
-        print(f"[INFO] 识别结果: {result}")
-        
-        # 删除临时文件
         try:
-            if temp_path.exists():
-                temp_path.unlink()
-                print("[INFO] 临时文件已删除")
-        except Exception as e:
-            print(f"[WARN] 删除临时文件失败: {e}")
+            result = stt_transcribe(audio, profile=request.form.get('profile'))
+        finally:
+            remove_stt_temp(temp_path)
+        print(f"[INFO] 识别结果: {result}")
         
         return jsonify(result)
     except Exception as e:
@@ -2611,6 +5311,41 @@ def api_stt():
         print(f"[ERROR] STT API 错误: {error_detail}")
         return jsonify({"success": False, "message": f"识别失败: {e}"})
 
+@app.route('/api/stt/stream', methods=['POST'])
+def api_stt_stream():
+    """语音转文字 - 流式版本，通过 SSE 逐段推送识别结果
+    
+    事件: segment（单段，已转简体）、done（语言/时长/全文）、error；
+    表单字段 profile 可选择识别档位。上传内容有问题时返回 400 和普通 JSON，不进入 SSE
+    """
+    if 'audio' not in request.files:
+        return jsonify({"success": False, "message": "未上传音频文件"}), 400
+    audio_file = request.files['audio']
+    if audio_file.filename == '':
+        return jsonify({"success": False, "message": "文件名为空"}), 400
+    
+    print(f"[INFO] STT流式识别: {audio_file.filename}")
+    profile = request.form.get('profile')
+    try:
+        # 请求结束前必须读完上传内容
+        audio, temp_path = load_stt_upload(audio_file)
+    except Exception as e:
+        print(f"[ERROR] 读取音频失败: {e}")
+        return jsonify({"success": False, "message": f"读取音频失败: {e}"}), 400
+    
+    def stream():
+        try:
+            for event, data in stt_transcribe_stream(audio, profile=profile):
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        finally:
+            # 识别结束或客户端断开后删除临时文件
+            remove_stt_temp(temp_path)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 # ============ 达芬奇集成 ============
 DAVINCI_CONFIG_FILE = BASE_DIR / "davinci_config.json"
 
@@ -3024,11 +5759,6 @@ def api_ai_optimize():
         model = llm_config.get('model', 'Pro/zai-org/GLM-4.7')
         
         # 调用大模型API
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "model": model,
             "messages": [
@@ -3039,13 +5769,8 @@ def api_ai_optimize():
             "max_tokens": 4000
         }
         
-        resp = requests.post(
-            f"{base_url}/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=180,
-            proxies={"http": None, "https": None}
-        )
+        resp = upstream_request("POST", base_url, "/chat/completions", "optimize",
+                                api_key=api_key, json=payload, rate_key=model)
         
         if resp.status_code != 200:
             return jsonify({"success": False, "message": f"API错误: {resp.text[:200]}"})
@@ -3104,6 +5829,97 @@ def save_prompts():
     except Exception as e:
         return jsonify({"success": False, "message": str(e)})
 
+# ============ Whisper 状态 ============
+@app.route('/api/whisper/status')
+def api_whisper_status():
+    """Whisper 模型加载状态、识别队列深度和等待时间"""
+    return jsonify({"success": True, "whisper": get_whisper_status()})
+
+@app.route('/api/health/ready')
+def api_health_ready():
+    """就绪检查：Whisper 模型加载并预热完成后返回 200，否则 503（whisper.preload 为 false 时不等待预热）
+    
+    model_resident 表示默认模型当前是否在本进程内存中：开启 idle_unload_seconds 后模型可能被空闲卸载，
+    下次识别时自动重新加载，仍然算作就绪（TTS 和声音克隆也不依赖 Whisper）
+    """
+    readiness = dict(WHISPER_READINESS)
+    ready = readiness['state'] == 'ready'
+    if readiness['state'] == 'idle' and not get_config().get('whisper', {}).get('preload', True):
+        # 关闭启动预热时模型在第一次识别时加载，不需要等待
+        ready = True
+    with WHISPER_MODEL_LOCK:
+        readiness['model_resident'] = WHISPER_ACTIVE_KEY in WHISPER_MODELS
+    return jsonify({"ready": ready, "whisper": readiness}), (200 if ready else 503)
+
+def check_worker_token():
+    """远程识别节点接口的开关和令牌校验，不通过时返回错误响应"""
+    import hmac
+    remote_config = get_whisper_remote_config()
+    if not remote_config['serve']:
+        return jsonify({"success": False, "message": "本机未开启远程识别节点 (whisper.remote.serve)"}), 404
+    if not remote_config['token']:
+        return jsonify({"success": False, "message": "未配置 whisper.remote.token，拒绝提供远程识别"}), 403
+    token = request.headers.get('X-Worker-Token', '')
+    if not hmac.compare_digest(token.encode('utf-8'), remote_config['token'].encode('utf-8')):
+        return jsonify({"success": False, "message": "令牌错误"}), 401
+    return None
+
+@app.route('/api/worker/health')
+def api_worker_health():
+    """远程识别节点健康检查，返回当前负载供调度方选择节点"""
+    error = check_worker_token()
+    if error:
+        return error
+    settings = get_whisper_settings()
+    with WHISPER_INFERENCE_LOCK:
+        stats = dict(WHISPER_INFERENCE_STATS)
+    return jsonify({
+        "success": True,
+        "model": settings['model'],
+        "active": stats['active'],
+        "waiting": stats['waiting'],
+        "max_concurrent": settings['max_concurrent']
+    })
+
+@app.route('/api/worker/transcribe', methods=['POST'])
+def api_worker_transcribe():
+    """远程识别节点：识别其他机器发来的音频，返回 segments/language/duration
+    
+    表单字段: audio（音频文件，或 format=f32le 时为 16kHz float32 原始数据）、model、kwargs(JSON)。
+    节点按自己的 device/compute_type 加载模型
+    """
+    error = check_worker_token()
+    if error:
+        return error
+    # 请求本身的问题返回 400，调度方不再换节点；模型加载或识别出错返回 5xx，调度方换下一个节点
+    audio_file = request.files.get('audio')
+    if audio_file is None:
+        return jsonify({"success": False, "message": "未上传音频文件"}), 400
+    try:
+        kwargs = json.loads(request.form.get('kwargs') or '{}')
+        if not isinstance(kwargs, dict):
+            raise ValueError("kwargs 必须是 JSON 对象")
+        if request.form.get('format') == 'f32le':
+            import numpy as np
+            audio = np.frombuffer(audio_file.read(), dtype=np.float32).copy()
+        else:
+            from faster_whisper import decode_audio
+            audio = decode_audio(audio_file.stream, sampling_rate=16000)
+    except Exception as e:
+        print(f"[WARN] 远程识别请求无效: {e}")
+        return jsonify({"success": False, "message": f"请求无效: {e}"}), 400
+    
+    try:
+        model = get_whisper_model(request.form.get('model') or None, remote=False)
+        if model is None:
+            return jsonify({"success": False, "message": "Whisper 模型加载失败"}), 503
+        result = whisper_transcribe_cached(model, audio, **kwargs)
+        return jsonify({"success": True, "result": result})
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] 远程识别请求失败: {traceback.format_exc()}")
+        return jsonify({"success": False, "message": f"识别失败: {e}"}), 500
+
 # ============ 配置API ============
 @app.route('/api/config', methods=['GET'])
 def get_api_config():
@@ -3191,6 +6007,13 @@ if __name__ == "__main__":
     print("   3. The audio will be uploaded to SiliconFlow server for storage")
     print("   4. Using server-side preset voices gives better and more stable results")
     print("=" * 60)
-    print("Access at: http://localhost:7860")
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=7860, help="监听端口（同一台机器运行多个识别节点时使用）")
+    args = parser.parse_args()
+    print(f"Access at: http://localhost:{args.port}")
     print("=" * 60)
-    app.run(host="0.0.0.0", port=7860, debug=False)
+    threading.Thread(target=warm_upstream_connections, daemon=True).start()
+    if config.get('whisper', {}).get('preload', True):
+        threading.Thread(target=preload_whisper_model, daemon=True).start()
+    app.run(host="0.0.0.0", port=args.port, debug=False, threaded=True)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Whisper 参数校准
+
+在本机上用一段中文音频（8-60 秒，内容已知）逐一测试候选参数组合
+（compute_type / cpu_threads / beam_size / VAD），记录实时率(RTF)和字准确率，
+生成 fast / balanced / accurate 三个档位写入 voice_clones/config.json 的 whisper.profiles。
+
+用法:
+    python whisper_calibrate.py clip.wav --text "音频里说的内容"
+    python whisper_calibrate.py clip.wav --text-file clip.txt --dry-run
+
+生成后可在 whisper.profile 中设置默认档位，或在 /api/stt 表单 / TTS 请求
+(whisper_profile) 中按次选择。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import voice_clone_flask as app
+
+# 档位选择：准确率在最佳结果的容差内，取实时率最低的组合
+PROFILE_TOLERANCE = {
+    "accurate": 0.0,
+    "balanced": 0.02,
+    "fast": 0.10
+}
+
+VAD_CANDIDATES = [
+    ("off", False, None),
+    ("vad", True, {"min_silence_duration_ms": 500})
+]
+
+
+def normalize(text):
+    """转简体并只保留文字和数字，用于计算字准确率"""
+    text = app.get_t2s_converter()(text)
+    return [ch for ch in text.lower() if ch.isalnum()]
+
+
+def char_accuracy(reference, hypothesis):
+    """1 - 字错误率(CER)，用编辑距离计算"""
+    ref = normalize(reference)
+    hyp = normalize(hypothesis)
+    if not ref:
+        return 0.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return max(0.0, 1.0 - prev[-1] / len(ref))
+
+
+def candidate_compute_types(device):
+    """当前设备支持的候选精度"""
+    import ctranslate2
+    preferred = ["int8", "int8_float32", "float32"] if device == "cpu" else ["int8_float16", "float16", "int8"]
+    supported = ctranslate2.get_supported_compute_types(device)
+    return [c for c in preferred if c in supported]
+
+
+def candidate_threads():
+    cores = os.cpu_count() or 1
+    return sorted({max(1, cores // 2), cores})
+
+
+def run_candidates(audio, reference, model_size, device, compute_types, threads, beams):
+    """逐一测试参数组合，返回结果列表"""
+    duration = len(audio) / 16000
+    settings = app.get_whisper_settings()
+    results = []
+    for compute_type in compute_types:
+        for cpu_threads in threads:
+            load_settings = dict(settings, cpu_threads=cpu_threads)
+            try:
+                model = app.load_whisper_model(model_size, device, compute_type, load_settings)
+            except Exception as e:
+                print(f"[WARN] 加载失败 {compute_type}/{cpu_threads}线程: {e}")
+                continue
+            # 预热一次，避免首次计算的初始化时间计入结果
+            segments, _ = model.transcribe(audio[:16000], language=settings['language'], beam_size=1)
+            list(segments)
+
+            for beam_size in beams:
+                for vad_name, vad_filter, vad_parameters in VAD_CANDIDATES:
+                    kwargs = {"language": settings['language'], "beam_size": beam_size, "vad_filter": vad_filter}
+                    if vad_parameters:
+                        kwargs["vad_parameters"] = vad_parameters
+                    start = time.time()
+                    segments, _ = model.transcribe(audio, **kwargs)
+                    text = ''.join(segment.text for segment in segments)
+                    elapsed = time.time() - start
+
+                    result = {
+                        "compute_type": compute_type,
+                        "cpu_threads": cpu_threads,
+                        "beam_size": beam_size,
+                        "vad_filter": vad_filter,
+                        "vad_parameters": vad_parameters,
+                        "rtf": round(elapsed / duration, 4),
+                        "accuracy": round(char_accuracy(reference, text), 4)
+                    }
+                    results.append(result)
+                    print(f"  {compute_type:<13} 线程={cpu_threads:<3} beam={beam_size} {vad_name:<4} "
+                          f"RTF={result['rtf']:.3f} 准确率={result['accuracy']:.1%}")
+            del model
+    return results
+
+
+def pick_profiles(results):
+    """按容差挑选 fast / balanced / accurate"""
+    best = max(r['accuracy'] for r in results)
+    profiles = {}
+    for name, tolerance in PROFILE_TOLERANCE.items():
+        pool = [r for r in results if r['accuracy'] >= best - tolerance - 1e-9]
+        choice = min(pool, key=lambda r: (r['rtf'], -r['accuracy']))
+        profile = {k: v for k, v in choice.items() if v is not None}
+        profiles[name] = profile
+    return profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper 参数校准，生成 fast / balanced / accurate 档位")
+    parser.add_argument("clip", help="校准用的中文音频（建议 8-60 秒）")
+    parser.add_argument("--text", help="音频的准确文本")
+    parser.add_argument("--text-file", help="音频的准确文本文件（UTF-8）")
+    parser.add_argument("--model", help="要校准的模型，默认使用 whisper.model")
+    parser.add_argument("--beams", default="1,3,5", help="候选 beam_size，逗号分隔")
+    parser.add_argument("--dry-run", action="store_true", help="只打印结果，不写入配置")
+    args = parser.parse_args()
+
+    if args.text_file:
+        with open(args.text_file, 'r', encoding='utf-8') as f:
+            reference = f.read().strip()
+    else:
+        reference = (args.text or '').strip()
+    if not reference:
+        parser.error("需要 --text 或 --text-file 提供音频的准确文本")
+
+    from faster_whisper import decode_audio
+    audio = decode_audio(args.clip, sampling_rate=16000)
+    settings = app.get_whisper_settings()
+    model_size = args.model or settings['model']
+    device = settings['device']
+    beams = [int(b) for b in args.beams.split(',') if b.strip()]
+
+    print(f"[INFO] 校准 Whisper {model_size} ({device})，音频时长 {len(audio) / 16000:.1f}秒")
+    results = run_candidates(audio, reference, model_size, device,
+                             candidate_compute_types(device), candidate_threads(), beams)
+    if not results:
+        print("[ERROR] 没有可用的参数组合")
+        return 1
+
+    profiles = pick_profiles(results)
+    print("\n档位:")
+    for name, profile in profiles.items():
+        print(f"  {name:<9} {profile}")
+
+    if args.dry_run:
+        return 0
+
+    config = app.get_config()
+    whisper_config = config.setdefault('whisper', {})
+    whisper_config['profiles'] = profiles
+    whisper_config['calibration'] = {
+        "model": model_size,
+        "device": device,
+        "clip": os.path.basename(args.clip),
+        "calibrated_at": time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+    app.save_tool_config(config)
+    print(f"\n[OK] 已写入 {app.CONFIG_FILE}（whisper.profiles），在 whisper.profile 中设置默认档位")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Whisper worker 守护进程
+
+模型只在这个进程中加载，任意数量的 Web 进程通过本地 socket（multiprocessing.connection，
+带 authkey 认证）提交识别请求。批量窗口内到达的请求合并处理：同一音频+模型+参数只识别一次，
+结果推送给所有请求方，其余请求分发到多个线程并行使用 CTranslate2 的 num_workers。
+识别进程崩溃（例如 CTranslate2 段错误）时由守护进程自动重启，Web 进程在 connect_wait 内重连。
+
+用法:
+    python whisper_worker.py                 # 地址等配置见 config.json 的 whisper.worker
+    python whisper_worker.py --address 127.0.0.1:7861 --no-supervise
+
+Web 端在 config.json 中设置 "whisper": {"worker": {"enabled": true}} 后生效。
+认证密钥默认在首次运行时随机生成（voice_clones/worker.key，仅当前用户可读），Web 进程和 worker 读取同一个文件；
+跨用户或跨目录部署时在 whisper.worker.authkey 中设置相同的密钥。
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import voice_clone_flask as app
+
+PENDING = queue.Queue()
+STATS = {"requests": 0, "batches": 0, "deduplicated": 0, "started_at": time.time()}
+STATS_LOCK = threading.Lock()
+
+
+def audio_identity(audio):
+    """合并重复请求用的音频标识：数组按内容哈希，文件按路径+大小+修改时间"""
+    if hasattr(audio, 'tobytes'):
+        return hashlib.sha1(audio.tobytes()).hexdigest()
+    st = os.stat(audio)
+    return f"{os.path.abspath(audio)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def send_all(requests_, message):
+    """推送给组内所有请求方，断开的连接直接跳过"""
+    for req in requests_:
+        if req['alive']:
+            try:
+                req['conn'].send(message)
+            except (OSError, EOFError):
+                req['alive'] = False
+
+
+def load_and_warm(key):
+    """加载模型并做一次空音频识别"""
+    import numpy as np
+    start = time.time()
+    model = app.get_whisper_model(*key, local=True)
+    if model is None:
+        raise RuntimeError("Whisper 模型加载失败")
+    load_seconds = time.time() - start
+    with app.whisper_inference_slot():
+        segments, info = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+        list(segments)
+    return load_seconds
+
+
+def run_group(group):
+    """识别一组相同的请求，逐段推送给组内所有连接"""
+    req = group[0]
+    try:
+        model = app.get_whisper_model(*req['key'], local=True)
+        if model is None:
+            raise RuntimeError("Whisper 模型加载失败")
+        result = {}
+        sent_info = False
+        for item in app.whisper_collect_segments(model, req['audio'], result, [], **req['kwargs']):
+            if not sent_info:
+                send_all(group, {"ok": True, "info": {"language": result['language'], "duration": result['duration']}})
+                sent_info = True
+            send_all(group, {"ok": True, "segment": item})
+        if not sent_info:
+            send_all(group, {"ok": True, "info": {"language": result['language'], "duration": result['duration']}})
+        send_all(group, {"ok": True, "done": True})
+    except Exception as e:
+        print(f"[ERROR] 识别失败: {e}")
+        send_all(group, {"ok": False, "error": f"识别失败: {e}"})
+    finally:
+        for r in group:
+            r['finished'].set()
+
+
+def dispatcher(executor, window_ms, max_batch):
+    """收集批量窗口内到达的请求，相同的合并，分组后并行执行"""
+    while True:
+        batch = [PENDING.get()]
+        deadline = time.time() + window_ms / 1000
+        while len(batch) < max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(PENDING.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        groups = OrderedDict()
+        for req in batch:
+            group_key = (req['identity'], tuple(req['key']), json.dumps(req['kwargs'], sort_keys=True, default=str))
+            groups.setdefault(group_key, []).append(req)
+        with STATS_LOCK:
+            STATS['batches'] += 1
+            STATS['deduplicated'] += len(batch) - len(groups)
+        if len(batch) > 1:
+            print(f"[INFO] 批量处理 {len(batch)} 个请求，合并后 {len(groups)} 组")
+        for group in groups.values():
+            executor.submit(run_group, group)
+
+
+def worker_status():
+    with STATS_LOCK:
+        status = dict(STATS)
+    status['uptime'] = round(time.time() - status.pop('started_at'), 1)
+    status['pid'] = os.getpid()
+    status['pending'] = PENDING.qsize()
+    with app.WHISPER_MODEL_LOCK:
+        status['models'] = [
+            {"model": key[0], "device": key[1], "compute_type": key[2], "cpu_threads": key[3],
+             "resident_mb": entry['resident_mb']}
+            for key, entry in app.WHISPER_MODELS.items()
+        ]
+    return status
+
+
+def handle_connection(conn):
+    """每个连接处理一个请求"""
+    try:
+        message = conn.recv()
+        op = message.get('op')
+        if op == 'ping':
+            conn.send({"ok": True})
+        elif op == 'status':
+            conn.send({"ok": True, "status": worker_status()})
+        elif op == 'load':
+            conn.send({"ok": True, "load_seconds": round(load_and_warm(tuple(message['key'])), 2)})
+        elif op == 'transcribe':
+            req = {
+                "conn": conn,
+                "key": tuple(message['key']),
+                "audio": message['audio'],
+                "kwargs": message.get('kwargs', {}),
+                "identity": audio_identity(message['audio']),
+                "alive": True,
+                "finished": threading.Event()
+            }
+            with STATS_LOCK:
+                STATS['requests'] += 1
+            PENDING.put(req)
+            req['finished'].wait()
+        else:
+            conn.send({"ok": False, "error": f"未知请求: {op}"})
+    except (OSError, EOFError):
+        pass
+    except Exception as e:
+        try:
+            conn.send({"ok": False, "error": str(e)})
+        except (OSError, EOFError):
+            pass
+    finally:
+        conn.close()
+
+
+def serve(address, authkey):
+    """识别进程：监听本地 socket，预加载配置的模型"""
+    from multiprocessing.connection import Listener
+    from multiprocessing import AuthenticationError
+
+    worker_config = app.get_whisper_worker_config()
+    settings = app.get_whisper_settings()
+    executor = ThreadPoolExecutor(max_workers=max(1, worker_config['max_batch']), thread_name_prefix="whisper-run")
+    threading.Thread(
+        target=dispatcher,
+        args=(executor, worker_config['batch_window_ms'], worker_config['max_batch']),
+        daemon=True
+    ).start()
+
+    listener = Listener(app.parse_worker_address(address), authkey=authkey.encode('utf-8'))
+    print(f"[INFO] Whisper worker 已启动: {address} (pid={os.getpid()})")
+
+    key = (settings['model'], settings['device'], settings['compute_type'], settings['cpu_threads'])
+    threading.Thread(target=load_and_warm, args=(key,), daemon=True).start()
+
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except AuthenticationError:
+                print("[WARN] 拒绝 authkey 不匹配的连接")
+                continue
+            threading.Thread(target=handle_connection, args=(conn,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+
+
+def supervise(address, authkey):
+    """守护进程：识别进程异常退出时自动重启（指数退避，最长 30 秒）"""
+    ctx = multiprocessing.get_context('spawn')
+    backoff = 1
+    while True:
+        proc = ctx.Process(target=serve, args=(address, authkey), name="whisper-worker")
+        started = time.time()
+        proc.start()
+        try:
+            proc.join()
+        except KeyboardInterrupt:
+            proc.terminate()
+            proc.join()
+            return 0
+        if proc.exitcode == 0:
+            return 0
+        if time.time() - started > 60:
+            backoff = 1
+        print(f"[WARN] Whisper worker 进程退出(exitcode={proc.exitcode})，{backoff}秒后重启")
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 30)
+
+
+def main():
+    worker_config = app.get_whisper_worker_config()
+    parser = argparse.ArgumentParser(description="Whisper worker 守护进程")
+    parser.add_argument("--address", default=worker_config['address'], help="监听地址 host:port")
+    parser.add_argument("--no-supervise", action="store_true", help="不启动守护进程，直接在当前进程中运行")
+    args = parser.parse_args()
+
+    authkey = app.get_worker_authkey(worker_config['authkey'])
+    if args.no_supervise:
+        serve(args.address, authkey)
+        return 0
+    return supervise(args.address, authkey)
+
+
+if __name__ == "__main__":
+    sys.exit(main())